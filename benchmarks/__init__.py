@@ -0,0 +1 @@
+# Các script đo hiệu năng, chạy từ thư mục gốc: python -m benchmarks.<tên_script>
@@ -0,0 +1,74 @@
+"""
+Đo độ trễ commit của insert_entry và update_entry theo từng chế độ kết nối
+
+    python -m benchmarks.bench_commit [--rows 300]
+
+"legacy" là kết nối sqlite3 mặc định trước đây (rollback journal, synchronous=FULL).
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from database import Database, DB_PROFILES
+
+
+def open_database(path, profile):
+    db = Database(path, "durability" if profile == "legacy" else profile)
+    if profile == "legacy":
+        # Kết nối như phiên bản cũ: sqlite3.connect() mặc định, rollback journal
+        db.conn.close()
+        db.conn = sqlite3.connect(path)
+        db.conn.execute("PRAGMA journal_mode = DELETE")
+    return db
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_profile(profile, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = open_database(path, profile)
+
+        insert_ms = [
+            _timed(db.insert_entry, f"2025-01-{i % 28 + 1:02d}", f"Học sinh {i}", "Sáng T7",
+                   "Đi học", "Nội dung bài học", 0)
+            for i in range(rows)
+        ]
+        ids = [row[0] for row in db.conn.execute("SELECT id FROM progress ORDER BY id")]
+        update_ms = [
+            _timed(db.update_entry, row_id, f"2025-01-{i % 28 + 1:02d}", f"Học sinh {i}", "Sáng T7",
+                   "Đi học", "Đã cập nhật nhận xét", 1)
+            for i, row_id in enumerate(ids)
+        ]
+        db.conn.close()
+
+    return {"insert_entry": insert_ms, "update_entry": update_ms}
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"trung bình {statistics.mean(samples):7.3f} ms | trung vị {statistics.median(samples):7.3f} ms | p95 {p95:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo độ trễ commit theo chế độ kết nối")
+    parser.add_argument("--rows", type=int, default=300, help="số lần insert/update cho mỗi chế độ")
+    args = parser.parse_args()
+
+    for profile in ["legacy", *DB_PROFILES]:
+        results = run_profile(profile, args.rows)
+        print(f"[{profile}]")
+        for method, samples in results.items():
+            print(f"  {method:<13} {_summary(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+"""
+Đo thời gian mọi phương thức public của Database và các hàm tính báo cáo trên dữ liệu giả lập
+
+    python -m benchmarks.bench_database [--scale small] [--scale 5000x2000000] [--repeat 5]
+                                        [--data-dir .bench_data] [--output result.json]
+                                        [--baseline baseline.json] [--threshold 0.25]
+
+Mỗi quy mô (small, medium, large hoặc HỌC_SINHxSỐ_DÒNG) được tạo bằng benchmarks.datagen.
+Với --data-dir, file đã tạo được giữ lại cho lần sau. Mỗi lần đo chạy trên một bản sao.
+Trước mỗi lần gọi, bộ đệm truy vấn được xóa để đo đường đọc thật từ SQLite.
+Kết quả (trung vị / nhỏ nhất / lớn nhất, ms) được ghi ra --output, hoặc in ra stdout.
+Với --baseline: thoát mã 1 nếu có phép đo chậm hơn baseline quá --threshold (tỉ lệ)
+và quá --noise-ms mili giây. Lưu kết quả một lần làm baseline rồi so sánh các lần sau.
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from database import Database
+from registry import STATUS_PRESENT
+from benchmarks.datagen import generate_dataset
+
+SCALES = {
+    "small": (500, 50000),
+    "medium": (2000, 400000),
+    "large": (5000, 2000000),
+}
+
+# name -> (hàm chuẩn bị, chỉ chạy một lần). Hàm chuẩn bị nhận (db, ctx) và trả về
+# hàm cần đo, hoặc (hàm cần đo, hàm dọn dẹp) khi phép đo ghi vào database
+CASES = {}
+
+
+def case(name, once=False):
+    def register(func):
+        CASES[name] = (func, once)
+        return func
+    return register
+
+
+def parse_scale(text):
+    if text in SCALES:
+        return text, SCALES[text]
+    try:
+        students, rows = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"quy mô không hợp lệ: '{text}' (small, medium, large hoặc 5000x2000000)")
+    return text, (students, rows)
+
+
+class Context:
+    """Giá trị thật lấy từ dữ liệu (học sinh, khoảng ngày, id...) dùng làm tham số cho các phép đo"""
+    def __init__(self, db):
+        conn = db.conn
+        self.last_date = conn.execute("SELECT MAX(date) FROM progress").fetchone()[0]
+        last = date.fromisoformat(self.last_date)
+        self.month_start = (last - timedelta(days=30)).isoformat()
+        self.year_start = (last - timedelta(days=365)).isoformat()
+        self.class_name = db.registry.class_names()[0]
+        # Học sinh học nhiều lớp: trường hợp tốn công nhất khi gộp số liệu
+        self.student_id, self.student_name = conn.execute(
+            """SELECT s.student_id, s.name FROM students s JOIN progress p ON p.student_key = s.student_key
+               GROUP BY s.student_key HAVING COUNT(DISTINCT p.class_id) > 1 LIMIT 1"""
+        ).fetchone()
+        self.name_keyword = self.student_name.split()[-1]
+        self.entry_ids = [row[0] for row in conn.execute("SELECT id FROM progress ORDER BY id DESC LIMIT 200")]
+        self.names = [row[0] for row in conn.execute("SELECT name FROM students ORDER BY student_id LIMIT 200")]
+        existing = conn.execute(
+            "SELECT name, date, class_id FROM progress ORDER BY id DESC LIMIT 300").fetchall()
+        self.session_keys = existing + [(name, "2099-01-01", key[2]) for name, key in zip(self.names, existing)]
+        # Ngày không có trong dữ liệu cho các phép ghi, xóa lại sau mỗi lần đo
+        self.write_date = "2099-01-04"
+        self.counter = itertools.count()
+
+
+def _delete_date(db, day):
+    ids = [row[0] for row in db.conn.execute("SELECT id FROM progress WHERE date = ?", (day,))]
+    if ids:
+        db.delete_entries(ids)
+
+
+# =========================
+# ĐỌC: BẢNG CHÍNH, TÌM KIẾM
+# =========================
+
+@case("Database.get_progress_page")
+def _(db, ctx):
+    return lambda: db.get_progress_page()
+
+
+@case("Database.get_progress_page[name]")
+def _(db, ctx):
+    return lambda: db.get_progress_page(name=ctx.name_keyword)
+
+
+@case("Database.get_progress_page[class,date]")
+def _(db, ctx):
+    return lambda: db.get_progress_page(class_name=ctx.class_name, date=ctx.last_date)
+
+
+@case("Database.get_filtered_progress")
+def _(db, ctx):
+    return lambda: db.get_filtered_progress(class_name=ctx.class_name, date=ctx.last_date)
+
+
+@case("Database.count_filtered_progress")
+def _(db, ctx):
+    return lambda: db.count_filtered_progress(start_date=ctx.year_start, end_date=ctx.last_date)
+
+
+@case("Database.cursor_filtered_progress")
+def _(db, ctx):
+    return lambda: db.cursor_filtered_progress(start_date=ctx.month_start, end_date=ctx.last_date).fetchall()
+
+
+@case("Database.iter_filtered_progress")
+def _(db, ctx):
+    # 5.000 dòng đầu: đủ nhiều trang để thấy chi phí phân trang
+    return lambda: list(itertools.islice(db.iter_filtered_progress(class_name=ctx.class_name), 5000))
+
+
+@case("Database.get_progress_by_ids")
+def _(db, ctx):
+    return lambda: db.get_progress_by_ids(ctx.entry_ids)
+
+
+@case("Database.get_entry_by_id")
+def _(db, ctx):
+    return lambda: db.get_entry_by_id(ctx.entry_ids[0])
+
+
+@case("Database.search_content")
+def _(db, ctx):
+    return lambda: db.search_content("vong lap")
+
+
+# Từ phổ biến: khớp gần như mọi dòng
+@case("Database.search_content[broad]")
+def _(db, ctx):
+    return lambda: db.search_content("hoc")
+
+
+@case("Database.search_content[broad,name]")
+def _(db, ctx):
+    return lambda: db.search_content("hoc", name=ctx.name_keyword)
+
+
+@case("Database.search_content[broad,class,date]")
+def _(db, ctx):
+    return lambda: db.search_content("hoc", class_name=ctx.class_name, date=ctx.last_date)
+
+
+@case("Database.search_student_notes")
+def _(db, ctx):
+    return lambda: db.search_student_notes("vong lap")
+
+
+@case("Database.get_distinct_student_names")
+def _(db, ctx):
+    return db.get_distinct_student_names
+
+
+@case("Database.find_existing_sessions")
+def _(db, ctx):
+    return lambda: db.find_existing_sessions(ctx.session_keys)
+
+
+# =========================
+# ĐỌC: HỒ SƠ HỌC SINH
+# =========================
+
+@case("Database.get_all_students")
+def _(db, ctx):
+    return db.get_all_students
+
+
+@case("Database.cursor_students")
+def _(db, ctx):
+    return lambda: db.cursor_students().fetchall()
+
+
+@case("Database.count_students")
+def _(db, ctx):
+    return db.count_students
+
+
+@case("Database.get_student_by_id")
+def _(db, ctx):
+    return lambda: db.get_student_by_id(ctx.student_id)
+
+
+@case("Database.search_students")
+def _(db, ctx):
+    return lambda: db.search_students(ctx.name_keyword)
+
+
+@case("Database.get_student_attendance_stats")
+def _(db, ctx):
+    return lambda: db.get_student_attendance_stats(ctx.student_id)
+
+
+@case("Database.get_student_sessions")
+def _(db, ctx):
+    return lambda: db.get_student_sessions(ctx.student_id, ctx.year_start, ctx.last_date)
+
+
+@case("Database.get_student_keys_by_name")
+def _(db, ctx):
+    return db.get_student_keys_by_name
+
+
+@case("Database.get_students_without_profile")
+def _(db, ctx):
+    return db.get_students_without_profile
+
+
+# =========================
+# ĐỌC: THỐNG KÊ
+# =========================
+
+@case("Database.get_class_schedule")
+def _(db, ctx):
+    return db.get_class_schedule
+
+
+@case("Database.get_cancelled_sessions")
+def _(db, ctx):
+    return lambda: db.get_cancelled_sessions(ctx.year_start, ctx.last_date)
+
+
+@case("Database.count_expected_sessions")
+def _(db, ctx):
+    return lambda: db.count_expected_sessions(ctx.class_name, ctx.year_start, ctx.last_date)
+
+
+@case("Database.get_attendance_groups")
+def _(db, ctx):
+    return lambda: db.get_attendance_groups(ctx.year_start, ctx.last_date)
+
+
+@case("Database.get_class_summary")
+def _(db, ctx):
+    return lambda: db.get_class_summary(ctx.year_start, ctx.last_date)
+
+
+@case("Database.get_attendance_by_student")
+def _(db, ctx):
+    return lambda: db.get_attendance_by_student(ctx.year_start, ctx.last_date)
+
+
+@case("Database.get_all_students_with_attendance")
+def _(db, ctx):
+    return lambda: db.get_all_students_with_attendance(ctx.year_start, ctx.last_date)
+
+
+@case("Database.combine_student_attendance")
+def _(db, ctx):
+    students = [(row[0], row[1], row[7]) for row in db.get_all_students()]
+    attendance = db.get_attendance_by_student(ctx.year_start, ctx.last_date)
+    return lambda: db.combine_student_attendance(students, attendance, ctx.year_start, ctx.last_date)
+
+
+@case("Database.cache_stats")
+def _(db, ctx):
+    return db.cache_stats
+
+
+@case("Database.query_stats")
+def _(db, ctx):
+    return db.query_stats
+
+
+@case("Database.recent_queries")
+def _(db, ctx):
+    return db.recent_queries
+
+
+@case("Database.reload_registry")
+def _(db, ctx):
+    return db.reload_registry
+
+
+@case("Database.init_db")
+def _(db, ctx):
+    return db.init_db
+
+
+@case("Database.check_integrity", once=True)
+def _(db, ctx):
+    return db.check_integrity
+
+
+# =========================
+# GHI
+# =========================
+
+@case("Database.insert_entry")
+def _(db, ctx):
+    run = lambda: db.insert_entry(ctx.write_date, ctx.student_name, ctx.class_name, "Đi học", "Bài mới", 0)
+    return run, lambda: _delete_date(db, ctx.write_date)
+
+
+@case("Database.update_entry")
+def _(db, ctx):
+    entry = db.get_entry_by_id(ctx.entry_ids[0])
+    content = f"Nhận xét {next(ctx.counter)}"
+    return lambda: db.update_entry(entry[0], entry[1], entry[2], entry[3], entry[4], content, entry[6])
+
+
+@case("Database.update_entries_content")
+def _(db, ctx):
+    content = f"Nhận xét chung {next(ctx.counter)}"
+    return lambda: db.update_entries_content(ctx.entry_ids, content)
+
+
+@case("Database.bulk_insert_attendance")
+def _(db, ctx):
+    selected = [(name, ctx.class_name, ctx.write_date) for name in ctx.names]
+    return lambda: db.bulk_insert_attendance(selected), lambda: _delete_date(db, ctx.write_date)
+
+
+@case("Database.import_progress")
+def _(db, ctx):
+    keys = db.get_student_keys_by_name()
+    class_id = db.registry.class_id(ctx.class_name)
+    rows = [(ctx.write_date, name, class_id, STATUS_PRESENT, "Nhập từ file", 0, keys.get(name)) for name in ctx.names]
+    return lambda: db.import_progress(rows), lambda: _delete_date(db, ctx.write_date)
+
+
+# Lô lớn (mọi học sinh x mọi lớp trong một ngày): đi đường bỏ trigger từng dòng
+@case("Database.import_progress[bulk]")
+def _(db, ctx):
+    keys = db.get_student_keys_by_name()
+    rows = [(ctx.write_date, name, db.registry.class_id(class_name), STATUS_PRESENT, "Nhập từ file", 0, key)
+            for name, key in keys.items() for class_name in db.registry.class_names()]
+    return lambda: db.import_progress(rows), lambda: _delete_date(db, ctx.write_date)
+
+
+@case("Database.delete_entries")
+def _(db, ctx):
+    ids = db.bulk_insert_attendance([(name, ctx.class_name, ctx.write_date) for name in ctx.names]).ids
+    return lambda: db.delete_entries(ids)
+
+
+@case("Database.insert_student")
+def _(db, ctx):
+    student_id = f"BENCH{next(ctx.counter)}"
+    run = lambda: db.insert_student(student_id, ctx.student_name, "", "", "", "", "Ghi chú", ctx.class_name, "")
+    return run, lambda: db.delete_student(student_id)
+
+
+@case("Database.update_student")
+def _(db, ctx):
+    row = list(db.get_student_by_id(ctx.student_id))
+    row[6] = f"Ghi chú {next(ctx.counter)}"
+    return lambda: db.update_student(*row)
+
+
+@case("Database.delete_student")
+def _(db, ctx):
+    student_id = f"BENCH{next(ctx.counter)}"
+    db.insert_student(student_id, ctx.student_name, "", "", "", "", "", ctx.class_name, "")
+    return lambda: db.delete_student(student_id)
+
+
+@case("Database.add_cancelled_session")
+def _(db, ctx):
+    def cleanup():
+        for row in db.get_cancelled_sessions(ctx.write_date, ctx.write_date):
+            db.delete_cancelled_session(row[0])
+    return lambda: db.add_cancelled_session(ctx.write_date, None, "Đo hiệu năng"), cleanup
+
+
+@case("Database.delete_cancelled_session")
+def _(db, ctx):
+    db.add_cancelled_session(ctx.write_date, None, "Đo hiệu năng")
+    session_id = db.get_cancelled_sessions(ctx.write_date, ctx.write_date)[0][0]
+    return lambda: db.delete_cancelled_session(session_id)
+
+
+@case("Database.set_class_schedule")
+def _(db, ctx):
+    weekdays = db.get_class_schedule().get(ctx.class_name, [])
+    return lambda: db.set_class_schedule(ctx.class_name, weekdays)
+
+
+@case("Database.add_class")
+def _(db, ctx):
+    # Lớp mới ở lại trong bản sao database (không có hàm xóa lớp)
+    return lambda: db.add_class(f"Lớp đo {next(ctx.counter)}", [2])
+
+
+@case("Database.rebuild_search_index", once=True)
+def _(db, ctx):
+    return db.rebuild_search_index
+
+
+@case("Database.rebuild_attendance_rollup", once=True)
+def _(db, ctx):
+    return db.rebuild_attendance_rollup
+
+
+# =========================
+# BÁO CÁO
+# =========================
+
+@case("reports.build_stats_report[month]")
+def _(db, ctx):
+    from reports import build_stats_report
+    return lambda: build_stats_report(db, ctx.month_start, ctx.last_date)
+
+
+@case("reports.build_stats_report[year]")
+def _(db, ctx):
+    from reports import build_stats_report
+    return lambda: build_stats_report(db, ctx.year_start, ctx.last_date)
+
+
+@case("reports.build_class_summary")
+def _(db, ctx):
+    from reports import build_class_summary
+    return lambda: build_class_summary(db, ctx.year_start, ctx.last_date)
+
+
+@case("reports.build_student_attendance")
+def _(db, ctx):
+    from reports import build_student_attendance
+    return lambda: build_student_attendance(db, ctx.year_start, ctx.last_date)
+
+
+@case("parent_reports.build_parent_report")
+def _(db, ctx):
+    from parent_reports import build_parent_report
+    return lambda: build_parent_report(db, ctx.student_id, ctx.year_start, ctx.last_date)
+
+
+@case("parent_reports.plan_batch")
+def _(db, ctx):
+    from parent_reports import plan_batch
+    return lambda: plan_batch(db, per_class=True)
+
+
+def untimed_methods():
+    """Phương thức public của Database chưa có phép đo nào (cần thêm vào CASES)"""
+    covered = {name.split("[")[0] for name in CASES}
+    return sorted(
+        f"Database.{name}" for name, member in inspect.getmembers(Database, inspect.isfunction)
+        if not name.startswith("_") and f"Database.{name}" not in covered
+    )
+
+
+def run_cases(db, repeat, only=None):
+    ctx = Context(db)
+    results = {}
+    for name, (prepare, once) in CASES.items():
+        if only and not any(part in name for part in only):
+            continue
+        samples = []
+        for _ in range(1 if once else repeat):
+            db.cache.invalidate()
+            prepared = prepare(db, ctx)
+            run, cleanup = prepared if isinstance(prepared, tuple) else (prepared, None)
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+            if cleanup is not None:
+                cleanup()
+        results[name] = {
+            "median_ms": round(statistics.median(samples), 3),
+            "min_ms": round(min(samples), 3),
+            "max_ms": round(max(samples), 3),
+            "runs": len(samples),
+        }
+        print(f"  {name:<48} {results[name]['median_ms']:10.2f} ms", file=sys.stderr)
+    return results
+
+
+def dataset_path(data_dir, students, rows, seed):
+    path = os.path.join(data_dir, f"school_{students}x{rows}_seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"Tạo dữ liệu {students} học sinh, {rows} dòng...", file=sys.stderr)
+        info = generate_dataset(path, students, rows, seed)
+        print(f"  xong sau {info['seconds']} s", file=sys.stderr)
+    return path
+
+
+def compare(results, baseline, threshold, noise_ms):
+    """list (quy mô, phép đo, ms baseline, ms hiện tại) chậm hơn baseline quá ngưỡng"""
+    regressions = []
+    for scale, current in results["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if previous is None:
+            continue
+        for name, value in current["results"].items():
+            old = previous["results"].get(name)
+            if old is None:
+                continue
+            before, after = old["median_ms"], value["median_ms"]
+            if after > before * (1 + threshold) and after - before > noise_ms:
+                regressions.append((scale, name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng Database trên dữ liệu giả lập")
+    parser.add_argument("--scale", action="append", type=parse_scale,
+                        help="small / medium / large / HỌC_SINHxSỐ_DÒNG, lặp lại để đo nhiều quy mô (mặc định small)")
+    parser.add_argument("--repeat", type=int, default=5, help="số lần đo mỗi phép (lấy trung vị)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", help="thư mục giữ dữ liệu đã tạo cho lần sau (mặc định: tạo mới mỗi lần)")
+    parser.add_argument("--only", action="append", help="chỉ đo các phép có tên chứa chuỗi này")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file (mặc định in ra stdout)")
+    parser.add_argument("--baseline", help="file kết quả trước để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.25, help="tỉ lệ chậm hơn cho phép (0.25 = 25%%)")
+    parser.add_argument("--noise-ms", type=float, default=1.0, help="bỏ qua chênh lệch nhỏ hơn mức này (ms)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "untimed": untimed_methods(),
+        "scales": {},
+    }
+    if results["untimed"]:
+        print("Chưa có phép đo cho: " + ", ".join(results["untimed"]), file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for label, (students, rows) in args.scale or [parse_scale("small")]:
+            source = dataset_path(data_dir, students, rows, args.seed)
+            # Các phép ghi chạy trên bản sao, file dữ liệu gốc giữ nguyên cho lần sau
+            copy = os.path.join(tmp, "bench.db")
+            shutil.copyfile(source, copy)
+            print(f"[{label}] {students} học sinh, {rows} dòng", file=sys.stderr)
+            db = Database(copy)
+            try:
+                measured = run_cases(db, args.repeat, args.only)
+            finally:
+                db.conn.close()
+            results["scales"][label] = {
+                "students": students,
+                "rows": rows,
+                "results": measured,
+            }
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(copy + suffix):
+                    os.remove(copy + suffix)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.noise_ms)
+        for scale, name, before, after in regressions:
+            ratio = f" (x{after / before:.2f})" if before > 0 else ""
+            print(f"CHẬM HƠN [{scale}] {name}: {before:.2f} ms -> {after:.2f} ms{ratio}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"Không có phép đo nào chậm hơn baseline quá {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
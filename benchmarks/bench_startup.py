@@ -0,0 +1,114 @@
+"""
+Đo thời gian khởi động của main.py: import từng module, lần vẽ đầu tiên, lúc có dữ liệu
+
+    python -m benchmarks.bench_startup [--db hoc_tap.db] [--runs 5] [--top 15] [--json]
+                                       [--max-first-paint MS] [--max-data MS]
+
+Mỗi lần chạy là một tiến trình mới với HOCTAP_STARTUP_TIMING=1 (xem startup_timing.py),
+ứng dụng tự thoát khi đã có dữ liệu. Các mốc tính từ dòng import đầu tiên của main.py;
+"process" là thời gian cả tiến trình kể cả khởi động Python. Bảng import lấy từ một lần
+chạy riêng với python -X importtime (chậm hơn chạy thường nên không tính vào các mốc).
+Vượt --max-first-paint / --max-data (trung vị, ms) thì thoát với mã 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from startup_timing import REPORT_PREFIX
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKS = ["imports", "qt_app", "window", "first_paint", "data"]
+
+
+def run_app(db_path, importtime=False, show=False):
+    """Chạy main.py một lần, trả về (các mốc, thời gian cả tiến trình ms, stderr)"""
+    env = dict(os.environ, HOCTAP_STARTUP_TIMING="1", HOCTAP_STARTUP_EXIT="1", HOCTAP_DB=db_path)
+    if not show:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["main.py"]
+
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    marks = None
+    for line in result.stderr.splitlines():
+        if line.startswith(REPORT_PREFIX):
+            marks = json.loads(line[len(REPORT_PREFIX):])
+    if result.returncode != 0 or marks is None:
+        raise RuntimeError(f"main.py không chạy được (mã {result.returncode}):\n{result.stderr[-2000:]}")
+    return marks, elapsed, result.stderr
+
+
+def parse_importtime(stderr):
+    """Các module import trực tiếp từ main.py (không thụt lề): list (tên, ms riêng, ms tổng) giảm dần"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit() or name.startswith("  "):
+            continue
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return sorted(modules, key=lambda item: item[2], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động của ứng dụng")
+    parser.add_argument("--db", help="file database dùng để đo (được sao chép, mặc định là database rỗng)")
+    parser.add_argument("--runs", type=int, default=5, help="số lần chạy để lấy trung vị")
+    parser.add_argument("--top", type=int, default=15, help="số module import chậm nhất cần in")
+    parser.add_argument("--show", action="store_true", help="hiện cửa sổ thật thay vì QT_QPA_PLATFORM=offscreen")
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    parser.add_argument("--max-first-paint", type=float, help="ngưỡng trung vị first_paint (ms)")
+    parser.add_argument("--max-data", type=float, help="ngưỡng trung vị data (ms)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+        # Lần đầu: tạo / nâng cấp schema, nạp cache của hệ điều hành, không tính
+        run_app(db_path, show=args.show)
+
+        runs = [run_app(db_path, show=args.show) for _ in range(args.runs)]
+        _, _, importtime_stderr = run_app(db_path, importtime=True, show=args.show)
+
+    result = {
+        name: statistics.median(marks.get(name, 0) for marks, _, _ in runs) for name in MARKS
+    }
+    result["process"] = round(statistics.median(elapsed for _, elapsed, _ in runs), 1)
+    imports = parse_importtime(importtime_stderr)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "runs": args.runs,
+            "median_ms": result,
+            "imports": [{"module": name, "self_ms": own, "cumulative_ms": total} for name, own, total in imports],
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"Trung vị {args.runs} lần chạy (ms từ dòng import đầu tiên của main.py):")
+        for name in MARKS + ["process"]:
+            print(f"  {name:<12} {result[name]:9.1f}")
+        print("Import chậm nhất (python -X importtime, ms):")
+        for name, own, total in imports:
+            print(f"  {name:<40} riêng {own:8.1f} | tổng {total:8.1f}")
+
+    failed = [
+        f"{name} {result[name]:.1f} ms > {limit:.1f} ms"
+        for name, limit in (("first_paint", args.max_first_paint), ("data", args.max_data))
+        if limit is not None and result[name] > limit
+    ]
+    if failed:
+        print("Vượt ngưỡng: " + "; ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Tạo database giả lập (tên tiếng Việt, 4 lớp cuối tuần, học sinh học nhiều lớp) để đo hiệu năng
+
+    python -m benchmarks.datagen out.db [--students 5000] [--rows 2000000] [--seed 1]
+
+Mỗi học sinh có một lớp chính, một phần học thêm lớp thứ hai. Mỗi tuần, từng lớp có
+một buổi vào đúng thứ trong lịch học, mọi học sinh đã vào lớp đều có một dòng điểm
+danh (đi học / nghỉ) kèm nhận xét; vài ngày nghỉ lễ mỗi năm không có buổi nào.
+Dừng khi đủ số dòng yêu cầu. Cùng seed thì cùng dữ liệu.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from database import Database
+from registry import STATUS_PRESENT, STATUS_ABSENT
+
+SURNAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng",
+            "Bùi", "Đỗ", "Hồ", "Ngô", "Dương", "Lý", "Đinh", "Trương", "Lâm", "Mai"]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Gia", "Bảo",
+                "Hoài", "Khánh", "Thùy", "Anh", "Xuân", "Thu", "Phương", "Trọng", "Kim", "Nhật"]
+GIVEN_NAMES = ["An", "Bình", "Chi", "Dũng", "Duy", "Giang", "Hà", "Hải", "Hạnh", "Hiếu",
+               "Hòa", "Hùng", "Huy", "Khoa", "Lan", "Linh", "Long", "Mai", "Minh", "Nam",
+               "Ngân", "Nhung", "Phúc", "Phương", "Quân", "Quỳnh", "Sơn", "Tâm", "Thảo", "Thắng",
+               "Trang", "Trí", "Trung", "Tú", "Tuấn", "Uyên", "Việt", "Vy", "Yến", "Đạt"]
+TOPICS = ["biến và kiểu dữ liệu", "câu lệnh if", "vòng lặp for", "vòng lặp while", "hàm và tham số",
+          "danh sách (list)", "từ điển (dict)", "chuỗi ký tự", "đọc ghi file", "xử lý ngoại lệ",
+          "lập trình hướng đối tượng", "đệ quy", "sắp xếp và tìm kiếm", "thư viện turtle", "pygame"]
+REMARKS = ["Hiểu bài, làm đủ bài tập.", "Còn chậm, cần luyện thêm ở nhà.", "Tích cực phát biểu.",
+           "Làm bài nhanh, giúp bạn bên cạnh.", "Hay quên dấu hai chấm và thụt lề.",
+           "Cần tập trung hơn trong giờ học.", "Tiến bộ rõ so với buổi trước."]
+ABSENT_REASONS = ["Nghỉ có phép.", "Nghỉ ốm.", "Không báo trước."]
+STUDENT_NOTES = ["Cần chú ý phần vòng lặp", "Phụ huynh muốn nhận báo cáo hằng tháng",
+                 "Đã học Scratch trước đó", "Hay đi muộn", "Thi học sinh giỏi cấp quận"]
+STREETS = ["Lê Lợi", "Trần Hưng Đạo", "Nguyễn Huệ", "Hai Bà Trưng", "Lý Thường Kiệt", "Điện Biên Phủ"]
+PLACEHOLDER_CONTENT = "(Chưa có nhận xét cuối buổi)"
+
+# Tỉ lệ học sinh học thêm một lớp, đi học, có nhận xét riêng, được đánh dấu
+MULTI_CLASS_RATIO = 0.3
+PRESENT_RATIO = 0.88
+COMMENT_RATIO = 0.6
+HIGHLIGHT_RATIO = 0.04
+
+# Các trigger chỉ để giữ chỉ mục tìm kiếm / bảng tổng hợp đồng bộ khi thêm từng dòng.
+# Khi nạp hàng loạt thì tạm bỏ rồi lập lại một lần (nhanh hơn nhiều so với chạy từng dòng)
+_BULK_TRIGGERS = ("progress_fts_insert", "progress_rollup_insert")
+_CHUNK = 50000
+
+
+def student_names(rng, count):
+    """count tên khác nhau (progress phân biệt học sinh theo tên trong từng buổi)"""
+    capacity = len(SURNAMES) * len(MIDDLE_NAMES) * len(GIVEN_NAMES) * (len(MIDDLE_NAMES) + 1)
+    if count > capacity // 2:
+        raise ValueError(f"Tối đa {capacity // 2} học sinh")
+    names = set()
+    result = []
+    while len(result) < count:
+        parts = [rng.choice(SURNAMES), rng.choice(MIDDLE_NAMES)]
+        if rng.random() < 0.3:
+            parts.append(rng.choice(MIDDLE_NAMES))
+        parts.append(rng.choice(GIVEN_NAMES))
+        name = " ".join(parts)
+        if name not in names:
+            names.add(name)
+            result.append(name)
+    return result
+
+
+def holidays(year):
+    """Ngày nghỉ lễ trong năm: Tết (tuần đầu tháng 2), 30/4 - 1/5, 2/9"""
+    days = {date(year, 2, 1) + timedelta(days=i) for i in range(7)}
+    days.update((date(year, 4, 30), date(year, 5, 1), date(year, 9, 2)))
+    return days
+
+
+def generate_dataset(path, students=5000, rows=2000000, seed=1, start_date="2020-09-05"):
+    """Tạo file database mới tại path, trả về dict mô tả dữ liệu đã tạo"""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    db = Database(path)
+    classes = db.registry.class_names()
+    schedule = db.get_class_schedule()
+
+    # Hồ sơ học sinh: lớp chính và (một phần) lớp học thêm, tuần bắt đầu vào học
+    first_day = date.fromisoformat(start_date)
+    names = student_names(rng, students)
+    enrollments = []
+    profiles = []
+    for i, name in enumerate(names):
+        main_class = rng.choice(classes)
+        enrolled = [main_class]
+        if rng.random() < MULTI_CLASS_RATIO:
+            enrolled.append(rng.choice([c for c in classes if c != main_class]))
+        join_week = int(rng.random() ** 2 * 40)
+        enrollments.append((name, enrolled, join_week))
+        profiles.append((
+            f"HS{i + 1:05d}", name, f"09{rng.randrange(10 ** 8):08d}",
+            f"{rng.choice(SURNAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)}",
+            (date(2010, 1, 1) + timedelta(days=rng.randrange(365 * 6))).isoformat(),
+            f"{rng.randrange(1, 300)} {rng.choice(STREETS)}",
+            rng.choice(STUDENT_NOTES) if rng.random() < 0.3 else "",
+            main_class,
+            (first_day + timedelta(weeks=join_week)).isoformat(),
+        ))
+    with db.conn:
+        db.conn.executemany(
+            """INSERT INTO students (student_id, name, phone, parent_name, date_of_birth, address,
+                                     notes, class_name, registration_date)
+               VALUES (?,?,?,?,?,?,?,?,?)""", profiles)
+    keys = dict(db.conn.execute("SELECT name, student_key FROM students"))
+
+    cursor = db.conn.cursor()
+    saved_triggers = [
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (name,)).fetchone()[0]
+        for name in _BULK_TRIGGERS
+    ]
+    cancelled = set()
+    written = 0
+    last_day = first_day
+    try:
+        with db.conn:
+            for name in _BULK_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {name}")
+            # Lịch theo tuần: (lớp, thứ trong tuần 0 = thứ Hai) của mỗi buổi
+            sessions = [(c, day) for c in classes for day in schedule.get(c, [])]
+            if not sessions:
+                raise ValueError("Chưa có lịch học cho lớp nào")
+            monday = first_day - timedelta(days=first_day.weekday())
+            batch = []
+            week = 0
+            while written < rows:
+                for class_name, day in sessions:
+                    session_date = monday + timedelta(weeks=week, days=day)
+                    if session_date < first_day:
+                        continue
+                    if session_date in holidays(session_date.year):
+                        cancelled.add(session_date)
+                        continue
+                    iso = session_date.isoformat()
+                    class_id = db.registry.class_id(class_name)
+                    for name, enrolled, join_week in enrollments:
+                        if class_name not in enrolled or join_week > week or written >= rows:
+                            continue
+                        if rng.random() < PRESENT_RATIO:
+                            status = STATUS_PRESENT
+                            content = (f"Học {rng.choice(TOPICS)}. {rng.choice(REMARKS)}"
+                                       if rng.random() < COMMENT_RATIO else PLACEHOLDER_CONTENT)
+                        else:
+                            status = STATUS_ABSENT
+                            content = rng.choice(ABSENT_REASONS) if rng.random() < 0.5 else PLACEHOLDER_CONTENT
+                        batch.append((iso, name, content, int(rng.random() < HIGHLIGHT_RATIO),
+                                      keys[name], class_id, status))
+                        written += 1
+                        last_day = session_date
+                    if len(batch) >= _CHUNK:
+                        cursor.executemany(
+                            """INSERT INTO progress (date, name, content, is_highlighted, student_key, class_id, status_id)
+                               VALUES (?,?,?,?,?,?,?)""", batch)
+                        batch = []
+                week += 1
+            cursor.executemany(
+                """INSERT INTO progress (date, name, content, is_highlighted, student_key, class_id, status_id)
+                   VALUES (?,?,?,?,?,?,?)""", batch)
+            cursor.executemany(
+                "INSERT INTO cancelled_sessions (date, class_name, reason) VALUES (?, NULL, 'Nghỉ lễ')",
+                [(d.isoformat(),) for d in sorted(cancelled) if d <= last_day]
+            )
+    finally:
+        with db.conn:
+            for sql in saved_triggers:
+                cursor.execute(sql)
+    # Các dòng trên chưa có name_key / search_body: tính một lần cùng chỉ mục tìm kiếm
+    db.rebuild_search_index()
+    db.rebuild_attendance_rollup()
+    db.conn.execute("ANALYZE")
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.conn.close()
+
+    return {
+        "students": students,
+        "rows": written,
+        "seed": seed,
+        "first_date": first_day.isoformat(),
+        "last_date": last_day.isoformat(),
+        "multi_class_students": sum(len(enrolled) > 1 for _, enrolled, _ in enrollments),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo database giả lập để đo hiệu năng")
+    parser.add_argument("path", help="file database cần tạo (chưa tồn tại)")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=2000000, help="số dòng progress")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-date", default="2020-09-05", help="ngày học đầu tiên YYYY-MM-DD")
+    args = parser.parse_args()
+    info = generate_dataset(args.path, args.students, args.rows, args.seed, args.start_date)
+    for key, value in info.items():
+        print(f"{key:<22} {value}")
+
+
+if __name__ == "__main__":
+    main()
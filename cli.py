@@ -0,0 +1,195 @@
+"""
+Dòng lệnh không cần giao diện (không import Qt): thống kê, xuất / nhập CSV, kiểm tra database
+
+    python cli.py stats --from 2025-01-01 --to 2025-01-31 [--student HS001] [--class "Sáng T7"]
+    python cli.py summary --from 2025-01-01 --to 2025-01-31
+    python cli.py export progress out.csv [--from ... --to ...] [--name ...] [--class ...]
+    python cli.py export students out.xlsx
+    python cli.py import data.csv [--overwrite] [--allow-unknown-names]
+    python cli.py check [--full] [--repair]
+
+Kết quả in ra stdout dạng JSON (--pretty để thụt lề). Lỗi in {"error": ...} và
+thoát với mã 1; "check" cũng thoát mã 1 khi phát hiện vấn đề.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import settings
+from database import Database, connect
+from migrations import SCHEMA_VERSION, get_schema_version
+from registry import ALL_CLASSES
+from reports import build_class_summary, build_student_attendance
+
+
+def _date(text):
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ngày không hợp lệ (cần YYYY-MM-DD): '{text}'")
+
+
+def _open(args, read_only=True):
+    # Lệnh chỉ đọc dùng kết nối chỉ đọc, chạy song song với ứng dụng được
+    if not os.path.exists(args.db):
+        raise ValueError(f"Không tìm thấy file database: {args.db}")
+    if not read_only:
+        return _upgraded(Database(args.db, args.profile))
+    conn = connect(args.db, args.profile, read_only=True)
+    outdated = get_schema_version(conn) < SCHEMA_VERSION
+    conn.close()
+    if outdated:
+        # File cũ chưa nâng cấp: mở ghi một lần để nâng cấp schema như khi mở ứng dụng
+        _upgraded(Database(args.db, args.profile)).conn.close()
+    return Database(args.db, args.profile, read_only=True)
+
+
+def _upgraded(db):
+    # Thông báo sau khi nâng cấp in ra stderr, stdout chỉ có kết quả JSON
+    for message in db.upgrade_warnings:
+        print(message, file=sys.stderr)
+    return db
+
+
+def _range(args):
+    if args.start > args.end:
+        raise ValueError("--from phải trước hoặc bằng --to")
+    return args.start, args.end
+
+
+def cmd_stats(args):
+    start, end = _range(args)
+    # Chỉ tính bảng cần in, không sắp xếp bảng chi tiết như build_stats_report
+    students = build_student_attendance(_open(args), start, end)
+    if args.student:
+        students = [item for item in students if item.student_id == args.student]
+        if not students:
+            raise ValueError(f"Không có hồ sơ học sinh mã '{args.student}'")
+    if args.class_name:
+        students = [item for item in students if item.class_name == args.class_name]
+    return {
+        "start_date": start,
+        "end_date": end,
+        "students": [item._asdict() for item in students],
+    }
+
+
+def cmd_summary(args):
+    start, end = _range(args)
+    summary = build_class_summary(_open(args), start, end)
+    return {
+        "start_date": start,
+        "end_date": end,
+        "classes": [dict(item._asdict(), percent=round(item.percent, 1)) for item in summary],
+    }
+
+
+def cmd_export(args):
+    # Chỉ import khi dùng đến để các lệnh khác khởi động nhanh
+    from exporters import export_progress, export_students
+
+    db = _open(args)
+    if args.table == "students":
+        count = export_students(db, args.path)
+    else:
+        filters = {"name": args.name, "class_name": args.class_name or ALL_CLASSES}
+        if args.start or args.end:
+            filters.update(start_date=args.start, end_date=args.end)
+        count = export_progress(db, args.path, **filters)
+    return {"table": args.table, "path": args.path, "rows": count}
+
+
+def cmd_import(args):
+    from importers import import_progress_csv, write_import_report
+
+    db = _open(args, read_only=False)
+    try:
+        report = import_progress_csv(db, args.path, args.overwrite, args.allow_unknown_names)
+    finally:
+        db.conn.close()
+    if args.report:
+        write_import_report(report, args.report)
+    return {
+        "accepted": len(report.accepted),
+        "updated": len(report.updated),
+        "skipped": [{"line": line, "reason": reason} for line, reason in report.skipped],
+        "rejected": [{"line": line, "reason": reason} for line, reason in report.rejected],
+    }
+
+
+def cmd_check(args):
+    # Kiểm tra chỉ mục FTS5 cần kết nối ghi; --repair lập lại bảng tổng hợp và chỉ mục tìm kiếm
+    db = _open(args, read_only=False)
+    try:
+        result = db.check_integrity(full=args.full)
+        if args.repair and (result["rollup_mismatches"] or result["search_index"] != "ok"
+                            or result["missing_text_keys"]):
+            db.rebuild_attendance_rollup()
+            db.rebuild_search_index()
+            result = dict(db.check_integrity(full=args.full), repaired=True)
+    finally:
+        db.conn.close()
+    result["ok"] = (result["sqlite"] == ["ok"] and not result["rollup_mismatches"]
+                    and result["search_index"] == "ok" and not result["missing_text_keys"])
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=settings.DB_NAME, help=f"file database (mặc định {settings.DB_NAME})")
+    parser.add_argument("--profile", default=None, help="chế độ kết nối: throughput / durability")
+    parser.add_argument("--pretty", action="store_true", help="in JSON có thụt lề")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def date_range(p, required):
+        p.add_argument("--from", dest="start", type=_date, required=required, help="từ ngày YYYY-MM-DD")
+        p.add_argument("--to", dest="end", type=_date, required=required, help="đến ngày YYYY-MM-DD")
+
+    p = sub.add_parser("stats", help="số buổi đi học / nghỉ của từng học sinh trong khoảng ngày")
+    date_range(p, True)
+    p.add_argument("--student", help="chỉ học sinh có mã này")
+    p.add_argument("--class", dest="class_name", help="chỉ học sinh của lớp này")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("summary", help="tỉ lệ chuyên cần theo lớp trong khoảng ngày")
+    date_range(p, True)
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("export", help="xuất bảng ra .csv hoặc .xlsx (theo đuôi file)")
+    p.add_argument("table", choices=["progress", "students"])
+    p.add_argument("path")
+    date_range(p, False)
+    p.add_argument("--name", default="", help="lọc theo tên (progress)")
+    p.add_argument("--class", dest="class_name", help="lọc theo lớp (progress)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="nhập điểm danh / nhận xét từ CSV")
+    p.add_argument("path")
+    p.add_argument("--overwrite", action="store_true", help="ghi đè buổi đã có thay vì bỏ qua")
+    p.add_argument("--allow-unknown-names", action="store_true", help="nhận cả tên chưa có hồ sơ")
+    p.add_argument("--report", help="ghi kết quả từng dòng ra file CSV này")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("check", help="kiểm tra toàn vẹn database, bảng tổng hợp và chỉ mục tìm kiếm")
+    p.add_argument("--full", action="store_true", help="PRAGMA integrity_check thay cho quick_check")
+    p.add_argument("--repair", action="store_true", help="lập lại bảng tổng hợp / chỉ mục nếu lệch")
+    p.set_defaults(func=cmd_check)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        result = args.func(args)
+        code = 1 if result.get("ok") is False else 0
+    except Exception as e:
+        result, code = {"error": str(e)}, 1
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
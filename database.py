@@ -1,11 +1,144 @@
+import functools
+import json
+import re
 import sqlite3
 from datetime import datetime
 import calendar
+from collections import namedtuple
+from pathlib import Path
+
+from migrations import (migrate, get_schema_version, upgrade_warnings, populate_search_index,
+                        populate_attendance_rollup, populate_text_keys, set_text_key_versions,
+                        text_keys_outdated, add_name_tokens, index_new_progress, suspended_triggers,
+                        PROGRESS_INSERT_TRIGGERS, TEXT_KEY_TRIGGERS)
+from textnorm import fold, name_suffixes, name_sort_key, search_text
+from registry import Registry, ALL_CLASSES, STATUS_PRESENT, STATUS_ABSENT
+from query_cache import shared_cache
+from query_stats import STATS as QUERY_STATS, TimedConnection
+import settings
+
+# Kết quả của các thao tác ghi theo lô
+# ids: id các dòng progress đã được ghi / xóa, để giao diện cập nhật đúng các dòng đó
+WriteResult = namedtuple("WriteResult", "inserted updated deleted skipped ids", defaults=(0, 0, 0, 0, ()))
+
+# Các chế độ kết nối, chọn bằng settings.DB_PROFILE
+DB_PROFILES = {
+    # Ưu tiên an toàn dữ liệu: fsync ở mỗi commit
+    "durability": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+    },
+    # Ưu tiên tốc độ: WAL chỉ fsync khi checkpoint, vẫn không hỏng file khi mất điện
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+    },
+}
+
+
+def connect(db_name=settings.DB_NAME, profile=None, read_only=False):
+    """
+    Mở kết nối SQLite với cấu hình chung cho toàn bộ ứng dụng
+    read_only=True: kết nối chỉ đọc (dùng cho các luồng truy vấn nền)
+    """
+    profile = profile or settings.DB_PROFILE
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Chế độ kết nối không hợp lệ: {profile}")
+    options = DB_PROFILES[profile]
+
+    timeout = settings.DB_BUSY_TIMEOUT_MS / 1000
+    # Đo thời gian từng câu lệnh chỉ khi bật, không thì dùng kết nối sqlite3 thường
+    factory = TimedConnection if settings.QUERY_STATS else sqlite3.Connection
+    if read_only:
+        uri = Path(db_name).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, factory=factory)
+    else:
+        conn = sqlite3.connect(db_name, timeout=timeout, factory=factory)
+        conn.execute(f"PRAGMA journal_mode = {options['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {options['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = -{int(settings.DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    register_functions(conn)
+    return conn
+
+
+def register_functions(conn):
+    """
+    Các hàm SQL mà trigger / cột tính sẵn của các bước nâng cấp 4 - 9 gọi, chỉ cần khi
+    nâng cấp file cũ. Từ bước 10 schema không gọi hàm Python nào (xem đầu migrations.py)
+    """
+    conn.create_function("vn_search_text", 1, search_text, deterministic=True)
+    conn.create_function("vn_fold", 1, fold, deterministic=True)
+    conn.create_function("vn_sort_key", 1, name_sort_key, deterministic=True)
+    conn.create_function("vn_name_tokens", 1, lambda name: json.dumps(name_suffixes(name)), deterministic=True)
+
+
+# Cột trả về cho giao diện; không dùng SELECT * vì bảng còn các cột tính sẵn (name_key, search_body...)
+# và progress chỉ lưu mã lớp / trạng thái, tên được đọc từ bảng danh mục
+PROGRESS_COLUMNS = ("progress.id, progress.date, progress.name, "
+                    "(SELECT name FROM classes WHERE id = progress.class_id), "
+                    "(SELECT name FROM statuses WHERE id = progress.status_id), "
+                    "progress.content, progress.is_highlighted")
+STUDENT_COLUMNS = ("students.student_id, students.name, students.phone, students.parent_name, "
+                   "students.date_of_birth, students.address, students.notes, students.class_name, "
+                   "students.registration_date")
+
+
+def cached_read(method):
+    """Hàm đọc có bộ đệm: kết quả lưu trong self.cache theo (tên hàm, tham số)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._check_external_writes()
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # Tham số không băm được (ví dụ list groups) thì đọc thẳng
+            return method(self, *args, **kwargs)
+
+        found, value = self.cache.get(key)
+        if not found:
+            generation = self.cache.generation
+            value = method(self, *args, **kwargs)
+            self.cache.put(key, generation, value)
+        # Trả bản sao để nơi gọi có sửa list / dict cũng không làm hỏng bộ đệm
+        if isinstance(value, list):
+            return list(value)
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+    return wrapper
+
+
+def writes(method):
+    """Hàm ghi: xong (kể cả khi lỗi) thì bỏ toàn bộ kết quả đã đệm"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.cache.invalidate()
+    return wrapper
+
 
 class Database:
-    def __init__(self, db_name='hoc_tap.db'):
-        self.conn = sqlite3.connect(db_name)
-        self.init_db()
+    def __init__(self, db_name=settings.DB_NAME, profile=None, read_only=False):
+        self.db_name = db_name
+        self.profile = profile or settings.DB_PROFILE
+        self.read_only = read_only
+        self.conn = connect(db_name, self.profile, read_only)
+
+        # Bộ đệm dùng chung với các Database khác cùng file. Lần ghi từ tiến trình khác
+        # được phát hiện qua PRAGMA data_version ở lần đọc kế tiếp của mỗi kết nối
+        self.cache = shared_cache(db_name, settings.QUERY_CACHE_SIZE)
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        # Thông báo cho người dùng sau khi nâng cấp schema (migrations.upgrade_warnings)
+        self.upgrade_warnings = []
+        # Kết nối chỉ đọc không tạo bảng / nâng cấp schema
+        if not read_only:
+            self.init_db()
+        self.reload_registry()
 
     def init_db(self):
         cursor = self.conn.cursor()
@@ -27,109 +160,569 @@ class Database:
                             registration_date TEXT)''')
         self.conn.commit()
 
-    def get_filtered_progress(self, name="", class_name="Tất cả lớp", date=None):
+        # Nâng cấp schema (index, bảng mới...) cho các file database cũ
+        from_version = get_schema_version(self.conn)
+        migrate(self.conn)
+        self.upgrade_warnings = upgrade_warnings(self.conn, from_version)
+
+        # Tính lại các cột tính sẵn và chỉ mục khi đổi SEARCH_FOLD_DIACRITICS / textnorm.KEY_VERSION
+        if text_keys_outdated(self.conn):
+            self.rebuild_search_index()
+
+    def _check_external_writes(self):
+        """Kết nối / tiến trình khác đã ghi vào database thì bỏ toàn bộ bộ đệm"""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self.cache.invalidate()
+
+    def cache_stats(self):
+        """Số lần trúng / trượt bộ đệm, số kết quả đang lưu, generation hiện tại"""
+        return self.cache.stats()
+
+    @staticmethod
+    def query_stats():
+        """
+        Thời gian chạy theo dạng câu lệnh của mọi kết nối trong tiến trình (list dict, chậm nhất trước)
+        Rỗng nếu chưa bật settings.QUERY_STATS
+        """
+        return QUERY_STATS.snapshot()
+
+    @staticmethod
+    def recent_queries():
+        """Các câu lệnh vừa chạy (RecentQuery: time, shape, ms, rows), mới nhất trước"""
+        return QUERY_STATS.recent()
+
+    def reload_registry(self):
+        """Đọc lại danh mục lớp / trạng thái vào self.registry"""
         cursor = self.conn.cursor()
-        query = "SELECT * FROM progress WHERE name LIKE ?"
-        params = [f"%{name}%"]
-        
-        if class_name != "Tất cả lớp":
-            query += " AND class_name = ?"
+        cursor.execute("SELECT id, name FROM classes ORDER BY position, id")
+        classes = cursor.fetchall()
+        cursor.execute("SELECT id, name FROM statuses ORDER BY id")
+        self.registry = Registry(classes, cursor.fetchall())
+
+    @writes
+    def add_class(self, class_name, weekdays=()):
+        """Thêm lớp mới vào danh mục (và lịch học nếu có weekdays), trả về mã lớp"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "INSERT OR IGNORE INTO classes (name, position) SELECT ?, IFNULL(MAX(position), 0) + 1 FROM classes",
+                (class_name,)
+            )
+        if weekdays:
+            self.set_class_schedule(class_name, weekdays)
+        self.reload_registry()
+        return self.registry.class_id(class_name)
+
+    def _class_code(self, class_name):
+        """
+        Mã lớp để ghi vào progress; lớp không có trong danh mục báo ValueError
+        (lớp mới chỉ được thêm rõ ràng bằng add_class, không tự thêm khi gõ sai tên)
+        """
+        if class_name is None:
+            return None
+        class_id = self.registry.class_id(class_name)
+        if class_id is None:
+            # Có thể vừa được thêm qua kết nối khác
+            self.reload_registry()
+            class_id = self.registry.class_id(class_name)
+        if class_id is None:
+            raise ValueError(f"Lớp không có trong danh mục: {class_name}")
+        return class_id
+
+    def _status_code(self, status):
+        """Mã trạng thái để ghi vào progress; trạng thái không có trong danh mục báo ValueError"""
+        if status is None:
+            return None
+        status_id = self.registry.status_id(status)
+        if status_id is None:
+            raise ValueError(f"Trạng thái không hợp lệ: {status}")
+        return status_id
+
+    @writes
+    def rebuild_search_index(self):
+        """
+        Tính lại các cột tính sẵn (name_key, sort_key, search_body, name_tokens) rồi lập lại
+        chỉ mục tìm kiếm toàn văn (progress.content, students.notes)
+        """
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            with suspended_triggers(cursor, TEXT_KEY_TRIGGERS):
+                populate_text_keys(cursor)
+            populate_search_index(cursor)
+            set_text_key_versions(cursor)
+
+    @writes
+    def rebuild_attendance_rollup(self):
+        """Tính lại bảng attendance_rollup từ progress (khi nghi ngờ bảng tổng hợp bị lệch)"""
+        with self.conn:
+            populate_attendance_rollup(self.conn.cursor())
+
+    def check_integrity(self, full=False):
+        """
+        Kiểm tra database, trả về dict (không sửa gì):
+        sqlite: kết quả PRAGMA quick_check (full=True: integrity_check), ["ok"] nếu không lỗi
+        schema_version, rollup_mismatches: số nhóm attendance_rollup lệch so với progress,
+        unlinked_sessions: số buổi trùng tên hồ sơ mà chưa gắn student_key,
+        search_index: "ok" hoặc thông báo lỗi của FTS5 integrity-check (bỏ qua với kết nối chỉ đọc),
+        removed_duplicates: số dòng trùng buổi đã gỡ khi nâng cấp lên v3 (lưu trong progress_duplicates_v3),
+        missing_text_keys: số dòng progress / students chưa có name_key / search_body (ghi từ client khác)
+        """
+        cursor = self.conn.cursor()
+        pragma = "integrity_check" if full else "quick_check"
+        sqlite_result = [row[0] for row in cursor.execute(f"PRAGMA {pragma}").fetchall()]
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+
+        # So bảng tổng hợp với số liệu tính lại từ progress (hai chiều)
+        cursor.execute(
+            """WITH fresh AS (
+                   SELECT IFNULL(student_key, 0), IFNULL(name, ''), IFNULL(class_id, 0),
+                          IFNULL(substr(date, 1, 7), ''), SUM(status_id IS 1), SUM(status_id IS 2), COUNT(*)
+                   FROM progress GROUP BY 1, 2, 3, 4),
+               stored AS (
+                   SELECT student_key, name, class_id, month, attended, absent, entries FROM attendance_rollup)
+               SELECT (SELECT COUNT(*) FROM (SELECT * FROM fresh EXCEPT SELECT * FROM stored))
+                    + (SELECT COUNT(*) FROM (SELECT * FROM stored EXCEPT SELECT * FROM fresh))"""
+        )
+        rollup_mismatches = cursor.fetchone()[0]
+
+        cursor.execute(
+            """SELECT COUNT(*) FROM progress
+               WHERE student_key IS NULL AND name IN (SELECT name FROM students)"""
+        )
+        unlinked = cursor.fetchone()[0]
+
+        cursor.execute(
+            """SELECT (SELECT COUNT(*) FROM progress WHERE search_body IS NULL OR name_key IS NULL AND name IS NOT NULL)
+                    + (SELECT COUNT(*) FROM students WHERE search_body IS NULL OR name_key IS NULL)"""
+        )
+        missing_text_keys = cursor.fetchone()[0]
+
+        has_duplicates = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'progress_duplicates_v3'").fetchone()
+        removed_duplicates = (cursor.execute("SELECT COUNT(*) FROM progress_duplicates_v3").fetchone()[0]
+                              if has_duplicates else 0)
+
+        search_index = "skipped"
+        if not self.read_only:
+            try:
+                with self.conn:
+                    cursor.execute("INSERT INTO progress_fts (progress_fts) VALUES ('integrity-check')")
+                    cursor.execute("INSERT INTO student_notes_fts (student_notes_fts) VALUES ('integrity-check')")
+                search_index = "ok"
+            except sqlite3.DatabaseError as e:
+                search_index = str(e)
+
+        return {
+            "sqlite": sqlite_result,
+            "schema_version": version,
+            "rollup_mismatches": rollup_mismatches,
+            "unlinked_sessions": unlinked,
+            "search_index": search_index,
+            "removed_duplicates": removed_duplicates,
+            "missing_text_keys": missing_text_keys,
+        }
+
+    def _progress_filter(self, name="", class_name=ALL_CLASSES, date=None, start_date=None, end_date=None):
+        """
+        Điều kiện WHERE dùng chung cho các hàm đọc bảng tiến độ
+        start_date / end_date: khoảng ngày (YYYY-MM-DD, tính cả hai đầu), None = không giới hạn
+        """
+        query = "1=1"
+        params = []
+
+        # Không lọc theo tên thì bỏ điều kiện tên để dùng được index (date, id)
+        name_match = self._name_match(name)
+        if name_match:
+            query += f" AND name_key IN ({name_match[0]})"
+            params.extend(name_match[1])
+        if class_name != ALL_CLASSES:
+            # Tra mã lớp trong SQL: danh mục của kết nối ở luồng nền có thể chưa có lớp vừa thêm.
+            # Lớp không có trong danh mục: class_id = NULL, không khớp dòng nào
+            query += " AND class_id = (SELECT id FROM classes WHERE name = ?)"
             params.append(class_name)
         if date:
             query += " AND date = ?"
             params.append(date)
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        return query, params
 
-        query += " ORDER BY date DESC, id DESC"
-        cursor.execute(query, params)
-        return cursor.fetchall()
+    @staticmethod
+    def _name_match(keyword):
+        """
+        Truy vấn con lấy các name_key có một chữ bắt đầu bằng keyword (không phân biệt dấu)
+        "nguyen" khớp "Nguyễn Văn An", "van a" khớp "Nguyễn Văn An"; None nếu keyword rỗng
+        """
+        key = " ".join(fold(keyword).split())
+        if not key:
+            return None
+        # Truy vấn khoảng [key, key + ký tự lớn nhất) dùng được khóa chính của name_tokens
+        return ("SELECT name_key FROM name_tokens WHERE token >= ? AND token < ?",
+                [key, key + "\U0010ffff"])
 
-    def get_distinct_student_names(self):
+    def get_filtered_progress(self, name="", class_name=ALL_CLASSES, date=None):
+        return self.cursor_filtered_progress(name, class_name, date).fetchall()
+
+    def cursor_filtered_progress(self, name="", class_name=ALL_CLASSES, date=None, start_date=None, end_date=None):
+        """Như get_filtered_progress nhưng trả về cursor để đọc dần từng phần"""
+        where, params = self._progress_filter(name, class_name, date, start_date, end_date)
         cursor = self.conn.cursor()
-        cursor.execute("SELECT DISTINCT name FROM progress")
-        return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT {PROGRESS_COLUMNS} FROM progress WHERE {where} ORDER BY date DESC, id DESC", params)
+        return cursor
+
+    def count_filtered_progress(self, name="", class_name=ALL_CLASSES, date=None, start_date=None, end_date=None):
+        """Số dòng của cursor_filtered_progress (dùng cho thanh tiến độ khi xuất dữ liệu)"""
+        where, params = self._progress_filter(name, class_name, date, start_date, end_date)
+        return self.conn.execute(f"SELECT COUNT(*) FROM progress WHERE {where}", params).fetchone()[0]
+
+    # Các hàm đọc theo trang và tìm kiếm không qua bộ đệm: mỗi trang / bộ lọc / chuỗi tìm là
+    # một khóa riêng, sẽ đẩy các kết quả thống kê (tốn kém hơn nhiều) ra khỏi bộ đệm
+    def get_progress_page(self, name="", class_name=ALL_CLASSES, date=None, page_size=200, after=None):
+        """
+        Đọc một trang theo thứ tự ORDER BY date DESC, id DESC
+        after: token (date, id) của dòng cuối trang trước, None = trang đầu
+        Trả về (rows, next_token); next_token None khi đã hết dữ liệu
+        Dùng keyset (date, id) thay cho OFFSET nên trang thứ N nhanh như trang đầu
+        """
+        where, params = self._progress_filter(name, class_name, date)
+        if after is not None:
+            where += " AND (date, id) < (?, ?)"
+            params.extend(after)
 
-    def insert_entry(self, date, name, class_name, status, content, is_highlighted):
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO progress (date, name, class_name, status, content, is_highlighted) VALUES (?,?,?,?,?,?)",
-            (date, name, class_name, status, content, is_highlighted)
+            f"SELECT {PROGRESS_COLUMNS} FROM progress WHERE {where} ORDER BY date DESC, id DESC LIMIT ?",
+            params + [page_size]
         )
-        self.conn.commit()
+        rows = cursor.fetchall()
+        next_token = (rows[-1][1], rows[-1][0]) if len(rows) == page_size else None
+        return rows, next_token
 
-    def update_entry(self, entry_id, date, name, class_name, status, content, is_highlighted):
+    def iter_filtered_progress(self, name="", class_name=ALL_CLASSES, date=None, page_size=1000):
+        """Duyệt toàn bộ kết quả lọc theo từng trang (dùng khi xuất dữ liệu), bộ nhớ không tăng theo số dòng"""
+        after = None
+        while True:
+            rows, after = self.get_progress_page(name, class_name, date, page_size, after)
+            yield from rows
+            if after is None:
+                break
+
+    # =========================
+    # TÌM KIẾM NỘI DUNG
+    # =========================
+
+    @staticmethod
+    def _fts_query(text):
+        """Đổi chuỗi người dùng nhập thành câu MATCH: mọi từ phải có, từ cuối khớp tiền tố"""
+        terms = re.findall(r"\w+", search_text(text))
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search_content(self, query, name="", class_name=ALL_CLASSES, date=None, limit=None):
+        """
+        Tìm trong nội dung bài học / nhận xét, kết hợp bộ lọc như get_filtered_progress
+        Trả về các dòng progress, xếp theo mức độ liên quan (bm25) trong số
+        settings.SEARCH_CANDIDATES buổi khớp mới nhất
+        """
+        match = self._fts_query(query)
+        if match is None:
+            return []
+        match = f"body: ({match})"
+        # Lọc tên trong chỉ mục (cột name): như _name_match, các chữ liền nhau, chữ cuối khớp tiền tố
+        name_words = re.findall(r"\w+", fold(name))
+        if name_words:
+            match += f' AND name: "{" ".join(name_words)}"*'
+        params = [match]
+        # Lọc một ngày: giới hạn rowid trong khoảng id của ngày đó để chỉ mục bỏ qua các dòng khác
+        id_range = ""
+        if date:
+            id_range = ("AND progress_fts.rowid BETWEEN (SELECT MIN(id) FROM progress WHERE date = ?)"
+                        " AND (SELECT MAX(id) FROM progress WHERE date = ?)")
+            params += [date, date]
+        where, filter_params = self._progress_filter(class_name=class_name, date=date)
+        params += filter_params
         cursor = self.conn.cursor()
+        # Lấy id các buổi khớp mới nhất theo thứ tự rowid của chỉ mục (không phải sắp xếp),
+        # rồi mới xếp hạng nhóm nhỏ đó. CROSS JOIN giữ progress_fts ở vòng ngoài: tra MATCH
+        # cho từng dòng progress sẽ tính lại bm25 trên toàn chỉ mục mỗi lần.
+        # Trọng số 0 cho cột name: tên chỉ để lọc
         cursor.execute(
-            "UPDATE progress SET date=?, name=?, class_name=?, status=?, content=?, is_highlighted=? WHERE id=?",
-            (date, name, class_name, status, content, is_highlighted, entry_id)
+            f"""SELECT {PROGRESS_COLUMNS} FROM (
+                    SELECT progress_fts.rowid AS id, bm25(progress_fts, 1.0, 0.0) AS score
+                    FROM progress_fts
+                    CROSS JOIN progress ON progress.id = progress_fts.rowid
+                    WHERE progress_fts MATCH ? {id_range} AND {where}
+                    ORDER BY progress_fts.rowid DESC
+                    LIMIT ?) AS hit
+                JOIN progress ON progress.id = hit.id
+                ORDER BY hit.score, progress.date DESC
+                LIMIT ?""",
+            params + [settings.SEARCH_CANDIDATES, limit or settings.SEARCH_LIMIT]
         )
-        self.conn.commit()
+        return cursor.fetchall()
+
+    def search_student_notes(self, query, limit=None):
+        """Tìm học sinh theo ghi chú trong hồ sơ, xếp theo mức độ liên quan"""
+        match = self._fts_query(query)
+        if match is None:
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"""SELECT {STUDENT_COLUMNS} FROM student_notes_fts
+               JOIN students ON students.student_id = student_notes_fts.student_id
+               WHERE student_notes_fts MATCH ?
+               ORDER BY student_notes_fts.rank
+               LIMIT ?""",
+            (match, limit or settings.SEARCH_LIMIT)
+        )
+        return cursor.fetchall()
+
+    @cached_read
+    def get_distinct_student_names(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT DISTINCT name FROM progress")
+        return sorted((row[0] for row in cursor.fetchall()), key=name_sort_key)
+
+    @writes
+    def insert_entry(self, date, name, class_name, status, content, is_highlighted):
+        # Trùng buổi (tên, ngày, lớp) sẽ báo sqlite3.IntegrityError và rollback
+        class_id, status_id = self._class_code(class_name), self._status_code(status)
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """INSERT INTO progress (date, name, class_id, status_id, content, is_highlighted, name_key, search_body)
+                   VALUES (?,?,?,?,?,?,?,?)""",
+                (date, name, class_id, status_id, content, is_highlighted, fold(name), search_text(content))
+            )
+            add_name_tokens(cursor, [name])
+            return cursor.lastrowid
 
+    @writes
+    def update_entry(self, entry_id, date, name, class_name, status, content, is_highlighted):
+        class_id, status_id = self._class_code(class_name), self._status_code(status)
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """UPDATE progress SET date=?, name=?, class_id=?, status_id=?, content=?, is_highlighted=?,
+                                      name_key=?, search_body=?
+                   WHERE id=?""",
+                (date, name, class_id, status_id, content, is_highlighted, fold(name), search_text(content), entry_id)
+            )
+            add_name_tokens(cursor, [name])
+
+    @cached_read
     def get_entry_by_id(self, entry_id):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM progress WHERE id=?", (entry_id,))
+        cursor.execute(f"SELECT {PROGRESS_COLUMNS} FROM progress WHERE id=?", (entry_id,))
         return cursor.fetchone()
 
-    def delete_entries(self, id_list):
+    def get_progress_by_ids(self, id_list, name="", class_name=ALL_CLASSES, date=None):
+        """Các dòng trong id_list còn khớp bộ lọc, dùng để cập nhật bảng chính sau khi ghi"""
+        id_list = list(id_list)
+        where, params = self._progress_filter(name, class_name, date)
         cursor = self.conn.cursor()
-        for row_id in id_list:
-            cursor.execute("DELETE FROM progress WHERE id=?", (row_id,))
-        self.conn.commit()
+        rows = []
+        # Chia nhỏ để không vượt giới hạn số tham số của SQLite
+        for i in range(0, len(id_list), 500):
+            chunk = id_list[i:i + 500]
+            cursor.execute(
+                f"""SELECT {PROGRESS_COLUMNS} FROM progress
+                    WHERE id IN ({",".join("?" * len(chunk))}) AND {where}""",
+                chunk + params
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def _execute_batch(self, sql, rows):
+        """Chạy executemany trong một transaction (một lần commit), trả về số dòng bị ảnh hưởng"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.executemany(sql, rows)
+            return max(cursor.rowcount, 0)
 
+    @writes
+    def delete_entries(self, id_list):
+        id_list = list(id_list)
+        deleted = self._execute_batch(
+            "DELETE FROM progress WHERE id=?",
+            [(row_id,) for row_id in id_list]
+        )
+        return WriteResult(deleted=deleted, skipped=len(id_list) - deleted, ids=tuple(id_list))
+
+    @writes
     def bulk_insert_attendance(self, selected_data):
-        cursor = self.conn.cursor()
-        for name, cls, chosen_date in selected_data:
-            # Kiểm tra xem đã có bản ghi chưa
-            cursor.execute("SELECT id FROM progress WHERE name = ? AND date = ?", (name, chosen_date))
-            if cursor.fetchone() is None:
-                cursor.execute(
-                    "INSERT INTO progress (date, name, class_name, status, content, is_highlighted) VALUES (?,?,?,?,?,?)",
-                    (chosen_date, name, cls, "Đi học", "(Chưa có nhận xét cuối buổi)", 0)
-                )
-        self.conn.commit()
+        """
+        Điểm danh nhiều học sinh cùng lúc, selected_data: list (name, class_name, date)
+        Buổi đã có (trùng tên, ngày, lớp) được bỏ qua nhờ ràng buộc UNIQUE
+        """
+        content = "(Chưa có nhận xét cuối buổi)"
+        rows = [
+            (chosen_date, name, self._class_code(cls), STATUS_PRESENT, content, 0, fold(name), search_text(content))
+            for name, cls, chosen_date in selected_data
+        ]
+        with self.conn:
+            cursor = self.conn.cursor()
+            # Giữ khóa ghi ngay từ đầu: mọi id lớn hơn last_id sau executemany là của lô này
+            cursor.execute("BEGIN IMMEDIATE")
+            last_id = cursor.execute("SELECT IFNULL(MAX(id), 0) FROM progress").fetchone()[0]
+            cursor.executemany(
+                """INSERT INTO progress (date, name, class_id, status_id, content, is_highlighted, name_key, search_body)
+                   VALUES (?,?,?,?,?,?,?,?)
+                   ON CONFLICT DO NOTHING""",
+                rows
+            )
+            add_name_tokens(cursor, [row[1] for row in rows])
+            cursor.execute("SELECT id FROM progress WHERE id > ? ORDER BY id", (last_id,))
+            ids = [new_id for (new_id,) in cursor.fetchall()]
+        return WriteResult(inserted=len(ids), skipped=len(rows) - len(ids), ids=tuple(ids))
 
-    def update_entries_content(self, id_list, content):
+    def find_existing_sessions(self, keys):
+        """keys: list (name, date, class_id); trả về set các khóa đã có buổi trong progress"""
+        keys = list(keys)
         cursor = self.conn.cursor()
-        for entry_id in id_list:
+        found = set()
+        # JOIN với bảng hằng để mỗi khóa tra một lần trên idx_progress_session
+        # (IN (VALUES ...) với row value sẽ quét cả index)
+        for i in range(0, len(keys), 300):
+            chunk = keys[i:i + 300]
             cursor.execute(
-                "UPDATE progress SET content=? WHERE id=?",
-                (content, entry_id)
+                f"""WITH k(name, date, class_id) AS (VALUES {",".join(["(?,?,?)"] * len(chunk))})
+                    SELECT p.name, p.date, p.class_id FROM k
+                    JOIN progress p ON p.name = k.name AND p.date = k.date AND p.class_id = k.class_id""",
+                [value for key in chunk for value in key]
             )
-        self.conn.commit()
+            found.update(cursor.fetchall())
+        return found
+
+    @cached_read
+    def get_student_keys_by_name(self):
+        """dict tên -> student_key của hồ sơ (như trigger progress_student_key_insert chọn)"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT name, MIN(student_key) FROM students GROUP BY name")
+        return dict(cursor.fetchall())
+
+    @writes
+    def import_progress(self, rows, overwrite=False):
+        """
+        Nhập một lô dòng đã kiểm tra trong một transaction
+        rows: list (date, name, class_id, status_id, content, is_highlighted, student_key)
+        student_key lấy từ get_student_keys_by_name; None thì trigger tự tìm theo tên như khi thêm từng dòng
+        Buổi đã có (trùng tên, ngày, lớp): overwrite=True thì ghi đè trạng thái / nội dung, không thì bỏ qua
+        """
+        if overwrite:
+            # Chỉ ghi các buổi thực sự khác để không kích hoạt trigger chỉ mục / tổng hợp vô ích
+            action = """DO UPDATE SET status_id = excluded.status_id, content = excluded.content,
+                                      is_highlighted = excluded.is_highlighted, search_body = excluded.search_body
+                        WHERE status_id IS NOT excluded.status_id OR content IS NOT excluded.content
+                              OR is_highlighted IS NOT excluded.is_highlighted"""
+        else:
+            action = "DO NOTHING"
+        sql = f"""INSERT INTO progress (date, name, class_id, status_id, content, is_highlighted, student_key,
+                                        name_key, search_body)
+                  VALUES (?,?,?,?,?,?,?,?,?)
+                  ON CONFLICT (name, date, class_id) {action}"""
+        name_keys = {name: fold(name) for name in {row[1] for row in rows}}
+        rows = [tuple(row) + (name_keys[row[1]], search_text(row[4])) for row in rows]
+        if len(rows) < settings.BULK_IMPORT_ROWS:
+            with self.conn:
+                cursor = self.conn.cursor()
+                cursor.executemany(sql, rows)
+                add_name_tokens(cursor, name_keys)
+                return max(cursor.rowcount, 0)
+
+        # Lô lớn: bỏ các trigger cho từng dòng thêm mới trong transaction (lỗi thì rollback
+        # khôi phục lại), ghi cả lô rồi cập nhật các bảng phụ cho các dòng mới một lần
+        if overwrite:
+            # Dòng trùng buổi trong lô sẽ ghi đè một dòng vừa thêm, chưa có trong chỉ mục /
+            # bảng tổng hợp: chỉ giữ dòng cuối của mỗi buổi, như khi ghi lần lượt
+            rows = list({(row[1], row[0], row[2]): row for row in rows}.values())
+        with self.conn:
+            cursor = self.conn.cursor()
+            # Giữ khóa ghi ngay từ đầu: mọi id lớn hơn last_id là dòng của lô này
+            cursor.execute("BEGIN IMMEDIATE")
+            last_id = cursor.execute("SELECT IFNULL(MAX(id), 0) FROM progress").fetchone()[0]
+            with suspended_triggers(cursor, PROGRESS_INSERT_TRIGGERS):
+                cursor.executemany(sql, rows)
+                changed = max(cursor.rowcount, 0)
+            index_new_progress(cursor, last_id)
+            add_name_tokens(cursor, name_keys)
+        return changed
+
+    @writes
+    def update_entries_content(self, id_list, content):
+        id_list = list(id_list)
+        updated = self._execute_batch(
+            "UPDATE progress SET content=?, search_body=? WHERE id=?",
+            [(content, search_text(content), entry_id) for entry_id in id_list]
+        )
+        return WriteResult(updated=updated, skipped=len(id_list) - updated, ids=tuple(id_list))
 
     # =========================
     # QUẢN LÝ HỒ SƠ HỌC SINH
     # =========================
     
+    @cached_read
     def get_all_students(self):
         """Lấy danh sách tất cả học sinh"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM students ORDER BY student_id")
+        cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students ORDER BY student_id")
         return cursor.fetchall()
     
+    def cursor_students(self):
+        """Như get_all_students nhưng trả về cursor (không qua bộ đệm) để đọc dần từng phần"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students ORDER BY student_id")
+        return cursor
+
+    def count_students(self):
+        return self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    @cached_read
     def get_student_by_id(self, student_id):
         """Lấy thông tin học sinh theo ID"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM students WHERE student_id=?", (student_id,))
+        cursor.execute(f"SELECT {STUDENT_COLUMNS} FROM students WHERE student_id=?", (student_id,))
         return cursor.fetchone()
     
+    @writes
     def insert_student(self, student_id, name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date):
         """Thêm học sinh mới"""
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO students (student_id, name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date) VALUES (?,?,?,?,?,?,?,?,?)",
-            (student_id, name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date)
+            """INSERT INTO students (student_id, name, phone, parent_name, date_of_birth, address, notes, class_name,
+                                     registration_date, name_key, sort_key, search_body)
+               VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
+            (student_id, name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date,
+             fold(name), name_sort_key(name), search_text(notes))
         )
+        add_name_tokens(cursor, [name])
         self.conn.commit()
     
+    @writes
     def update_student(self, student_id, name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date):
         """Cập nhật thông tin học sinh"""
         cursor = self.conn.cursor()
         cursor.execute(
-            "UPDATE students SET name=?, phone=?, parent_name=?, date_of_birth=?, address=?, notes=?, class_name=?, registration_date=? WHERE student_id=?",
-            (name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date, student_id)
+            """UPDATE students SET name=?, phone=?, parent_name=?, date_of_birth=?, address=?, notes=?, class_name=?,
+                                  registration_date=?, name_key=?, sort_key=?, search_body=?
+               WHERE student_id=?""",
+            (name, phone, parent_name, date_of_birth, address, notes, class_name, registration_date,
+             fold(name), name_sort_key(name), search_text(notes), student_id)
         )
+        add_name_tokens(cursor, [name])
         self.conn.commit()
     
+    @writes
     def delete_student(self, student_id):
         """Xóa học sinh"""
         cursor = self.conn.cursor()
@@ -137,39 +730,47 @@ class Database:
         self.conn.commit()
     
     def search_students(self, keyword=""):
-        """Tìm kiếm học sinh theo tên hoặc ID"""
+        """Tìm kiếm học sinh theo tên (không phân biệt dấu) hoặc ID, xếp theo tên tiếng Việt"""
+        # Không qua bộ đệm (gọi theo từng lần gõ), danh sách đầy đủ thì dùng get_all_students có đệm
+        name_match = self._name_match(keyword)
+        if name_match is None:
+            return self.get_all_students()
         cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT * FROM students WHERE student_id LIKE ? OR name LIKE ? ORDER BY student_id",
-            (f"%{keyword}%", f"%{keyword}%")
+            f"""SELECT {STUDENT_COLUMNS} FROM students
+                WHERE name_key IN ({name_match[0]}) OR student_id LIKE ?
+                ORDER BY sort_key, student_id""",
+            name_match[1] + [f"%{keyword.strip()}%"]
         )
         return cursor.fetchall()
     
+    @cached_read
     def get_student_attendance_stats(self, student_id=None, name=None):
         """Thống kê số buổi học của học sinh"""
         cursor = self.conn.cursor()
         
-        # Lấy tên học sinh từ ID nếu có
-        if student_id and not name:
-            cursor.execute("SELECT name FROM students WHERE student_id=?", (student_id,))
+        # Có hồ sơ thì đếm theo student_key (gồm cả các buổi mang tên cũ), không thì theo tên
+        student_key = None
+        if student_id:
+            cursor.execute("SELECT student_key, name FROM students WHERE student_id=?", (student_id,))
             result = cursor.fetchone()
             if result:
-                name = result[0]
+                student_key, name = result
         
-        if name:
-            # Tổng số buổi đi học
-            cursor.execute(
-                "SELECT COUNT(*) FROM progress WHERE name=? AND status='Đi học'",
-                (name,)
-            )
-            attended = cursor.fetchone()[0] or 0
-            
-            # Tổng số buổi nghỉ
-            cursor.execute(
-                "SELECT COUNT(*) FROM progress WHERE name=? AND status='Nghỉ học'",
-                (name,)
-            )
-            absent = cursor.fetchone()[0] or 0
+        if student_key is not None or name:
+            # Đọc từ bảng tổng hợp theo tháng (0 = chưa có hồ sơ)
+            if student_key is not None:
+                cursor.execute(
+                    "SELECT SUM(attended), SUM(absent) FROM attendance_rollup WHERE student_key=?",
+                    (student_key,)
+                )
+            else:
+                cursor.execute(
+                    "SELECT SUM(attended), SUM(absent) FROM attendance_rollup WHERE student_key=0 AND name=?",
+                    (name,)
+                )
+            attended, absent = cursor.fetchone()
+            attended, absent = attended or 0, absent or 0
             
             return {
                 'student_id': student_id,
@@ -180,41 +781,233 @@ class Database:
             }
         
         return None
-    
+
+    def get_student_sessions(self, student_id, start_date_str, end_date_str):
+        """
+        Các buổi học của một học sinh có hồ sơ trong khoảng thời gian, xếp theo ngày
+        Trả về list (date, class_name, status, content)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """SELECT progress.date,
+                      (SELECT name FROM classes WHERE id = progress.class_id),
+                      (SELECT name FROM statuses WHERE id = progress.status_id),
+                      progress.content
+               FROM students JOIN progress ON progress.student_key = students.student_key
+               WHERE students.student_id = ? AND progress.date BETWEEN ? AND ?
+               ORDER BY progress.date, progress.id""",
+            (student_id, start_date_str, end_date_str)
+        )
+        return cursor.fetchall()
+
+    # =========================
+    # LỊCH HỌC & NGÀY NGHỈ
+    # =========================
+
+    @cached_read
+    def get_class_schedule(self):
+        """Lấy lịch học: dict class_name -> danh sách weekday (0=Thứ 2, ..., 6=Chủ nhật)"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT class_name, weekday FROM class_schedule ORDER BY class_name, weekday")
+        schedule = {}
+        for class_name, weekday in cursor.fetchall():
+            schedule.setdefault(class_name, []).append(weekday)
+        return schedule
+
+    @writes
+    def set_class_schedule(self, class_name, weekdays):
+        """Đặt lại các ngày học trong tuần của một lớp"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM class_schedule WHERE class_name=?", (class_name,))
+        cursor.executemany(
+            "INSERT INTO class_schedule (class_name, weekday) VALUES (?, ?)",
+            [(class_name, weekday) for weekday in sorted(set(weekdays))]
+        )
+        self.conn.commit()
+
+    @cached_read
+    def get_cancelled_sessions(self, start_date_str=None, end_date_str=None):
+        """Lấy danh sách ngày nghỉ (id, date, class_name, reason), class_name None = tất cả lớp"""
+        cursor = self.conn.cursor()
+        if start_date_str and end_date_str:
+            cursor.execute(
+                "SELECT id, date, class_name, reason FROM cancelled_sessions WHERE date BETWEEN ? AND ? ORDER BY date, id",
+                (start_date_str, end_date_str)
+            )
+        else:
+            cursor.execute("SELECT id, date, class_name, reason FROM cancelled_sessions ORDER BY date, id")
+        return cursor.fetchall()
+
+    @writes
+    def add_cancelled_session(self, date, class_name=None, reason=""):
+        """Thêm ngày nghỉ lễ / buổi bị hủy (class_name None = nghỉ tất cả các lớp)"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO cancelled_sessions (date, class_name, reason) VALUES (?,?,?)",
+            (date, class_name, reason)
+        )
+        self.conn.commit()
+
+    @writes
+    def delete_cancelled_session(self, session_id):
+        """Xóa một ngày nghỉ"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM cancelled_sessions WHERE id=?", (session_id,))
+        self.conn.commit()
+
+    @staticmethod
+    def _count_weekday(start_date, end_date, weekday):
+        """Đếm số ngày có thứ = weekday trong [start_date, end_date] mà không duyệt từng ngày"""
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            return 0
+        full_weeks, remainder = divmod(days, 7)
+        offset = (weekday - start_date.weekday()) % 7
+        return full_weeks + (1 if offset < remainder else 0)
+
+    @cached_read
     def count_expected_sessions(self, class_name, start_date_str, end_date_str):
         """
         Tính số buổi học dự kiến trong khoảng thời gian
-        Dựa trên lịch học: Sáng T7, Chiều T7, Sáng CN, Chiều CN
-        """
-        # Ánh xạ tên lớp sang ngày trong tuần
-        # calendar.weekday: 0=Monday, 1=Tuesday, ..., 5=Saturday, 6=Sunday
-        class_schedule = {
-            "Sáng T7": [5],      # Saturday
-            "Chiều T7": [5],     # Saturday
-            "Sáng CN": [6],      # Sunday
-            "Chiều CN": [6]      # Sunday
-        }
-        
-        if class_name not in class_schedule:
+        Dựa trên bảng class_schedule, trừ các buổi nghỉ trong cancelled_sessions
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT weekday FROM class_schedule WHERE class_name=?", (class_name,))
+        target_weekdays = [row[0] for row in cursor.fetchall()]
+        if not target_weekdays:
             return 0
-        
-        target_weekdays = class_schedule[class_name]
-        
-        # Parse dates
-        from datetime import datetime, timedelta
+
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        
-        # Đếm số buổi
-        count = 0
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() in target_weekdays:
-                count += 1
-            current_date += timedelta(days=1)
-        
-        return count
-    
+
+        count = sum(self._count_weekday(start_date, end_date, weekday) for weekday in target_weekdays)
+        if count == 0:
+            return 0
+
+        # Trừ các buổi nghỉ rơi vào ngày học của lớp
+        cursor.execute(
+            """SELECT DISTINCT date FROM cancelled_sessions
+               WHERE date BETWEEN ? AND ? AND (class_name IS NULL OR class_name = ?)""",
+            (start_date_str, end_date_str, class_name)
+        )
+        for (cancelled_date,) in cursor.fetchall():
+            if datetime.strptime(cancelled_date, "%Y-%m-%d").weekday() in target_weekdays:
+                count -= 1
+
+        return max(0, count)
+
+    @cached_read
+    def get_attendance_groups(self, start_date_str, end_date_str):
+        """
+        Truy vấn gộp duy nhất cho thống kê: số buổi đi học theo (học sinh, lớp) trong khoảng thời gian
+        Học sinh có hồ sơ được gộp theo student_key (kể cả các buổi mang tên cũ), còn lại theo tên
+        Trả về list (student_id, name, class_name, attended), student_id None nếu chưa có hồ sơ
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT student_key, student_id, name FROM students")
+        profiles = {key: (student_id, name) for key, student_id, name in cursor.fetchall()}
+
+        first_month, last_month, partial_ranges = self._split_months(start_date_str, end_date_str)
+        rows = []
+        # Các tháng trọn vẹn: đọc bảng tổng hợp, chi phí theo số học sinh × số tháng.
+        # Quét theo khóa chính (đã đúng thứ tự GROUP BY) nên không cần sắp xếp thêm
+        if first_month is not None:
+            cursor.execute(
+                """SELECT NULLIF(student_key, 0), NULLIF(name, ''), class_id, SUM(attended)
+                   FROM attendance_rollup
+                   WHERE month BETWEEN ? AND ?
+                   GROUP BY student_key, name, class_id""",
+                (first_month, last_month)
+            )
+            rows.extend(cursor.fetchall())
+        # Phần tháng đầu / cuối không trọn vẹn: đếm trực tiếp trên progress
+        for range_start, range_end in partial_ranges:
+            cursor.execute(
+                """SELECT student_key, name, class_id, SUM(status_id = ?)
+                   FROM progress
+                   WHERE date BETWEEN ? AND ?
+                   GROUP BY student_key, name, class_id""",
+                (STATUS_PRESENT, range_start, range_end)
+            )
+            rows.extend(cursor.fetchall())
+
+        cursor.execute("SELECT id, name FROM classes")
+        class_names = dict(cursor.fetchall())
+        groups = {}
+        for student_key, name, class_id, attended in rows:
+            student_id, name = profiles.get(student_key, (None, name))
+            key = (student_id, name, class_names.get(class_id))
+            groups[key] = groups.get(key, 0) + (attended or 0)
+        return [key + (attended,) for key, attended in groups.items()]
+
+    @staticmethod
+    def _split_months(start_date_str, end_date_str):
+        """
+        Tách [start, end] thành các tháng trọn vẹn (first_month, last_month dạng YYYY-MM,
+        None nếu không có) và list các khoảng ngày lẻ ở đầu / cuối
+        """
+        start = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+        if start > end:
+            return None, None, []
+
+        # Tháng trọn vẹn đầu tiên: tháng của start nếu start là ngày 1, không thì tháng sau
+        first = (start.year, start.month)
+        if start.day != 1:
+            first = (start.year + start.month // 12, start.month % 12 + 1)
+        # Tháng trọn vẹn cuối cùng: tháng của end nếu end là ngày cuối tháng, không thì tháng trước
+        last = (end.year, end.month)
+        if end.day != calendar.monthrange(end.year, end.month)[1]:
+            last = (end.year - (end.month == 1), (end.month - 2) % 12 + 1)
+
+        if first > last:
+            return None, None, [(start_date_str, end_date_str)]
+
+        partial_ranges = []
+        if start.day != 1:
+            # Ngày lưu dạng chuỗi nên "-31" luôn phủ hết tháng
+            partial_ranges.append((start_date_str, f"{start.year:04d}-{start.month:02d}-31"))
+        if last != (end.year, end.month):
+            partial_ranges.append((f"{end.year:04d}-{end.month:02d}-01", end_date_str))
+        return "%04d-%02d" % first, "%04d-%02d" % last, partial_ranges
+
+    @cached_read
+    def get_class_summary(self, start_date_str, end_date_str, groups=None):
+        """
+        Tóm tắt theo lớp trong khoảng thời gian
+        Trả về dict: class_name -> (sĩ số, số buổi đi học)
+        """
+        if groups is None:
+            groups = self.get_attendance_groups(start_date_str, end_date_str)
+        summary = {}
+        for student_id, name, class_name, attended in groups:
+            total_students, present = summary.get(class_name, (0, 0))
+            # Không đếm các dòng không có tên
+            summary[class_name] = (total_students + (name is not None), present + attended)
+        return summary
+
+    @cached_read
+    def get_attendance_by_student(self, start_date_str, end_date_str, groups=None):
+        """
+        Thống kê theo hồ sơ học sinh trong khoảng thời gian
+        Trả về dict: student_id -> (số buổi đi học, danh sách lớp đã sắp xếp)
+        """
+        if groups is None:
+            groups = self.get_attendance_groups(start_date_str, end_date_str)
+        attended_by_student = {}
+        classes_by_student = {}
+        for student_id, name, class_name, attended in groups:
+            if student_id is None:
+                continue
+            attended_by_student[student_id] = attended_by_student.get(student_id, 0) + attended
+            classes_by_student.setdefault(student_id, []).append(class_name)
+
+        return {
+            student_id: (attended_by_student[student_id], sorted(classes))
+            for student_id, classes in classes_by_student.items()
+        }
+
+    @cached_read
     def get_all_students_with_attendance(self, start_date_str=None, end_date_str=None):
         """
         Lấy danh sách tất cả học sinh kèm thống kê số buổi học
@@ -235,61 +1028,62 @@ class Database:
         
         cursor.execute("SELECT student_id, name, class_name FROM students ORDER BY student_id")
         students = cursor.fetchall()
-        
+
+        attendance_by_student = self.get_attendance_by_student(start_date_str, end_date_str)
+        return self.combine_student_attendance(students, attendance_by_student, start_date_str, end_date_str)
+
+    def combine_student_attendance(self, students, attendance_by_student, start_date_str, end_date_str):
+        """
+        Ghép hồ sơ học sinh (student_id, name, class_name) với kết quả get_attendance_by_student
+        Trả về (student_id, name, lớp hiển thị, đi học, nghỉ, tổng dự kiến) cho từng học sinh
+        """
+        # Số buổi dự kiến chỉ phụ thuộc vào lớp, tính một lần cho mỗi lớp
+        expected_by_class = {}
+
+        def expected(cls):
+            if cls not in expected_by_class:
+                expected_by_class[cls] = self.count_expected_sessions(cls, start_date_str, end_date_str)
+            return expected_by_class[cls]
+
         result = []
         for student_id, name, class_name in students:
-            # Đếm số buổi đi học (Đi học)
-            cursor.execute(
-                "SELECT COUNT(*) FROM progress WHERE name=? AND status='Đi học' AND date BETWEEN ? AND ?",
-                (name, start_date_str, end_date_str)
-            )
-            attended = cursor.fetchone()[0] or 0
-            
-            # LẤY TẤT CẢ các class_name mà học sinh được ghi danh trong khoảng thời gian
-            cursor.execute(
-                "SELECT DISTINCT class_name FROM progress WHERE name=? AND date BETWEEN ? AND ? ORDER BY class_name",
-                (name, start_date_str, end_date_str)
-            )
-            classes_in_period = [row[0] for row in cursor.fetchall()]
-            
+            attended, classes_in_period = attendance_by_student.get(student_id, (0, []))
+
             # Tính số buổi dự kiến dựa trên TẤT CẢ các lớp
-            total_expected = 0
             if classes_in_period:
-                for cls in classes_in_period:
-                    total_expected += self.count_expected_sessions(cls, start_date_str, end_date_str)
+                total_expected = sum(expected(cls) for cls in classes_in_period)
             else:
-                # Nếu không có records trong khoảng thời gian, dùng class_name dari students table
-                total_expected = self.count_expected_sessions(class_name, start_date_str, end_date_str)
-            
+                # Nếu không có records trong khoảng thời gian, dùng class_name từ bảng students
+                total_expected = expected(class_name)
+
             # Số buổi nghỉ = số buổi dự kiến - số buổi đi học
             absent = max(0, total_expected - attended)
-            
+
             # Hiển thị tất cả các lớp nếu học sinh học nhiều hơn 1 lớp
             display_class = ", ".join(classes_in_period) if classes_in_period else class_name
-            
+
             result.append((student_id, name, display_class, attended, absent, total_expected))
-        
+
         return result
     
+    @cached_read
     def get_students_without_profile(self):
         """Lấy danh sách học sinh từ bảng progress mà chưa có hồ sơ trong bảng students"""
         cursor = self.conn.cursor()
-        # Lấy các tên học sinh từ progress nhưng chưa có trong students
-        # Lấy class_name của lần ghi dữ liệu gần nhất
+        # Lấy các tên học sinh từ progress nhưng chưa có trong students, kèm lớp của lần
+        # ghi dữ liệu gần nhất (xét mọi buổi cùng tên). Gộp nhóm trong bảng con để truy vấn
+        # lớp chạy một lần cho mỗi tên, không phải cho mỗi dòng của nhóm
         cursor.execute("""
-            SELECT p.name, p.class_name, COUNT(DISTINCT p.date) as attendance_count
-            FROM progress p
-            LEFT JOIN students s ON p.name = s.name
-            WHERE s.name IS NULL
-            GROUP BY p.name
-            ORDER BY p.name
+            SELECT p.name,
+                   (SELECT (SELECT name FROM classes WHERE id = latest.class_id)
+                    FROM progress AS latest WHERE latest.name = p.name
+                    ORDER BY latest.date DESC LIMIT 1),
+                   p.attendance_count
+            FROM (SELECT name, COUNT(DISTINCT date) AS attendance_count
+                  FROM progress
+                  WHERE student_key IS NULL
+                  GROUP BY name) AS p
         """)
-        result = []
-        for row in cursor.fetchall():
-            name, attendance_count = row[0], row[2]
-            # Lấy class_name gần nhất (ORDER BY date DESC LIMIT 1)
-            cursor.execute("SELECT class_name FROM progress WHERE name = ? ORDER BY date DESC LIMIT 1", (name,))
-            class_row = cursor.fetchone()
-            class_name = class_row[0] if class_row else ""
-            result.append((name, class_name, attendance_count))
-        return result
\ No newline at end of file
+        result = cursor.fetchall()
+        # Xếp theo tên tiếng Việt
+        return sorted(result, key=lambda row: name_sort_key(row[0]))
\ No newline at end of file
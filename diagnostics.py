@@ -0,0 +1,196 @@
+# Thông tin chẩn đoán hiệu năng cho cửa sổ ẩn DiagnosticsDialog, không phụ thuộc Qt
+#
+# collect(db) gom kích thước file, số dòng từng bảng, danh sách index, bộ đệm truy
+# vấn, thời gian các câu SQL gần nhất (khi bật settings.QUERY_STATS), thời gian lần
+# tải dữ liệu / tính thống kê gần nhất và bộ nhớ của tiến trình; format_report()
+# đổi thành văn bản để giáo viên sao chép gửi lại.
+import gc
+import os
+import platform
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import settings
+from migrations import get_schema_version
+
+# Số câu lệnh gần nhất / dạng câu lệnh tốn thời gian nhất đưa vào báo cáo
+RECENT_QUERIES = 50
+TOP_SHAPES = 15
+
+# Tên thao tác -> (thời điểm, ms) của lần chạy gần nhất
+_timings = {}
+
+
+def record_timing(name, seconds):
+    """Ghi thời gian của lần chạy gần nhất của thao tác name (load_data, calculate_stats...)"""
+    _timings[name] = (time.time(), seconds * 1000)
+
+
+def process_memory():
+    """(bộ nhớ đang dùng, lớn nhất từ khi chạy) của tiến trình, tính bằng byte; None nếu không đọc được"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        if ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                    counters.cb):
+            return counters.WorkingSetSize, counters.PeakWorkingSetSize
+        return None, None
+    try:
+        with open("/proc/self/status") as f:
+            values = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(values["VmRSS"].split()[0]) * 1024, int(values["VmHWM"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def collect(db):
+    """Toàn bộ thông tin chẩn đoán của db dạng dict"""
+    # Lấy số liệu câu lệnh trước khi chính các truy vấn dưới đây được ghi lại
+    # (bỏ PRAGMA data_version: bộ đệm truy vấn kiểm tra trước mỗi lần đọc, lấn hết danh sách)
+    recent = [query for query in db.recent_queries() if query.shape != "PRAGMA data_version"][:RECENT_QUERIES]
+    shapes = db.query_stats()[:TOP_SHAPES]
+
+    conn = db.conn
+    pragma = lambda name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+    objects = conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY tbl_name, name"
+    ).fetchall()
+    # Bảng ảo FTS5 và các bảng phụ của nó (progress_fts_data...) không đếm dòng
+    virtual = [name for kind, name, _, sql in objects if kind == "table" and (sql or "").upper().startswith("CREATE VIRTUAL")]
+    tables = [
+        name for kind, name, _, _ in objects
+        if kind == "table" and name not in virtual and not any(name.startswith(v + "_") for v in virtual)
+    ]
+    cache = db.cache_stats()
+    lookups = cache["hits"] + cache["misses"]
+    current_memory, peak_memory = process_memory()
+
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "database": {
+            "path": os.path.abspath(db.db_name),
+            "size": _file_size(db.db_name),
+            "wal_size": _file_size(db.db_name + "-wal"),
+            "schema_version": get_schema_version(conn),
+            "profile": db.profile,
+            "journal_mode": pragma("journal_mode"),
+            "page_size": pragma("page_size"),
+            "page_count": pragma("page_count"),
+            "freelist_count": pragma("freelist_count"),
+        },
+        "tables": {name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] for name in tables},
+        "indexes": [(name, table, sql) for kind, name, table, sql in objects if kind == "index"],
+        "cache": dict(cache, hit_rate=cache["hits"] / lookups if lookups else None),
+        "query_stats_enabled": settings.QUERY_STATS,
+        "slow_query_log": os.path.abspath(settings.SLOW_QUERY_LOG) if settings.QUERY_STATS else None,
+        "slow_query_ms": settings.SLOW_QUERY_MS,
+        "top_queries": shapes,
+        "recent_queries": recent,
+        "timings": dict(_timings),
+        "memory": {
+            "current": current_memory,
+            "peak": peak_memory,
+            "python_blocks": sys.getallocatedblocks(),
+            "gc_objects": len(gc.get_objects()),
+        },
+    }
+
+
+def _size(value):
+    if value is None:
+        return "?"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def _clock(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+
+
+def format_report(info):
+    """Báo cáo dạng văn bản (hiển thị và sao chép nguyên văn)"""
+    env, database, cache, memory = info["environment"], info["database"], info["cache"], info["memory"]
+    lines = [
+        f"CHẨN ĐOÁN HIỆU NĂNG - {info['generated']}",
+        f"Python {env['python']} | SQLite {env['sqlite']} | {env['platform']}",
+        "",
+        "[Database]",
+        f"  File: {database['path']}",
+        f"  Kích thước: {_size(database['size'])} (WAL {_size(database['wal_size'])}), "
+        f"{database['page_count']} trang x {database['page_size']} B, {database['freelist_count']} trang trống",
+        f"  Schema v{database['schema_version']} | chế độ {database['profile']} | journal {database['journal_mode']}",
+        "",
+        "[Số dòng]",
+    ]
+    lines += [f"  {name:<28} {count:>12,}" for name, count in info["tables"].items()]
+
+    lines += ["", "[Index]"]
+    lines += [f"  {name} ({table})" + ("" if sql else " - tự động") for name, table, sql in info["indexes"]]
+
+    hit_rate = f"{cache['hit_rate']:.1%}" if cache["hit_rate"] is not None else "-"
+    lines += [
+        "",
+        "[Bộ đệm truy vấn]",
+        f"  Trúng {cache['hits']:,} | trượt {cache['misses']:,} | tỉ lệ trúng {hit_rate} | "
+        f"đang lưu {cache['entries']:,} | generation {cache['generation']}",
+        "",
+        "[Thời gian thao tác gần nhất]",
+    ]
+    timings = info["timings"]
+    lines += [f"  {name:<20} {ms:10.1f} ms  lúc {_clock(at)}" for name, (at, ms) in sorted(timings.items())]
+    if not timings:
+        lines.append("  (chưa có)")
+
+    lines += [
+        "",
+        "[Bộ nhớ]",
+        f"  Tiến trình: {_size(memory['current'])} (lớn nhất {_size(memory['peak'])}) | "
+        f"Python: {memory['python_blocks']:,} khối, {memory['gc_objects']:,} đối tượng",
+        "",
+    ]
+
+    if not info["query_stats_enabled"]:
+        lines += [
+            "[Câu lệnh SQL]",
+            "  Chưa bật đo thời gian truy vấn: chạy lại ứng dụng với biến môi trường HOCTAP_QUERY_STATS=1",
+        ]
+        return "\n".join(lines)
+
+    lines += [f"[Câu lệnh tốn thời gian nhất] (log câu chậm > {info['slow_query_ms']:.0f} ms: {info['slow_query_log']})"]
+    for item in info["top_queries"]:
+        lines.append(
+            f"  {item['total_ms']:10.1f} ms | {item['calls']:>6} lần | p95 {item['p95_ms']:8.2f} | "
+            f"max {item['max_ms']:8.2f} | {item['rows']:>9,} dòng | {item['shape'][:200]}"
+        )
+    lines += ["", f"[{len(info['recent_queries'])} câu lệnh gần nhất]"]
+    for query in info["recent_queries"]:
+        lines.append(f"  {_clock(query.time)} {query.ms:9.2f} ms {query.rows:>8,} dòng | {query.shape[:200]}")
+    return "\n".join(lines)
@@ -1,7 +1,21 @@
 # Package chứa các dialog của ứng dụng
-from .entry_dialog import EntryDialog
-from .attendance_dialog import AttendanceDialog
-from .statistics_dialog import StatisticsDialog
-from .common_comment_dialog import CommonCommentDialog
+#
+# Các dialog chỉ được import khi dùng đến (PEP 562): import một dialog không kéo
+# theo các dialog khác và thư viện của chúng (reports, workers...) lúc khởi động
+import importlib
 
-__all__ = ['EntryDialog', 'AttendanceDialog', 'StatisticsDialog', 'CommonCommentDialog']
+_MODULES = {
+    'EntryDialog': '.entry_dialog',
+    'AttendanceDialog': '.attendance_dialog',
+    'StatisticsDialog': '.statistics_dialog',
+    'CommonCommentDialog': '.common_comment_dialog',
+    'HolidayDialog': '.holiday_dialog',
+}
+
+__all__ = ['EntryDialog', 'AttendanceDialog', 'StatisticsDialog', 'CommonCommentDialog', 'HolidayDialog']
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_MODULES[name], __name__), name)
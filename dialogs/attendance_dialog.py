@@ -4,13 +4,17 @@ from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QScreen
 
+from registry import ALL_CLASSES
+from textnorm import name_sort_key
+
 
 class AttendanceDialog(QDialog):
-    def __init__(self, parent, db_conn):
+    def __init__(self, parent, db_conn, registry):
         super().__init__(parent)
         self.setWindowTitle("Điểm danh học sinh")
         self.setFixedSize(500, 680)
         self.db_conn = db_conn
+        self.registry = registry
         self.all_students = []
         
         self.center_dialog()
@@ -78,7 +82,7 @@ class AttendanceDialog(QDialog):
         filter_layout = QHBoxLayout()
         filter_label = QLabel("Lọc lớp học:")
         self.class_filter = QComboBox()
-        self.class_filter.addItems(["Tất cả lớp", "Sáng T7", "Chiều T7", "Sáng CN", "Chiều CN"])
+        self.class_filter.addItems([ALL_CLASSES] + self.registry.class_names())
         self.class_filter.setStyleSheet("""
             QComboBox { 
                 padding: 5px; border: 1px solid #ccc; border-radius: 4px; font-weight: bold; color: #d63384; 
@@ -152,7 +156,7 @@ class AttendanceDialog(QDialog):
         
         filter_text = self.class_filter.currentText()
         for name, cls in self.all_students:
-            if filter_text == "Tất cả lớp" or filter_text == cls:
+            if filter_text == ALL_CLASSES or filter_text == cls:
                 item = QListWidgetItem(f"{name}  |  Lớp: {cls}")
                 # Lưu tuple (tên, lớp) vào UserRole
                 item.setData(Qt.UserRole, (name, cls))
@@ -185,11 +189,14 @@ class AttendanceDialog(QDialog):
         try:
             cursor = self.db_conn.cursor()
             cursor.execute("""
-                SELECT name, class_name FROM progress 
+                SELECT name, class_id FROM progress 
                 WHERE id IN (SELECT MAX(id) FROM progress GROUP BY name)
-                ORDER BY class_name, name
             """)
-            self.all_students = cursor.fetchall()
+            # Xếp theo thứ tự lớp trong danh mục rồi theo tên tiếng Việt
+            order = {class_id: i for i, class_id in
+                     enumerate(map(self.registry.class_id, self.registry.class_names()))}
+            rows = sorted(cursor.fetchall(), key=lambda row: (order.get(row[1], len(order)), name_sort_key(row[0])))
+            self.all_students = [(name, self.registry.class_name(class_id)) for name, class_id in rows]
             self.refresh_list()
         except Exception as e:
             print(f"Lỗi DB: {e}")
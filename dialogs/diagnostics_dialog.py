@@ -0,0 +1,58 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPlainTextEdit, QPushButton, QMessageBox)
+from PySide6.QtGui import QGuiApplication, QFontDatabase
+
+import diagnostics
+
+
+class DiagnosticsDialog(QDialog):
+    """Cửa sổ chẩn đoán hiệu năng (Ctrl+Shift+D ở cửa sổ chính), báo cáo sao chép được để gửi lại"""
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+        self.setWindowTitle("Chẩn đoán hiệu năng")
+        self.resize(900, 700)
+
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QPlainTextEdit { border: 1px solid #dee2e6; background-color: #f8f9fa; }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        self.report_view = QPlainTextEdit()
+        self.report_view.setReadOnly(True)
+        self.report_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.report_view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.report_view)
+
+        btn_box = QHBoxLayout()
+        btn_refresh = QPushButton("🔄 Làm mới")
+        btn_refresh.clicked.connect(self.refresh)
+
+        btn_copy = QPushButton("📋 Sao chép báo cáo")
+        btn_copy.setStyleSheet("background-color: #007bff; color: white; font-weight: bold; padding: 8px;")
+        btn_copy.clicked.connect(self.copy_report)
+
+        btn_close = QPushButton("Đóng")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+
+        btn_box.addWidget(btn_refresh)
+        btn_box.addWidget(btn_copy)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_close)
+        layout.addLayout(btn_box)
+
+        layout.addWidget(QLabel("<i>Gửi kèm báo cáo này khi ứng dụng chạy chậm.</i>"))
+
+        self.refresh()
+
+    def refresh(self):
+        try:
+            self.report_view.setPlainText(diagnostics.format_report(diagnostics.collect(self.db)))
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể thu thập thông tin: {e}")
+
+    def copy_report(self):
+        QGuiApplication.clipboard().setText(self.report_view.toPlainText())
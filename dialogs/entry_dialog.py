@@ -6,12 +6,13 @@ from PySide6.QtGui import QIcon
 
 
 class EntryDialog(QDialog):
-    def __init__(self, parent=None, data=None, student_list=None, db_conn=None):
+    def __init__(self, parent=None, data=None, student_list=None, db_conn=None, registry=None):
         super().__init__(parent)
         self.setWindowTitle("Thông tin tiến độ")
         self.setFixedWidth(500)
         self.setWindowIcon(QIcon("logo_app.png"))
         self.db_conn = db_conn
+        self.registry = registry
         
         self.setStyleSheet("""
             QDialog { background-color: #ffffff; }
@@ -38,7 +39,7 @@ class EntryDialog(QDialog):
         self.name_edit = QLineEdit(data[2] if data else "")
         
         self.class_edit = QComboBox()
-        self.class_edit.addItems(["Sáng T7", "Chiều T7", "Sáng CN", "Chiều CN"])
+        self.class_edit.addItems(self.registry.class_names())
         if data: 
             self.class_edit.setCurrentText(data[3])
 
@@ -50,7 +51,7 @@ class EntryDialog(QDialog):
         
 
         self.status_edit = QComboBox()
-        self.status_edit.addItems(["Đi học", "Nghỉ học"])
+        self.status_edit.addItems(self.registry.status_names())
         if data: 
             self.status_edit.setCurrentText(data[4])
         
@@ -81,10 +82,10 @@ class EntryDialog(QDialog):
     def auto_fill_class(self, name):
         if self.db_conn and name:
             cursor = self.db_conn.cursor()
-            cursor.execute("SELECT class_name FROM progress WHERE name = ? ORDER BY date DESC LIMIT 1", (name,))
+            cursor.execute("SELECT class_id FROM progress WHERE name = ? ORDER BY date DESC LIMIT 1", (name,))
             res = cursor.fetchone()
             if res: 
-                self.class_edit.setCurrentText(res[0])
+                self.class_edit.setCurrentText(self.registry.class_name(res[0]))
 
     def validate_and_accept(self):
         if not self.name_edit.text().strip():
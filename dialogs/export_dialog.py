@@ -0,0 +1,161 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QMessageBox, QGroupBox, QDateEdit,
+                             QComboBox, QRadioButton, QFileDialog, QProgressBar)
+from PySide6.QtCore import QDate
+
+from exporters import export_progress, export_students
+from workers import BackgroundJob, with_thread_database
+
+
+class ExportDialog(QDialog):
+    """Xuất bảng tiến độ (theo bộ lọc hiện tại hoặc khoảng ngày) / hồ sơ học sinh ra CSV, XLSX"""
+    def __init__(self, parent, db, filters):
+        super().__init__(parent)
+        self.db = db
+        # Bộ lọc đang dùng ở cửa sổ chính: name, class_name, date
+        self.filters = filters
+        self.setWindowTitle("Xuất dữ liệu ra Excel / CSV")
+        self.resize(520, 280)
+
+        self.job = BackgroundJob(self)
+        self.job.progress.connect(self._on_progress)
+        self.job.finished.connect(self._on_finished)
+        self.job.failed.connect(self._on_failed)
+        self.job.cancelled.connect(self._on_cancelled)
+
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QDateEdit, QComboBox { border: 1px solid #ccc; border-radius: 4px; padding: 5px; }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        source_group = QGroupBox("Dữ liệu cần xuất")
+        source_layout = QVBoxLayout(source_group)
+
+        self.table_input = QComboBox()
+        self.table_input.addItems(["Tiến độ học tập", "Hồ sơ học sinh"])
+        self.table_input.currentIndexChanged.connect(self._update_enabled)
+        source_layout.addWidget(self.table_input)
+
+        self.radio_filter = QRadioButton("Theo bộ lọc đang dùng ở cửa sổ chính")
+        self.radio_filter.setChecked(True)
+        self.radio_range = QRadioButton("Theo khoảng thời gian:")
+        self.radio_range.toggled.connect(self._update_enabled)
+        source_layout.addWidget(self.radio_filter)
+
+        range_row = QHBoxLayout()
+        self.start_date = QDateEdit()
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDisplayFormat("yyyy-MM-dd")
+        self.start_date.setDate(QDate.currentDate().addMonths(-1))
+        self.end_date = QDateEdit()
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDisplayFormat("yyyy-MM-dd")
+        self.end_date.setDate(QDate.currentDate())
+        range_row.addWidget(self.radio_range)
+        range_row.addWidget(self.start_date)
+        range_row.addWidget(QLabel("đến"))
+        range_row.addWidget(self.end_date)
+        source_layout.addLayout(range_row)
+        layout.addWidget(source_group)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        btn_box = QHBoxLayout()
+        self.btn_export = QPushButton("⬇ Xuất file...")
+        self.btn_export.setStyleSheet("background-color: #28a745; color: white; font-weight: bold; padding: 8px;")
+        self.btn_export.clicked.connect(self.export)
+
+        self.btn_cancel = QPushButton("Hủy")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.job.cancel)
+
+        btn_close = QPushButton("Đóng")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+
+        btn_box.addStretch()
+        btn_box.addWidget(self.btn_export)
+        btn_box.addWidget(self.btn_cancel)
+        btn_box.addWidget(btn_close)
+        layout.addLayout(btn_box)
+
+        self._update_enabled()
+
+    def _update_enabled(self):
+        is_progress = self.table_input.currentIndex() == 0
+        self.radio_filter.setEnabled(is_progress)
+        self.radio_range.setEnabled(is_progress)
+        self.start_date.setEnabled(is_progress and self.radio_range.isChecked())
+        self.end_date.setEnabled(is_progress and self.radio_range.isChecked())
+
+    def export(self):
+        is_progress = self.table_input.currentIndex() == 0
+        default_name = "Tien_do_hoc_tap" if is_progress else "Ho_so_hoc_sinh"
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Lưu file",
+            f"{default_name}_{QDate.currentDate().toString('ddMMyy')}.xlsx",
+            "Excel (*.xlsx);;CSV UTF-8 (*.csv)"
+        )
+        if not path:
+            return
+        if not path.lower().endswith((".xlsx", ".csv")):
+            path += ".csv" if "csv" in selected_filter.lower() else ".xlsx"
+
+        if not is_progress:
+            args = (export_students, path)
+            kwargs = {}
+        elif self.radio_range.isChecked():
+            d1 = self.start_date.date().toString("yyyy-MM-dd")
+            d2 = self.end_date.date().toString("yyyy-MM-dd")
+            if d1 > d2:
+                QMessageBox.warning(self, "Lỗi", "Ngày bắt đầu phải trước ngày kết thúc!")
+                return
+            args = (export_progress, path)
+            kwargs = dict(start_date=d1, end_date=d2)
+        else:
+            args = (export_progress, path)
+            kwargs = dict(self.filters)
+
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("Đang xuất...")
+        self.btn_export.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        # Đọc bằng cursor trên kết nối chỉ đọc của luồng nền, ghi ra file từng phần
+        self.job.start(with_thread_database, self.db.db_name, self.db.profile, *args, **kwargs)
+
+    def _on_progress(self, done, total):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Đã ghi {done:,}/{total:,} dòng...")
+
+    def _end(self):
+        self.progress_bar.setVisible(False)
+        self.btn_export.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def _on_finished(self, count):
+        self._end()
+        self.status_label.setText(f"Đã xuất {count:,} dòng.")
+
+    def _on_failed(self, message):
+        self._end()
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {message}")
+
+    def _on_cancelled(self):
+        self._end()
+        self.status_label.setText("Đã hủy, file chưa được tạo.")
+
+    def done(self, result):
+        # Đóng cửa sổ khi đang xuất thì hủy luôn, file tạm sẽ được xóa
+        self.job.cancel()
+        super().done(result)
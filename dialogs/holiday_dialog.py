@@ -0,0 +1,149 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QTableWidget, QTableWidgetItem, QHeaderView,
+                             QPushButton, QAbstractItemView, QMessageBox,
+                             QGroupBox, QDateEdit, QComboBox, QLineEdit)
+from PySide6.QtCore import Qt, QDate
+
+from registry import ALL_CLASSES
+
+# Thứ trong tuần theo weekday của class_schedule (0 = Thứ 2, ..., 6 = Chủ nhật)
+WEEKDAY_NAMES = ["Thứ 2", "Thứ 3", "Thứ 4", "Thứ 5", "Thứ 6", "Thứ 7", "Chủ nhật"]
+
+
+class HolidayDialog(QDialog):
+    """Quản lý ngày nghỉ lễ / buổi học bị hủy (không tính là buổi nghỉ của học sinh)"""
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+        self.setWindowTitle("Ngày nghỉ lễ / buổi học bị hủy")
+        self.resize(650, 500)
+
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QTableWidget { border: 1px solid #dee2e6; gridline-color: #eee; }
+            QHeaderView::section { background-color: #f8f9fa; font-weight: bold; border: 1px solid #dee2e6; }
+            QLineEdit, QDateEdit, QComboBox { border: 1px solid #ccc; border-radius: 4px; padding: 5px; }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        add_group = QGroupBox("Thêm ngày nghỉ")
+        add_layout = QHBoxLayout(add_group)
+
+        self.date_input = QDateEdit()
+        self.date_input.setCalendarPopup(True)
+        self.date_input.setDisplayFormat("yyyy-MM-dd")
+        self.date_input.setDate(QDate.currentDate())
+
+        self.class_input = QComboBox()
+        self.class_input.addItems([ALL_CLASSES] + self.db.registry.class_names())
+
+        self.reason_input = QLineEdit()
+        self.reason_input.setPlaceholderText("Lý do (VD: Nghỉ Tết)")
+
+        btn_add = QPushButton("➕ Thêm")
+        btn_add.setStyleSheet("background-color: #28a745; color: white; font-weight: bold; padding: 5px 12px;")
+        btn_add.clicked.connect(self.add_holiday)
+
+        add_layout.addWidget(self.date_input)
+        add_layout.addWidget(self.class_input)
+        add_layout.addWidget(self.reason_input)
+        add_layout.addWidget(btn_add)
+        layout.addWidget(add_group)
+
+        # Lớp mới chỉ được thêm ở đây (ghi điểm danh / nhập CSV với tên lớp lạ sẽ báo lỗi)
+        class_group = QGroupBox("Thêm lớp học")
+        class_layout = QHBoxLayout(class_group)
+
+        self.new_class_input = QLineEdit()
+        self.new_class_input.setPlaceholderText("Tên lớp (VD: Tối T4)")
+
+        self.weekday_input = QComboBox()
+        self.weekday_input.addItems(WEEKDAY_NAMES)
+
+        btn_add_class = QPushButton("➕ Thêm lớp")
+        btn_add_class.setStyleSheet("background-color: #007bff; color: white; font-weight: bold; padding: 5px 12px;")
+        btn_add_class.clicked.connect(self.add_class)
+
+        class_layout.addWidget(self.new_class_input)
+        class_layout.addWidget(self.weekday_input)
+        class_layout.addWidget(btn_add_class)
+        layout.addWidget(class_group)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["ID", "Ngày", "Lớp", "Lý do"])
+        self.table.hideColumn(0)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        btn_box = QHBoxLayout()
+        btn_delete = QPushButton("🗑 Xóa ngày đã chọn")
+        btn_delete.setStyleSheet("background-color: #dc3545; color: white; font-weight: bold; padding: 8px;")
+        btn_delete.clicked.connect(self.delete_selected)
+
+        btn_close = QPushButton("Đóng")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+
+        btn_box.addWidget(btn_delete)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_close)
+        layout.addLayout(btn_box)
+
+        layout.addWidget(QLabel("<i>Các buổi học rơi vào ngày nghỉ sẽ không được tính vào số buổi dự kiến.</i>"))
+
+        self.load_holidays()
+
+    def load_holidays(self):
+        self.table.setRowCount(0)
+        for session_id, date, class_name, reason in self.db.get_cancelled_sessions():
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(str(session_id)))
+            self.table.setItem(row, 1, QTableWidgetItem(date))
+            self.table.setItem(row, 2, QTableWidgetItem(class_name or ALL_CLASSES))
+            self.table.setItem(row, 3, QTableWidgetItem(reason or ""))
+
+    def add_holiday(self):
+        class_name = self.class_input.currentText()
+        try:
+            self.db.add_cancelled_session(
+                self.date_input.date().toString("yyyy-MM-dd"),
+                None if class_name == ALL_CLASSES else class_name,
+                self.reason_input.text().strip()
+            )
+            self.reason_input.clear()
+            self.load_holidays()
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể thêm ngày nghỉ: {e}")
+
+    def add_class(self):
+        class_name = self.new_class_input.text().strip()
+        if not class_name:
+            QMessageBox.warning(self, "Thông báo", "Vui lòng nhập tên lớp!")
+            return
+        if class_name in self.db.registry.class_names():
+            QMessageBox.warning(self, "Thông báo", f"Lớp {class_name} đã có!")
+            return
+        try:
+            self.db.add_class(class_name, [self.weekday_input.currentIndex()])
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể thêm lớp: {e}")
+            return
+        self.new_class_input.clear()
+        self.class_input.addItem(class_name)
+
+    def delete_selected(self):
+        selected_rows = self.table.selectionModel().selectedRows()
+        if not selected_rows:
+            QMessageBox.warning(self, "Thông báo", "Vui lòng chọn ngày nghỉ cần xóa!")
+            return
+        try:
+            for row in selected_rows:
+                self.db.delete_cancelled_session(int(self.table.item(row.row(), 0).text()))
+            self.load_holidays()
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể xóa ngày nghỉ: {e}")
@@ -0,0 +1,181 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QMessageBox, QGroupBox, QLineEdit,
+                             QCheckBox, QFileDialog, QProgressBar, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView)
+
+from database import Database
+from importers import import_progress_csv, write_import_report
+from workers import BackgroundJob
+
+# Số dòng bỏ qua / từ chối tối đa hiển thị trên bảng
+MAX_PROBLEM_ROWS = 2000
+
+
+def _import_in_thread(db_name, profile, path, overwrite, allow_unknown_names, progress=None):
+    # Kết nối ghi riêng cho luồng nền (kết nối của cửa sổ chính chỉ dùng được trên luồng giao diện).
+    # Bộ đệm truy vấn dùng chung theo file nên cửa sổ chính thấy dữ liệu mới ngay
+    db = Database(db_name, profile)
+    try:
+        return import_progress_csv(db, path, overwrite, allow_unknown_names, progress=progress)
+    finally:
+        db.conn.close()
+
+
+class ImportDialog(QDialog):
+    """Nhập hàng loạt điểm danh / nhận xét từ file CSV, báo cáo từng dòng nhận / bỏ qua / từ chối"""
+    def __init__(self, parent, db):
+        super().__init__(parent)
+        self.db = db
+        self.report = None
+        self.setWindowTitle("Nhập dữ liệu từ CSV")
+        self.resize(750, 550)
+
+        self.job = BackgroundJob(self)
+        self.job.progress.connect(self._on_progress)
+        self.job.finished.connect(self._on_finished)
+        self.job.failed.connect(self._on_failed)
+        self.job.cancelled.connect(self._end)
+
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QLineEdit { border: 1px solid #ccc; border-radius: 4px; padding: 5px; }
+            QTableWidget { border: 1px solid #dee2e6; gridline-color: #eee; }
+            QHeaderView::section { background-color: #f8f9fa; font-weight: bold; border: 1px solid #dee2e6; }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        options = QGroupBox("File CSV (các cột: Ngày, Họ tên, Lớp, Trạng thái, Nội dung / nhận xét, Đánh dấu)")
+        options_layout = QVBoxLayout(options)
+
+        file_row = QHBoxLayout()
+        self.file_input = QLineEdit()
+        self.file_input.setPlaceholderText("Chọn file CSV (UTF-8)")
+        btn_browse = QPushButton("Chọn...")
+        btn_browse.clicked.connect(self.choose_file)
+        file_row.addWidget(self.file_input)
+        file_row.addWidget(btn_browse)
+        options_layout.addLayout(file_row)
+
+        self.check_overwrite = QCheckBox("Ghi đè buổi đã có (trùng tên, ngày, lớp); bỏ chọn để bỏ qua")
+        self.check_unknown = QCheckBox("Nhận cả tên chưa có hồ sơ học sinh")
+        options_layout.addWidget(self.check_overwrite)
+        options_layout.addWidget(self.check_unknown)
+        layout.addWidget(options)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Các dòng bị bỏ qua / từ chối kèm số dòng trong file
+        self.problem_table = QTableWidget(0, 3)
+        self.problem_table.setHorizontalHeaderLabels(["Dòng", "Kết quả", "Lý do"])
+        self.problem_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.problem_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.problem_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.problem_table)
+
+        btn_box = QHBoxLayout()
+        self.btn_import = QPushButton("⬆ Nhập dữ liệu")
+        self.btn_import.setStyleSheet("background-color: #28a745; color: white; font-weight: bold; padding: 8px;")
+        self.btn_import.clicked.connect(self.start_import)
+
+        self.btn_cancel = QPushButton("Dừng")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.job.cancel)
+
+        self.btn_save_report = QPushButton("💾 Lưu báo cáo")
+        self.btn_save_report.setEnabled(False)
+        self.btn_save_report.clicked.connect(self.save_report)
+
+        btn_close = QPushButton("Đóng")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+
+        btn_box.addWidget(self.btn_save_report)
+        btn_box.addStretch()
+        btn_box.addWidget(self.btn_import)
+        btn_box.addWidget(self.btn_cancel)
+        btn_box.addWidget(btn_close)
+        layout.addLayout(btn_box)
+
+    def choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Chọn file CSV", "", "CSV (*.csv);;Tất cả (*)")
+        if path:
+            self.file_input.setText(path)
+
+    def start_import(self):
+        path = self.file_input.text().strip()
+        if not path:
+            QMessageBox.warning(self, "Thiếu thông tin", "Vui lòng chọn file CSV!")
+            return
+
+        self.report = None
+        self.problem_table.setRowCount(0)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.status_label.setText("Đang nhập...")
+        self.btn_import.setEnabled(False)
+        self.btn_save_report.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.job.start(_import_in_thread, self.db.db_name, self.db.profile, path,
+                       self.check_overwrite.isChecked(), self.check_unknown.isChecked())
+
+    def _on_progress(self, done, total):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Đã xử lý {done:,}/{total:,} dòng...")
+
+    def _end(self):
+        self.progress_bar.setVisible(False)
+        self.btn_import.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def _on_finished(self, report):
+        self._end()
+        self.report = report
+        self.btn_save_report.setEnabled(True)
+
+        text = (f"Đã nhập {len(report.accepted):,} dòng (ghi đè {len(report.updated):,}), "
+                f"bỏ qua {len(report.skipped):,}, từ chối {len(report.rejected):,}.")
+        if report.cancelled:
+            text = "Đã dừng giữa chừng, các dòng trước đó đã được lưu. " + text
+        self.status_label.setText(text)
+
+        problems = sorted([(line, "Bỏ qua", reason) for line, reason in report.skipped] +
+                          [(line, "Từ chối", reason) for line, reason in report.rejected])
+        if len(problems) > MAX_PROBLEM_ROWS:
+            # Danh sách đầy đủ nằm trong file báo cáo
+            self.status_label.setText(
+                text + f" Bảng chỉ hiện {MAX_PROBLEM_ROWS:,} dòng đầu, bấm \"Lưu báo cáo\" để xem hết."
+            )
+            problems = problems[:MAX_PROBLEM_ROWS]
+        self.problem_table.setRowCount(len(problems))
+        for row, (line, result, reason) in enumerate(problems):
+            self.problem_table.setItem(row, 0, QTableWidgetItem(str(line)))
+            self.problem_table.setItem(row, 1, QTableWidgetItem(result))
+            self.problem_table.setItem(row, 2, QTableWidgetItem(reason))
+
+    def _on_failed(self, message):
+        self._end()
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Lỗi", f"Không thể nhập file: {message}")
+
+    def save_report(self):
+        if self.report is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Lưu báo cáo nhập", "Bao_cao_nhap.csv", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            write_import_report(self.report, path)
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể lưu báo cáo: {e}")
+
+    def done(self, result):
+        # Đóng cửa sổ khi đang nhập thì dừng sau lô hiện tại
+        self.job.cancel()
+        super().done(result)
@@ -0,0 +1,151 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QMessageBox, QGroupBox, QDateEdit,
+                             QComboBox, QLineEdit, QFileDialog, QProgressBar,
+                             QPlainTextEdit)
+from PySide6.QtCore import QDate
+
+from parent_reports import plan_batch, generate_parent_reports
+from workers import BackgroundJob
+
+
+class ParentReportDialog(QDialog):
+    """Tạo hàng loạt phiếu báo học tập gửi phụ huynh (mỗi học sinh / mỗi lớp một file Word)"""
+    def __init__(self, parent, db, start_date=None, end_date=None):
+        super().__init__(parent)
+        self.db = db
+        self.setWindowTitle("Phiếu báo phụ huynh")
+        self.resize(650, 450)
+
+        # Vòng lặp nhận kết quả chạy ở luồng nền, việc tạo file chạy trên nhiều tiến trình
+        self.job = BackgroundJob(self)
+        self.job.progress.connect(self._on_progress)
+        self.job.finished.connect(self._on_finished)
+        self.job.failed.connect(self._on_failed)
+        self.job.cancelled.connect(self._on_cancelled)
+
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QLineEdit, QDateEdit, QComboBox { border: 1px solid #ccc; border-radius: 4px; padding: 5px; }
+            QPlainTextEdit { border: 1px solid #dee2e6; }
+        """)
+
+        layout = QVBoxLayout(self)
+
+        options = QGroupBox("Tùy chọn")
+        options_layout = QVBoxLayout(options)
+
+        date_row = QHBoxLayout()
+        self.start_date = QDateEdit()
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDate(start_date if start_date is not None else QDate.currentDate().addMonths(-1))
+        self.end_date = QDateEdit()
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDate(end_date if end_date is not None else QDate.currentDate())
+        self.mode_input = QComboBox()
+        self.mode_input.addItems(["Mỗi học sinh một file", "Mỗi lớp một file"])
+        date_row.addWidget(QLabel("Từ ngày:"))
+        date_row.addWidget(self.start_date)
+        date_row.addWidget(QLabel("Đến ngày:"))
+        date_row.addWidget(self.end_date)
+        date_row.addWidget(self.mode_input)
+        options_layout.addLayout(date_row)
+
+        folder_row = QHBoxLayout()
+        self.folder_input = QLineEdit()
+        self.folder_input.setPlaceholderText("Thư mục lưu các file")
+        btn_browse = QPushButton("Chọn...")
+        btn_browse.clicked.connect(self.choose_folder)
+        folder_row.addWidget(self.folder_input)
+        folder_row.addWidget(btn_browse)
+        options_layout.addLayout(folder_row)
+        layout.addWidget(options)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Danh sách file bị lỗi sau khi chạy xong
+        self.failures = QPlainTextEdit()
+        self.failures.setReadOnly(True)
+        self.failures.setPlaceholderText("Các file bị lỗi sẽ được liệt kê ở đây")
+        layout.addWidget(self.failures)
+
+        btn_box = QHBoxLayout()
+        self.btn_start = QPushButton("📨 Tạo phiếu báo")
+        self.btn_start.setStyleSheet("background-color: #2b5797; color: white; font-weight: bold; padding: 8px;")
+        self.btn_start.clicked.connect(self.start)
+
+        self.btn_cancel = QPushButton("Hủy")
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.job.cancel)
+
+        btn_close = QPushButton("Đóng")
+        btn_close.setFixedWidth(100)
+        btn_close.clicked.connect(self.accept)
+
+        btn_box.addStretch()
+        btn_box.addWidget(self.btn_start)
+        btn_box.addWidget(self.btn_cancel)
+        btn_box.addWidget(btn_close)
+        layout.addLayout(btn_box)
+
+    def choose_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Chọn thư mục lưu phiếu báo", self.folder_input.text())
+        if folder:
+            self.folder_input.setText(folder)
+
+    def start(self):
+        folder = self.folder_input.text().strip()
+        if not folder:
+            QMessageBox.warning(self, "Thiếu thông tin", "Vui lòng chọn thư mục lưu file!")
+            return
+        d1 = self.start_date.date().toString("yyyy-MM-dd")
+        d2 = self.end_date.date().toString("yyyy-MM-dd")
+        if d1 > d2:
+            QMessageBox.warning(self, "Lỗi", "Ngày bắt đầu phải trước ngày kết thúc!")
+            return
+
+        jobs = plan_batch(self.db, per_class=self.mode_input.currentIndex() == 1)
+        if not jobs:
+            QMessageBox.information(self, "Thông báo", "Chưa có hồ sơ học sinh nào.")
+            return
+
+        self.failures.clear()
+        self.progress_bar.setRange(0, len(jobs))
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Đang tạo {len(jobs)} file...")
+        self.btn_start.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.job.start(generate_parent_reports, self.db.db_name, jobs, folder, d1, d2, self.db.profile)
+
+    def _on_progress(self, done, total):
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Đã xử lý {done}/{total} file...")
+
+    def _end(self):
+        self.btn_start.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+
+    def _on_finished(self, result):
+        self._end()
+        self.status_label.setText(
+            f"Hoàn tất: {len(result.written)} file thành công, {len(result.failed)} file lỗi."
+        )
+        self.failures.setPlainText("\n".join(f"{label}: {message}" for label, message in result.failed))
+
+    def _on_failed(self, message):
+        self._end()
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Lỗi", f"Không thể tạo phiếu báo: {message}")
+
+    def _on_cancelled(self):
+        self._end()
+        self.status_label.setText("Đã hủy. Các file đã tạo xong vẫn được giữ lại.")
+
+    def done(self, result):
+        # Đóng cửa sổ khi đang chạy thì hủy các file chưa bắt đầu
+        self.job.cancel()
+        super().done(result)
@@ -1,18 +1,37 @@
-import calendar
+import time
+
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QTableWidget, QTableWidgetItem, QHeaderView, 
                              QPushButton, QAbstractItemView, QFileDialog, 
-                             QMessageBox, QGroupBox, QDateEdit)
+                             QMessageBox, QGroupBox, QDateEdit, QProgressBar)
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QGuiApplication, QColor
 
+import diagnostics
+from reports import build_stats_report, summary_rows, detail_rows, with_comments, write_report_docx
+from workers import QueryExecutor, BackgroundJob
+from dialogs.parent_report_dialog import ParentReportDialog
+
 
 class StatisticsDialog(QDialog):
-    def __init__(self, parent, db_conn):
+    def __init__(self, parent, db):
         super().__init__(parent)
         self.setWindowTitle("Báo cáo thống kê đào tạo")
         self.resize(1000, 750)
-        self.db_conn = db_conn
+        self.db = db
+        self.report = None
+
+        # Báo cáo được tính ở luồng nền để cửa sổ không bị treo
+        self.executor = QueryExecutor(db.db_name, db.profile, self)
+        self.executor.finished.connect(self._on_report_ready)
+        self.executor.failed.connect(self._on_report_failed)
+
+        # Xuất Word cũng chạy nền, có thanh tiến độ và nút hủy
+        self.export_job = BackgroundJob(self)
+        self.export_job.progress.connect(self._on_export_progress)
+        self.export_job.finished.connect(self._on_export_finished)
+        self.export_job.failed.connect(self._on_export_failed)
+        self.export_job.cancelled.connect(self._on_export_cancelled)
         
         self.setStyleSheet("""
             QDialog { background-color: #ffffff; }
@@ -44,11 +63,18 @@ class StatisticsDialog(QDialog):
         btn_refresh.setStyleSheet("background-color: #17a2b8; color: white; font-weight: bold; font-size :14px;")
         btn_refresh.clicked.connect(self.calculate_stats)
         
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setFixedWidth(150)
+        self.busy_bar.setVisible(False)
+        self.executor.busy_changed.connect(self.busy_bar.setVisible)
+        
         filter_layout.addWidget(QLabel("Từ ngày:"))
         filter_layout.addWidget(self.start_date)
         filter_layout.addWidget(QLabel("Đến ngày:"))
         filter_layout.addWidget(self.end_date)
         filter_layout.addWidget(btn_refresh)
+        filter_layout.addWidget(self.busy_bar)
         filter_layout.addStretch()
         layout.addWidget(filter_group)
 
@@ -95,11 +121,27 @@ class StatisticsDialog(QDialog):
         self.btn_export_word.setFixedSize(180, 40)
         self.btn_export_word.clicked.connect(self.export_to_word)
         
+        self.export_bar = QProgressBar()
+        self.export_bar.setFixedWidth(200)
+        self.export_bar.setVisible(False)
+
+        self.btn_cancel_export = QPushButton("Hủy xuất")
+        self.btn_cancel_export.setFixedSize(100, 40)
+        self.btn_cancel_export.setVisible(False)
+        self.btn_cancel_export.clicked.connect(self.export_job.cancel)
+
+        btn_parent_reports = QPushButton("📨 Phiếu báo phụ huynh")
+        btn_parent_reports.setFixedSize(180, 40)
+        btn_parent_reports.clicked.connect(self.open_parent_reports)
+
         btn_close = QPushButton("Đóng")
         btn_close.setFixedSize(100, 40)
         btn_close.clicked.connect(self.close)
         
         btn_box.addStretch()
+        btn_box.addWidget(self.export_bar)
+        btn_box.addWidget(self.btn_cancel_export)
+        btn_box.addWidget(btn_parent_reports)
         btn_box.addWidget(self.btn_export_word)
         btn_box.addWidget(btn_close)
         layout.addLayout(btn_box)
@@ -128,122 +170,68 @@ class StatisticsDialog(QDialog):
         else:
             super().keyPressEvent(event)
 
-    def count_weekends_in_month(self, year, month):
-        count = 0
-        num_days = calendar.monthrange(year, month)[1]
-        for day in range(1, num_days + 1):
-            # 5 là Thứ 7, 6 là Chủ nhật trong thư viện calendar
-            if calendar.weekday(year, month, day) in [5, 6]:
-                count += 1
-        return count
-    
     def calculate_stats(self):
         d1 = self.start_date.date().toString("yyyy-MM-dd")
         d2 = self.end_date.date().toString("yyyy-MM-dd")
-        cursor = self.db_conn.cursor()
-        
-        classes = ["Sáng T7", "Chiều T7", "Sáng CN", "Chiều CN"]
-        
-        # 1. Bảng tóm tắt
-        self.summary_table.setRowCount(0)
-        from database import Database
-        db_temp = Database()
-        
-        for class_name in classes:
-            # Sĩ số: Lấy số lượng học sinh của từng lớp đang có
-            cursor.execute("SELECT COUNT(DISTINCT name) FROM progress WHERE class_name = ? AND date BETWEEN ? AND ?", 
-                          (class_name, d1, d2))
-            total_students = cursor.fetchone()[0] or 0
-            
-            # Tính số buổi cho lớp này trong khoảng thời gian đã chọn
-            expected_sessions = db_temp.count_expected_sessions(class_name, d1, d2)
-            
-            # Tổng số buổi= sĩ số × số buổi
-            total_expected = total_students * expected_sessions
-            
-            # Số buổi đi học thực tế
-            cursor.execute("SELECT COUNT(*) FROM progress WHERE class_name = ? AND status = 'Đi học' AND date BETWEEN ? AND ?", 
-                           (class_name, d1, d2))
-            present = cursor.fetchone()[0] or 0
-            
-            # Số buổi nghỉ = tổng dự kiến - số buổi đi
-            absent = max(0, total_expected - present)
-            
-            # Tỉ lệ % = (số buổi đi / tổng dự kiến) × 100
-            percent = (present / total_expected * 100) if total_expected > 0 else 0
 
-            row = self.summary_table.rowCount()
-            self.summary_table.insertRow(row)
-            self.summary_table.setItem(row, 0, QTableWidgetItem(class_name))
-            self.summary_table.setItem(row, 1, QTableWidgetItem(str(total_students)))
-            self.summary_table.setItem(row, 2, QTableWidgetItem(str(present)))
-            self.summary_table.setItem(row, 3, QTableWidgetItem(str(absent)))
-            self.summary_table.setItem(row, 4, QTableWidgetItem(f"{percent:.1f}%"))
+        # Tính toàn bộ báo cáo một lần ở luồng nền, các bảng và file Word dùng chung
+        self.btn_export_word.setEnabled(False)
+        self._stats_started = time.perf_counter()
+        self.executor.submit("report", build_stats_report, d1, d2)
+
+    def _on_report_failed(self, key, message):
+        QMessageBox.critical(self, "Lỗi", f"Không thể tính thống kê: {message}")
+
+    def _on_report_ready(self, key, report):
+        self.report = report
+        self.btn_export_word.setEnabled(not self.export_job.is_running())
+
+        # 1. Bảng tóm tắt
+        self._fill_table(self.summary_table, summary_rows(self.report))
 
         # 2. Bảng thống kê số buổi học theo ID học sinh
         self.student_stats_table.setRowCount(0)
-        from database import Database
-        db = Database()
-        students_with_attendance = db.get_all_students_with_attendance(d1, d2)
-        
-        for student_id, name, class_name, attended, absent, total in students_with_attendance:
-            row = self.student_stats_table.rowCount()
-            self.student_stats_table.insertRow(row)
-            self.student_stats_table.setItem(row, 0, QTableWidgetItem(student_id))
-            self.student_stats_table.setItem(row, 1, QTableWidgetItem(name))
-            self.student_stats_table.setItem(row, 2, QTableWidgetItem(class_name))
+        self.student_stats_table.setRowCount(len(self.report.students))
+        for row, item in enumerate(self.report.students):
+            self.student_stats_table.setItem(row, 0, QTableWidgetItem(item.student_id))
+            self.student_stats_table.setItem(row, 1, QTableWidgetItem(item.name))
+            self.student_stats_table.setItem(row, 2, QTableWidgetItem(item.class_name or ""))
             
             # Tô màu cho số buổi đi học
-            attended_item = QTableWidgetItem(str(attended))
+            attended_item = QTableWidgetItem(str(item.attended))
             attended_item.setForeground(QColor("#28a745"))
             attended_item.setTextAlignment(Qt.AlignCenter)
             self.student_stats_table.setItem(row, 3, attended_item)
             
             # Tô màu cho số buổi nghỉ
-            absent_item = QTableWidgetItem(str(absent))
+            absent_item = QTableWidgetItem(str(item.absent))
             absent_item.setForeground(QColor("#dc3545"))
             absent_item.setTextAlignment(Qt.AlignCenter)
             self.student_stats_table.setItem(row, 4, absent_item)
             
             # Tổng số buổi
-            total_item = QTableWidgetItem(str(total))
+            total_item = QTableWidgetItem(str(item.total))
             total_item.setTextAlignment(Qt.AlignCenter)
             self.student_stats_table.setItem(row, 5, total_item)
 
         # 3. Bảng chi tiết
-        self.detail_table.setRowCount(0)
-        
-        # Lấy danh sách học sinh từ bảng students với các lớp của họ
-        cursor.execute("""
-            SELECT DISTINCT s.name, s.class_name
-            FROM students s
-            ORDER BY s.name
-        """)
-        
-        students_list = cursor.fetchall()
-        
-        for s_name, s_class in students_list:
-            # Lấy tất cả các lớp học sinh tham gia trong khoảng thời gian
-            cursor.execute("""
-                SELECT DISTINCT class_name 
-                FROM progress 
-                WHERE name = ? AND date BETWEEN ? AND ?
-                ORDER BY class_name
-            """, (s_name, d1, d2))
-            
-            classes_in_period = [row[0] for row in cursor.fetchall()]
-            display_classes = ", ".join(classes_in_period) if classes_in_period else s_class
+        self._fill_table(self.detail_table, detail_rows(self.report))
 
-            row = self.detail_table.rowCount()
-            self.detail_table.insertRow(row)
-            self.detail_table.setItem(row, 0, QTableWidgetItem(s_name))
-            self.detail_table.setItem(row, 1, QTableWidgetItem(display_classes))
-            self.detail_table.setItem(row, 2, QTableWidgetItem(""))  # Nhận xét để trống
+        # Từ lúc bấm tính tới khi các bảng hiện xong (xem cửa sổ chẩn đoán)
+        diagnostics.record_timing("calculate_stats", time.perf_counter() - self._stats_started)
+
+    def _fill_table(self, table, rows):
+        rows = list(rows)
+        table.setRowCount(0)
+        table.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, text in enumerate(values):
+                table.setItem(r, c, QTableWidgetItem(text))
 
     def export_to_word(self):
         #Xuất báo cáo ra file Word
-        from docx import Document
-        
+        if self.report is None or self.export_job.is_running():
+            return
         path, _ = QFileDialog.getSaveFileName(
             self, 
             "Lưu báo cáo", 
@@ -253,67 +241,45 @@ class StatisticsDialog(QDialog):
         if not path:
             return
 
-        try:
-            doc = Document()
-            doc.add_heading('BÁO CÁO TÌNH HÌNH HỌC TẬP', 0)
-            
-            # Thông tin thời gian
-            time_str = f"Từ ngày: {self.start_date.date().toString('dd/MM/yyyy')} đến ngày: {self.end_date.date().toString('dd/MM/yyyy')}"
-            doc.add_paragraph(time_str)
-
-            # 1. Bảng tóm tắt
-            doc.add_heading('1. Thống kê chuyên cần theo lớp', level=1)
-            table1 = doc.add_table(rows=1, cols=5)
-            table1.style = 'Table Grid'
-            hdr_cells = table1.rows[0].cells
-            hdr_cells[0].text = 'Tên lớp'
-            hdr_cells[1].text = 'Sĩ số'
-            hdr_cells[2].text = 'Đi học'
-            hdr_cells[3].text = 'Nghỉ học'
-            hdr_cells[4].text = 'Tỉ lệ (%)'
-
-            for r in range(self.summary_table.rowCount()):
-                row_cells = table1.add_row().cells
-                for c in range(5):
-                    row_cells[c].text = self.summary_table.item(r, c).text()
-
-            doc.add_paragraph("\n")
-
-            # 2. Bảng thống kê số buổi học theo ID
-            doc.add_heading('2. Thống kê số buổi học theo ID học sinh', level=1)
-            table_students = doc.add_table(rows=1, cols=6)
-            table_students.style = 'Table Grid'
-            hdr_students = table_students.rows[0].cells
-            hdr_students[0].text = 'ID học sinh'
-            hdr_students[1].text = 'Họ tên'
-            hdr_students[2].text = 'Lớp'
-            hdr_students[3].text = 'Số buổi đi học'
-            hdr_students[4].text = 'Số buổi nghỉ'
-            hdr_students[5].text = 'Tổng số buổi'
-
-            for r in range(self.student_stats_table.rowCount()):
-                row_cells = table_students.add_row().cells
-                for c in range(6):
-                    row_cells[c].text = self.student_stats_table.item(r, c).text()
-
-            doc.add_paragraph("\n")
-
-            # 3. Bảng chi tiết
-            doc.add_heading('3. Chi tiết học viên và nhận xét', level=1)
-            table2 = doc.add_table(rows=1, cols=3)
-            table2.style = 'Table Grid'
-            hdr_cells2 = table2.rows[0].cells
-            hdr_cells2[0].text = 'Họ tên'
-            hdr_cells2[1].text = 'Lớp đang học'
-            hdr_cells2[2].text = 'Nhận xét'
-
-            for r in range(self.detail_table.rowCount()):
-                row_cells = table2.add_row().cells
-                for c in range(3):
-                    item = self.detail_table.item(r, c)
-                    row_cells[c].text = item.text() if item else ""
-
-            doc.save(path)
-            QMessageBox.information(self, "Thành công", f"Đã xuất báo cáo tại:\n{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {str(e)}")
+        # Dữ liệu lấy từ báo cáo đã tính; chỉ nhận xét được giáo viên gõ
+        # trực tiếp vào bảng chi tiết nên phải đọc từ bảng
+        comments = []
+        for r in range(self.detail_table.rowCount()):
+            item = self.detail_table.item(r, 2)
+            comments.append(item.text() if item else "")
+        report = with_comments(self.report, comments)
+
+        self.btn_export_word.setEnabled(False)
+        self.export_bar.setRange(0, 0)
+        self.export_bar.setVisible(True)
+        self.btn_cancel_export.setVisible(True)
+        self.export_job.start(write_report_docx, report, path)
+
+    def _on_export_progress(self, done, total):
+        self.export_bar.setRange(0, total)
+        self.export_bar.setValue(done)
+
+    def _end_export(self):
+        self.export_bar.setVisible(False)
+        self.btn_cancel_export.setVisible(False)
+        self.btn_export_word.setEnabled(self.report is not None)
+
+    def _on_export_finished(self, path):
+        self._end_export()
+        QMessageBox.information(self, "Thành công", f"Đã xuất báo cáo tại:\n{path}")
+
+    def _on_export_failed(self, message):
+        self._end_export()
+        QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {message}")
+
+    def _on_export_cancelled(self):
+        self._end_export()
+
+    def open_parent_reports(self):
+        dialog = ParentReportDialog(self, self.db, self.start_date.date(), self.end_date.date())
+        dialog.exec()
+
+    def done(self, result):
+        # Đóng cửa sổ khi đang xuất thì hủy luôn, file tạm sẽ được xóa
+        self.export_job.cancel()
+        super().done(result)
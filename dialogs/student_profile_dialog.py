@@ -2,11 +2,14 @@ from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
                              QTableWidgetItem, QPushButton, QLineEdit, QLabel,
                              QHeaderView, QAbstractItemView, QMessageBox, 
                              QFormLayout, QGroupBox, QDateEdit, QTextEdit, QComboBox,
-                             QCheckBox, QSpinBox)
-from PySide6.QtCore import Qt, QDate
+                             QCheckBox, QSpinBox, QProgressBar)
+from PySide6.QtCore import Qt, QDate, QTimer
 from PySide6.QtGui import QColor
 from collections import defaultdict
 
+from database import Database
+from workers import QueryExecutor
+
 
 class StudentProfileDialog(QDialog):
     def __init__(self, parent, db):
@@ -14,6 +17,17 @@ class StudentProfileDialog(QDialog):
         self.db = db
         self.setWindowTitle("Quản lý hồ sơ học sinh")
         self.resize(1100, 700)
+
+        # Tải / tìm kiếm ở luồng nền, kết quả cũ bị bỏ qua khi có truy vấn mới hơn
+        self.executor = QueryExecutor(db.db_name, db.profile, self)
+        self.executor.finished.connect(self._on_students_loaded)
+        self.executor.failed.connect(self._on_students_failed)
+
+        # Chờ người dùng ngừng gõ một chút rồi mới tìm
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.search_students)
         
         self.setStyleSheet("""
             QDialog { background-color: #f8f9fa; }
@@ -61,9 +75,16 @@ class StudentProfileDialog(QDialog):
         search_layout.addWidget(QLabel("Tìm kiếm:"))
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText("Nhập ID hoặc tên học sinh...")
-        self.search_box.textChanged.connect(self.search_students)
+        self.search_box.textChanged.connect(lambda _: self.search_timer.start())
         search_layout.addWidget(self.search_box)
         
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setFixedWidth(100)
+        self.busy_bar.setVisible(False)
+        self.executor.busy_changed.connect(self.busy_bar.setVisible)
+        search_layout.addWidget(self.busy_bar)
+        
         self.btn_import = QPushButton("📥 Import từ tiến độ học tập")
         self.btn_import.setStyleSheet("background-color: #20c997; color: white; font-weight: bold;")
         self.btn_import.setFixedHeight(35)
@@ -120,30 +141,29 @@ class StudentProfileDialog(QDialog):
         layout.addLayout(btn_layout)
     
     def load_students(self):
-        """Tải danh sách học sinh vào bảng"""
-        self.table.setRowCount(0)
-        students = self.db.get_all_students()
-        
-        for row_data in students:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            for col, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value) if value else "")
-                self.table.setItem(row, col, item)
+        """Tải danh sách học sinh vào bảng (giữ từ khóa tìm kiếm đang nhập)"""
+        if self.search_box.text():
+            self.search_students()
+        else:
+            self.executor.submit("students", Database.get_all_students)
     
     def search_students(self):
         """Tìm kiếm học sinh"""
+        self.search_timer.stop()
         keyword = self.search_box.text()
+        self.executor.submit("students", Database.search_students, keyword)
+    
+    def _on_students_loaded(self, key, students):
         self.table.setRowCount(0)
-        students = self.db.search_students(keyword)
-        
-        for row_data in students:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
+        self.table.setRowCount(len(students))
+        for row, row_data in enumerate(students):
             for col, value in enumerate(row_data):
                 item = QTableWidgetItem(str(value) if value else "")
                 self.table.setItem(row, col, item)
     
+    def _on_students_failed(self, key, message):
+        QMessageBox.critical(self, "Lỗi", f"Không thể tải danh sách học sinh: {message}")
+    
     def add_student(self):
         """Thêm học sinh mới"""
         dialog = StudentFormDialog(self, self.db)
@@ -225,12 +245,12 @@ class StudentProfileDialog(QDialog):
         
         # Phân tích số buổi/tuần cho mỗi học sinh
         cursor = self.db.conn.cursor()
-        cursor.execute('SELECT DISTINCT name, class_name FROM progress')
+        cursor.execute('SELECT DISTINCT name, class_id FROM progress')
         all_records = cursor.fetchall()
         
         student_sessions = defaultdict(set)
-        for name, class_name in all_records:
-            student_sessions[name].add(class_name)
+        for name, class_id in all_records:
+            student_sessions[name].add(self.db.registry.class_name(class_id))
         
         # Loại bỏ duplicates dựa trên name (vì get_students_without_profile chỉ trả 1 dòng/học sinh)
         seen_names = set()
@@ -329,7 +349,7 @@ class StudentFormDialog(QDialog):
         
         # Lớp học
         self.class_input = QComboBox()
-        self.class_input.addItems(["Sáng T7", "Chiều T7", "Sáng CN", "Chiều CN"])
+        self.class_input.addItems(self.db.registry.class_names())
         
         # Ngày đăng ký
         self.reg_date_input = QDateEdit()
@@ -0,0 +1,199 @@
+# Xuất bảng progress / students ra CSV hoặc XLSX, không phụ thuộc Qt
+#
+# Dữ liệu được đọc dần từ cursor theo từng CHUNK_SIZE dòng và ghi ngay ra file,
+# nên bộ nhớ không tăng theo số dòng kể cả khi xuất vài triệu dòng. File XLSX
+# được ghi trực tiếp bằng zipfile (chuỗi inline, không cần bảng sharedStrings).
+import csv
+import os
+import re
+import tempfile
+import zipfile
+
+from reports import ExportCancelled
+
+# Số dòng đọc từ cursor mỗi lần
+CHUNK_SIZE = 5000
+
+# Excel giới hạn 1.048.576 dòng mỗi sheet (kể cả dòng tiêu đề), vượt quá thì sang sheet mới
+XLSX_MAX_ROWS = 1048576
+
+PROGRESS_HEADERS = ["ID", "Ngày", "Họ tên", "Lớp", "Trạng thái", "Nội dung / nhận xét", "Đánh dấu"]
+STUDENT_HEADERS = ["ID học sinh", "Họ tên", "Số điện thoại", "Phụ huynh", "Ngày sinh",
+                   "Địa chỉ", "Ghi chú", "Lớp", "Ngày đăng ký"]
+
+
+def export_progress(db, path, progress=None, **filters):
+    """
+    Xuất các dòng progress theo bộ lọc của Database.cursor_filtered_progress
+    (name, class_name, date, start_date, end_date); trả về số dòng đã ghi
+    """
+    total = db.count_filtered_progress(**filters)
+    return export_cursor(db.cursor_filtered_progress(**filters), PROGRESS_HEADERS, path, total, progress)
+
+
+def export_students(db, path, progress=None):
+    """Xuất toàn bộ hồ sơ học sinh; trả về số dòng đã ghi"""
+    return export_cursor(db.cursor_students(), STUDENT_HEADERS, path, db.count_students(), progress)
+
+
+def export_cursor(cursor, headers, path, total=None, progress=None):
+    """
+    Ghi mọi dòng của cursor ra path (.xlsx hoặc .csv, chọn theo đuôi file)
+    progress(done, total): gọi sau mỗi CHUNK_SIZE dòng, trả về False để hủy (ExportCancelled)
+    File được ghi ra file tạm cùng thư mục rồi mới đổi tên
+    """
+    writer = _write_xlsx if path.lower().endswith(".xlsx") else _write_csv
+    chunks = _chunks(cursor, total, progress)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".~", suffix=os.path.splitext(path)[1], dir=directory)
+    os.close(fd)
+    try:
+        count = writer(tmp_path, headers, chunks)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    finally:
+        cursor.close()
+    return count
+
+
+def _chunks(cursor, total, progress):
+    done = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        yield rows
+        done += len(rows)
+        if progress is not None and progress(done, total if total is not None else done) is False:
+            raise ExportCancelled()
+
+
+def _write_csv(path, headers, chunks):
+    # utf-8-sig: thêm BOM để Excel nhận đúng tiếng Việt khi mở file CSV
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+# =========================
+# XLSX
+# =========================
+
+# Ký tự điều khiển không được phép trong XML
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _escape(text):
+    # Như xml.sax.saxutils.escape nhưng không kéo theo urllib / http khi import (CLI khởi động nhanh hơn)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_SHEET = '<sheet name="Sheet{n}" sheetId="{n}" r:id="rId{n}"/>'
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}</Relationships>'
+)
+_WORKBOOK_SHEET_REL = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = _escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, values):
+    return f'<row r="{number}">{"".join(_xlsx_cell(v) for v in values)}</row>'
+
+
+def _write_xlsx(path, headers, chunks):
+    count = 0
+    sheet_count = 0
+    sheet = None
+    sheet_row = XLSX_MAX_ROWS
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        try:
+            for rows in chunks:
+                # Ghi cả chunk một lần thay vì từng dòng
+                parts = []
+                for row in rows:
+                    if sheet_row >= XLSX_MAX_ROWS:
+                        # Sheet đầu tiên hoặc sheet hiện tại đã đầy: mở sheet mới có dòng tiêu đề
+                        if sheet is not None:
+                            parts.append(_SHEET_END)
+                            sheet.write("".join(parts).encode())
+                            sheet.close()
+                            parts = []
+                        sheet_count += 1
+                        sheet = zf.open(f"xl/worksheets/sheet{sheet_count}.xml", "w", force_zip64=True)
+                        parts.append(_SHEET_START + _xlsx_row(1, headers))
+                        sheet_row = 1
+                    sheet_row += 1
+                    parts.append(_xlsx_row(sheet_row, row))
+                sheet.write("".join(parts).encode())
+                count += len(rows)
+            if sheet is None:
+                # Không có dòng nào: vẫn tạo sheet chỉ có tiêu đề
+                sheet_count = 1
+                sheet = zf.open("xl/worksheets/sheet1.xml", "w")
+                sheet.write((_SHEET_START + _xlsx_row(1, headers)).encode())
+            sheet.write(_SHEET_END.encode())
+        finally:
+            if sheet is not None:
+                sheet.close()
+
+        numbers = range(1, sheet_count + 1)
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_SHEET_CONTENT_TYPE.format(n=n) for n in numbers)))
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(
+            sheets="".join(_WORKBOOK_SHEET.format(n=n) for n in numbers)))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+            sheets="".join(_WORKBOOK_SHEET_REL.format(n=n) for n in numbers)))
+    return count
@@ -0,0 +1,224 @@
+# Nhập hàng loạt điểm danh / nhận xét từ file CSV, không phụ thuộc Qt
+#
+# Mỗi dòng được kiểm tra (ngày, lớp, trạng thái, tên theo hồ sơ học sinh) rồi
+# ghi theo lô CHUNK_SIZE dòng, mỗi lô một transaction executemany. Buổi đã có
+# (trùng tên, ngày, lớp - khóa idx_progress_session) được bỏ qua hoặc ghi đè.
+# Kết quả là ImportReport liệt kê số dòng của từng dòng nhận / bỏ qua / từ chối.
+import csv
+from collections import namedtuple
+from datetime import date as date_type, datetime
+
+from exporters import PROGRESS_HEADERS
+from registry import STATUS_PRESENT
+from textnorm import fold
+
+# Số dòng mỗi transaction. Lô lớn + sắp xếp theo khóa trước khi ghi giúp các lần
+# chèn vào index / bảng tổng hợp rơi vào các trang gần nhau
+CHUNK_SIZE = 20000
+
+# Nội dung mặc định khi file không có nhận xét (như khi điểm danh)
+DEFAULT_CONTENT = "(Chưa có nhận xét cuối buổi)"
+
+# accepted: list số dòng đã ghi; updated: các dòng trong đó đã ghi đè buổi có sẵn
+# skipped / rejected: list (số dòng, lý do); cancelled: True nếu dừng giữa chừng
+ImportReport = namedtuple("ImportReport", "accepted updated skipped rejected cancelled")
+
+# Tên cột được chấp nhận (đã bỏ dấu, chữ thường) cho từng trường.
+# Tiêu đề của file xuất bởi exporters.PROGRESS_HEADERS nhập lại được ngay
+_COLUMN_ALIASES = {
+    "date": {"ngay", "date"},
+    "name": {"ho ten", "hoc sinh", "ten", "name"},
+    "class": {"lop", "class", "class_name"},
+    "status": {"trang thai", "status"},
+    "content": {"noi dung / nhan xet", "noi dung", "nhan xet", "content"},
+    "highlight": {"danh dau", "is_highlighted"},
+}
+_REQUIRED = ("date", "name", "class")
+
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y")
+# Mức đánh dấu (progress.is_highlighted): số 0-3 như khi xuất, hoặc tên như trong EntryDialog
+_HIGHLIGHT_LABELS = ["Bình thường", "Cần chú ý", "Học tốt", "Báo động"]
+_HIGHLIGHTS = {"": 0}
+_HIGHLIGHTS.update({str(level): level for level in range(len(_HIGHLIGHT_LABELS))})
+_HIGHLIGHTS.update({fold(label): level for level, label in enumerate(_HIGHLIGHT_LABELS)})
+
+
+def import_progress_csv(db, path, overwrite=False, allow_unknown_names=False, progress=None):
+    """
+    Nhập file CSV vào bảng progress, trả về ImportReport
+    overwrite: buổi đã có thì ghi đè trạng thái / nội dung / đánh dấu, không thì bỏ qua
+    allow_unknown_names: nhận cả tên chưa có hồ sơ học sinh
+    progress(done, total): gọi sau mỗi lô, trả về False để dừng (các lô đã ghi vẫn được giữ)
+    File thiếu cột bắt buộc: ValueError
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        total = max(sum(1 for _ in f) - 1, 0)
+        f.seek(0)
+        sample = f.readline()
+        f.seek(0)
+        # File lưu từ Excel tiếng Việt thường dùng dấu ; thay cho dấu ,
+        delimiter = max(",;\t", key=sample.count)
+        reader = csv.reader(f, delimiter=delimiter)
+
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("File rỗng")
+        columns = _map_columns(header)
+        validator = _RowValidator(db, allow_unknown_names)
+
+        report = ImportReport([], [], [], [], False)
+        batch = []
+        line_no = reader.line_num
+        for values in reader:
+            start_line, line_no = line_no + 1, reader.line_num
+            if not any(v.strip() for v in values):
+                continue
+            row, error = validator.check(values, columns)
+            if error:
+                report.rejected.append((start_line, error))
+                continue
+            batch.append((start_line, row))
+            if len(batch) >= CHUNK_SIZE:
+                _write_batch(db, batch, overwrite, report)
+                batch = []
+                if progress is not None and progress(line_no - 1, total) is False:
+                    return report._replace(cancelled=True)
+        _write_batch(db, batch, overwrite, report)
+        if progress is not None:
+            progress(total, total)
+    return report
+
+
+def _map_columns(header):
+    columns = {}
+    for index, title in enumerate(header):
+        key = " ".join(fold(title).split())
+        for field, aliases in _COLUMN_ALIASES.items():
+            if key in aliases and field not in columns:
+                columns[field] = index
+    missing = [field for field in _REQUIRED if field not in columns]
+    if missing:
+        names = {"date": PROGRESS_HEADERS[1], "name": PROGRESS_HEADERS[2], "class": PROGRESS_HEADERS[3]}
+        raise ValueError("Thiếu cột bắt buộc: " + ", ".join(names[field] for field in missing))
+    return columns
+
+
+class _RowValidator:
+    def __init__(self, db, allow_unknown_names):
+        registry = db.registry
+        self.allow_unknown_names = allow_unknown_names
+        # Lớp / trạng thái so khớp không phân biệt dấu, hoa thường
+        self.class_ids = {fold(name): registry.class_id(name) for name in registry.class_names()}
+        self.status_ids = {fold(name): registry.status_id(name) for name in registry.status_names()}
+        self.default_status = STATUS_PRESENT
+        # Tên trong hồ sơ; tên gõ khác dấu / hoa thường được đưa về đúng tên hồ sơ nếu chỉ khớp một người
+        self.names = set()
+        self.names_by_key = {}
+        for row in db.get_all_students():
+            self.names.add(row[1])
+            self.names_by_key.setdefault(" ".join(fold(row[1]).split()), set()).add(row[1])
+        # Gắn sẵn hồ sơ cho dòng mới thay vì để trigger UPDATE lại từng dòng sau khi thêm
+        self.student_keys = db.get_student_keys_by_name()
+
+    def check(self, values, columns):
+        """Trả về (dòng progress, None) hoặc (None, lý do từ chối)"""
+        def get(field):
+            index = columns.get(field)
+            return values[index].strip() if index is not None and index < len(values) else ""
+
+        date = _parse_date(get("date"))
+        if date is None:
+            return None, f"Ngày không hợp lệ: '{get('date')}'"
+
+        name, error = self._name(get("name"))
+        if error:
+            return None, error
+
+        class_id = self.class_ids.get(fold(get("class")))
+        if class_id is None:
+            return None, f"Lớp không có trong danh mục: '{get('class')}'"
+
+        status = get("status")
+        status_id = self.status_ids.get(fold(status)) if status else self.default_status
+        if status_id is None:
+            return None, f"Trạng thái không hợp lệ: '{status}'"
+
+        is_highlighted = _HIGHLIGHTS.get(" ".join(fold(get("highlight")).split()))
+        if is_highlighted is None:
+            return None, f"Giá trị đánh dấu không hợp lệ: '{get('highlight')}' (0-3 hoặc {', '.join(_HIGHLIGHT_LABELS)})"
+
+        # Nội dung giữ nguyên như trong file (không cắt khoảng trắng)
+        index = columns.get("content")
+        content = values[index] if index is not None and index < len(values) else ""
+        return (date, name, class_id, status_id, content if content.strip() else DEFAULT_CONTENT, is_highlighted,
+                self.student_keys.get(name)), None
+
+    def _name(self, name):
+        name = " ".join(name.split())
+        if not name:
+            return None, "Thiếu tên học sinh"
+        if name in self.names:
+            return name, None
+        matches = self.names_by_key.get(fold(name), ())
+        if len(matches) == 1:
+            return next(iter(matches)), None
+        if len(matches) > 1:
+            return None, f"Tên '{name}' khớp nhiều hồ sơ: " + ", ".join(sorted(matches))
+        if self.allow_unknown_names:
+            return name, None
+        return None, f"Không có hồ sơ học sinh tên '{name}'"
+
+
+def _parse_date(text):
+    if len(text) == 10 and text[4] == "-":
+        # Định dạng của database (YYYY-MM-DD): kiểm tra nhanh hơn strptime
+        try:
+            return date_type.fromisoformat(text).isoformat()
+        except ValueError:
+            return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def _write_batch(db, batch, overwrite, report):
+    """
+    Phân loại trùng lặp (với database và với các dòng trước trong lô) rồi ghi cả lô
+    Dòng trùng với lô trước (đã ghi) được nhận ra qua database, không giữ khóa của cả file
+    """
+    if not batch:
+        return
+    keys = [(row[1], row[0], row[2]) for _, row in batch]
+    existing = db.find_existing_sessions(set(keys))
+
+    seen = {}
+    rows = []
+    for (line, row), key in zip(batch, keys):
+        if key in seen or key in existing:
+            where = f"dòng {seen[key]}" if key in seen else "dữ liệu đã có"
+            if not overwrite:
+                report.skipped.append((line, f"Trùng buổi với {where}"))
+                continue
+            report.updated.append(line)
+        seen.setdefault(key, line)
+        report.accepted.append(line)
+        rows.append(row)
+    # Sắp xếp ổn định theo (tên, ngày, lớp): dòng trùng trong file vẫn giữ thứ tự, dòng sau ghi đè dòng trước
+    rows.sort(key=lambda row: (row[1], row[0], row[2]))
+    db.import_progress(rows, overwrite)
+
+
+def write_import_report(report, path):
+    """Ghi kết quả nhập ra CSV (số dòng, kết quả, lý do), sắp xếp theo số dòng"""
+    updated = set(report.updated)
+    lines = [(line, "Đã nhập", "Ghi đè buổi đã có" if line in updated else "") for line in report.accepted]
+    lines += [(line, "Bỏ qua", reason) for line, reason in report.skipped]
+    lines += [(line, "Từ chối", reason) for line, reason in report.rejected]
+    lines.sort()
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Dòng", "Kết quả", "Lý do"])
+        writer.writerows(lines)
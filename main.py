@@ -1,24 +1,40 @@
+import startup_timing
+
 import sys
-from PySide6.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidgetItem, 
+import time
+import sqlite3
+import multiprocessing
+from functools import partial
+from PySide6.QtWidgets import (QApplication, QMainWindow, QTableView, 
                              QWidget, QVBoxLayout, QHBoxLayout, QHeaderView, QLabel,
                              QAbstractItemView, QMessageBox, QPushButton, QLineEdit,
-                             QComboBox, QDateEdit)
-from PySide6.QtCore import Qt, QDate
-from PySide6.QtGui import QColor, QScreen, QIcon
+                             QComboBox, QDateEdit, QProgressBar)
+from PySide6.QtCore import Qt, QDate, QTimer
+from PySide6.QtGui import QScreen, QIcon, QKeySequence, QShortcut
 
+import diagnostics
 from database import Database
+from registry import ALL_CLASSES
 from styles import MAIN_STYLE
-from dialogs.entry_dialog import EntryDialog
-from dialogs.attendance_dialog import AttendanceDialog
-from dialogs.statistics_dialog import StatisticsDialog
-from dialogs.common_comment_dialog import CommonCommentDialog
-from dialogs.student_profile_dialog import StudentProfileDialog
+from progress_model import ProgressTableModel, PLACEHOLDER_CONTENT
+from workers import QueryExecutor
+
+# Các dialog được import ở lần mở đầu tiên (trong từng hàm open_*) để cửa sổ chính hiện nhanh hơn
+startup_timing.mark("imports")
+
+
+def _search_page(db, query, filters, page_size, after):
+    # Kết quả tìm kiếm là một trang duy nhất
+    return db.search_content(query, **filters), None
 
 
 class StudentManager(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.db = Database()
+        # Database được mở sau lần vẽ đầu tiên (xem paintEvent)
+        self.db = None
+        self._started = False
+        self._ready = False
         self.setWindowTitle("Sổ tay Python 2026 - Quản lý tiến độ")
         self.setWindowIcon(QIcon("logo_app.png"))
         self.resize(1150, 800)
@@ -26,9 +42,47 @@ class StudentManager(QMainWindow):
         
         self.setStyleSheet(MAIN_STYLE)
         self.setup_ui()
-        
+        # Chưa có database thì chưa cho thao tác
+        self.centralWidget().setEnabled(False)
+        startup_timing.mark("window")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._started:
+            # Cửa sổ đã hiện: mở database và tải dữ liệu ở vòng lặp sự kiện kế tiếp
+            self._started = True
+            startup_timing.mark("first_paint")
+            QTimer.singleShot(0, self._open_database)
+
+    def _open_database(self):
+        try:
+            self.db = Database()
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể mở cơ sở dữ liệu: {e}")
+            self.close()
+            return
+        # Các trang của bảng chính được đọc ở luồng nền, kết quả về qua signal
+        self.executor = QueryExecutor(self.db.db_name, self.db.profile, self)
+        self.executor.busy_changed.connect(self.busy_bar.setVisible)
+        self.model.set_executor(self.executor)
+        self.filter_class.addItems(self.db.registry.class_names())
+        self.centralWidget().setEnabled(True)
+        for message in self.db.upgrade_warnings:
+            QMessageBox.information(self, "Nâng cấp dữ liệu", message)
         self.load_data()
 
+    def _on_data_loaded(self):
+        diagnostics.record_timing("load_data", time.perf_counter() - self._load_started)
+        if not self._ready:
+            self._ready = True
+            startup_timing.mark("data")
+            startup_timing.report()
+            if startup_timing.EXIT_WHEN_READY:
+                QApplication.quit()
+
+    def _on_load_failed(self, message):
+        QMessageBox.critical(self, "Lỗi", f"Không thể tải dữ liệu: {message}")
+
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -38,6 +92,16 @@ class StudentManager(QMainWindow):
         main_layout.addLayout(self._create_toolbar())
         main_layout.addWidget(self._create_data_table())
 
+        # Biểu tượng đang tải ở thanh trạng thái
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setFixedWidth(150)
+        self.busy_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.busy_bar)
+
+        # Cửa sổ chẩn đoán hiệu năng (không có nút, chỉ mở bằng phím tắt)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.open_diagnostics)
+
     def _create_filter_bar(self):
         layout = QHBoxLayout()
         
@@ -45,7 +109,8 @@ class StudentManager(QMainWindow):
         self.search_name.setPlaceholderText("🔍 Tên học sinh...")
         
         self.filter_class = QComboBox()
-        self.filter_class.addItems(["Tất cả lớp", "Sáng T7", "Chiều T7", "Sáng CN", "Chiều CN"])
+        # Danh sách lớp được thêm khi mở database
+        self.filter_class.addItems([ALL_CLASSES])
         
         self.check_date = QComboBox()
         self.check_date.addItems(["Tất cả thời gian", "Theo ngày"])
@@ -58,6 +123,11 @@ class StudentManager(QMainWindow):
         self.search_date.setEnabled(False)
         self.check_date.currentIndexChanged.connect(lambda i: self.search_date.setEnabled(i == 1))
 
+        self.search_content = QLineEdit()
+        self.search_content.setPlaceholderText("🔎 Tìm trong nội dung / nhận xét...")
+        self.search_content.setClearButtonEnabled(True)
+        self.search_content.returnPressed.connect(self.load_data)
+
         self.btn_filter = QPushButton("Lọc")
         self.btn_filter.setFixedWidth(80)
         self.btn_filter.setStyleSheet("background-color: #f8f9fa; border: 1px solid #ccc; padding: 5px;")
@@ -69,6 +139,7 @@ class StudentManager(QMainWindow):
         layout.addWidget(self.search_name)
         layout.addWidget(self.check_date)
         layout.addWidget(self.search_date)
+        layout.addWidget(self.search_content)
         layout.addWidget(self.btn_filter)
         
         return layout
@@ -102,28 +173,46 @@ class StudentManager(QMainWindow):
         self.btn_stats.setFixedSize(140, 35)
         self.btn_stats.clicked.connect(self.open_statistics)
         
+        self.btn_holiday = QPushButton("📅 NGÀY NGHỈ")
+        self.btn_holiday.setStyleSheet("background-color: #fd7e14; color: white;")
+        self.btn_holiday.setFixedSize(140, 35)
+        self.btn_holiday.clicked.connect(self.open_holidays)
+        
         self.btn_profile = QPushButton("👤 HỒ SƠ HỌC SINH")
         self.btn_profile.setStyleSheet("background-color: #6f42c1; color: white;")
         self.btn_profile.setFixedSize(160, 35)
         self.btn_profile.clicked.connect(self.open_student_profile)
         
+        self.btn_export = QPushButton("⬇ XUẤT DỮ LIỆU")
+        self.btn_export.setStyleSheet("background-color: #20c997; color: white;")
+        self.btn_export.setFixedSize(140, 35)
+        self.btn_export.clicked.connect(self.open_export)
+        
+        self.btn_import = QPushButton("⬆ NHẬP CSV")
+        self.btn_import.setStyleSheet("background-color: #6c757d; color: white;")
+        self.btn_import.setFixedSize(140, 35)
+        self.btn_import.clicked.connect(self.open_import)
+        
         layout.addWidget(self.btn_att)
         layout.addWidget(self.btn_common)
         layout.addWidget(self.btn_edit)
         layout.addWidget(self.btn_del)
         layout.addStretch()
+        layout.addWidget(self.btn_holiday)
         layout.addWidget(self.btn_profile)
+        layout.addWidget(self.btn_export)
+        layout.addWidget(self.btn_import)
         layout.addWidget(self.btn_stats)
         
         return layout
 
     def _create_data_table(self):
-        # Cấu hình bảng dl
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Ngày", "Học sinh", "Lớp", "Trạng thái", "Nội dung bài học (Cập nhật cuối buổi)"
-        ])
+        # Cấu hình bảng dl: model chỉ tải thêm dòng khi cuộn tới cuối
+        self.model = ProgressTableModel(self)
+        self.model.first_page_loaded.connect(self._on_data_loaded)
+        self.model.page_failed.connect(self._on_load_failed)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.hideColumn(0)
         self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -133,100 +222,113 @@ class StudentManager(QMainWindow):
         
         return self.table
 
+    def _filters(self):
+        return dict(
+            name=self.search_name.text(),
+            class_name=self.filter_class.currentText(),
+            date=self.search_date.date().toString("yyyy-MM-dd") if self.check_date.currentIndex() == 1 else None
+        )
+
     def load_data(self):
+        # Đọc ở luồng nền (model.set_source gửi trang đầu cho executor), kết quả về _on_data_loaded
+        self._load_started = time.perf_counter()
+        filters = self._filters()
+        query = self.search_content.text().strip()
+        if query:
+            # Tìm toàn văn: kết quả xếp theo mức độ liên quan, đọc một lần (tối đa SEARCH_LIMIT dòng)
+            self.model.set_source(partial(_search_page, query=query, filters=filters))
+        else:
+            # Lấy dl từ db theo từng trang (date, id), model đọc thêm khi cuộn tới cuối
+            self.model.set_source(partial(Database.get_progress_page, **filters))
+
+    def refresh_rows(self, ids):
+        """Chỉ cập nhật các dòng vừa ghi thay vì tải lại cả bảng (giữ vị trí cuộn và dòng đang chọn)"""
+        if self.search_content.text().strip():
+            # Kết quả tìm kiếm xếp theo độ liên quan, tải lại để xếp đúng
+            self.load_data()
+            return
+        # Đọc trực tiếp: chỉ các dòng vừa ghi, tra theo khóa chính
         try:
-            # Lấy dl từ db
-            rows = self.db.get_filtered_progress(
-                name=self.search_name.text(),
-                class_name=self.filter_class.currentText(),
-                date=self.search_date.date().toString("yyyy-MM-dd") if self.check_date.currentIndex() == 1 else None
-            )
-            self._update_table_view(rows)
+            rows = self.db.get_progress_by_ids(ids, **self._filters())
         except Exception as e:
             QMessageBox.critical(self, "Lỗi", f"Không thể tải dữ liệu: {e}")
+            return
+        self.model.refresh_rows(ids, rows)
 
-    def _update_table_view(self, rows):
-        self.table.setRowCount(0)
-        for row_data in rows:
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-            
-            # Duyệt qua các cột (trừ cột cuối)
-            for c, val in enumerate(row_data[:-1]):
-                item = QTableWidgetItem(str(val))
-                
-                # Xử lý màu highlight theo is_highlighted
-                if row_data[6] == 1:  # Cần chú ý
-                    item.setBackground(QColor("#fff3cd"))
-                elif row_data[6] == 2:  # Học tốt
-                    item.setBackground(QColor("#d4edda"))
-                elif row_data[6] == 3:  # Báo động
-                    item.setBackground(QColor("#f8d7da"))
-                
-                # Xử lý màu chữ cho nội dung chưa có
-                if c == 5 and val == "(Chưa có nhận xét cuối buổi)":
-                    item.setForeground(QColor("#d9534f"))
-                    font = item.font()
-                    font.setItalic(True)
-                    item.setFont(font)
-                
-                self.table.setItem(r, c, item)
+    def _selected_ids(self):
+        return [self.model.row_id(index.row()) for index in self.table.selectionModel().selectedRows()]
 
     def open_attendance(self):
-        dialog = AttendanceDialog(self, self.db.conn)
+        from dialogs.attendance_dialog import AttendanceDialog
+        dialog = AttendanceDialog(self, self.db.conn, self.db.registry)
         if dialog.exec():
             selected_data = dialog.get_selected_data()
             if selected_data:
-                self.db.bulk_insert_attendance(selected_data)
-                self.load_data()
-                QMessageBox.information(self, "Thành công", 
-                                      f"Đã điểm danh cho {len(selected_data)} học sinh.")
+                try:
+                    result = self.db.bulk_insert_attendance(selected_data)
+                except Exception as e:
+                    QMessageBox.critical(self, "Lỗi", f"Không thể điểm danh: {e}")
+                    return
+                self.refresh_rows(result.ids)
+                msg = f"Đã điểm danh cho {result.inserted} học sinh."
+                if result.skipped:
+                    msg += f"\n{result.skipped} học sinh đã được điểm danh buổi này trước đó (bỏ qua)."
+                QMessageBox.information(self, "Thành công", msg)
 
     def add_common_comment(self):
-        selected_rows = self.table.selectionModel().selectedRows()
-        if not selected_rows:
+        ids_to_update = self._selected_ids()
+        if not ids_to_update:
             QMessageBox.warning(self, "Thông báo", "Vui lòng chọn các học sinh cần nhận xét chung!")
             return
 
+        from dialogs.common_comment_dialog import CommonCommentDialog
         dialog = CommonCommentDialog(self)
         if dialog.exec():
             content = dialog.get_content()
-            ids_to_update = [self.table.item(row.row(), 0).text() for row in selected_rows]
             try:
-                self.db.update_entries_content(ids_to_update, content)
-                self.load_data()
-                QMessageBox.information(self, "Thành công", f"Đã cập nhật nhận xét cho {len(ids_to_update)} học sinh.")
+                result = self.db.update_entries_content(ids_to_update, content)
+                self.refresh_rows(result.ids)
+                QMessageBox.information(self, "Thành công", f"Đã cập nhật nhận xét cho {result.updated} học sinh.")
             except Exception as e:
                 QMessageBox.critical(self, "Lỗi", f"Không thể cập nhật nhận xét: {e}")
 
     def edit_entry(self):
-        curr = self.table.currentRow()
+        curr = self.table.currentIndex().row()
         if curr < 0:
             QMessageBox.warning(self, "Thông báo", "Vui lòng chọn một dòng học sinh để viết nhận xét!")
             return
         
-        row_id = self.table.item(curr, 0).text()
+        row_id = self.model.row_id(curr)
         row_data = list(self.db.get_entry_by_id(row_id))
         
         #Sau khi điểm danh
-        if row_data[5] == "(Chưa có nhận xét cuối buổi)":
+        if row_data[5] == PLACEHOLDER_CONTENT:
             row_data[5] = ""
         
         student_list = self.db.get_distinct_student_names()
-        dialog = EntryDialog(self, data=row_data, student_list=student_list, db_conn=self.db.conn)
+        from dialogs.entry_dialog import EntryDialog
+        dialog = EntryDialog(self, data=row_data, student_list=student_list, db_conn=self.db.conn, registry=self.db.registry)
         if dialog.exec():
             data = dialog.get_data()
-            self.db.update_entry(row_id, *data)
-            self.load_data()
+            try:
+                self.db.update_entry(row_id, *data)
+            except sqlite3.IntegrityError:
+                QMessageBox.warning(self, "Cảnh báo",
+                                    f"Học sinh {data[1]} đã có bản ghi lớp {data[2]} ngày {data[0]}!")
+                return
+            except ValueError as e:
+                QMessageBox.warning(self, "Cảnh báo", str(e))
+                return
+            self.refresh_rows([row_id])
 
     def delete_entry(self):
         #Xử lý xóa nhiều dòng
-        selected_rows = self.table.selectionModel().selectedRows()
-        if not selected_rows:
+        ids_to_delete = self._selected_ids()
+        if not ids_to_delete:
             QMessageBox.warning(self, "Thông báo", "Vui lòng chọn dòng cần xóa!")
             return
 
-        count = len(selected_rows)
+        count = len(ids_to_delete)
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("Xác nhận xóa")
         msg_box.setText(f"<h3>Bạn có chắc chắn muốn xóa {count} bản ghi đã chọn?</h3>")
@@ -246,22 +348,52 @@ class StudentManager(QMainWindow):
         """)
         
         if msg_box.exec() == QMessageBox.Yes:
-            ids_to_delete = [self.table.item(row.row(), 0).text() for row in selected_rows]
             try:
-                self.db.delete_entries(ids_to_delete)
-                self.load_data()
+                result = self.db.delete_entries(ids_to_delete)
+                self.model.remove_ids(result.ids)
             except Exception as e:
                 QMessageBox.critical(self, "Lỗi", f"Không thể xóa dữ liệu: {e}")
 
     def open_statistics(self):
-        dialog = StatisticsDialog(self, self.db.conn)
+        from dialogs.statistics_dialog import StatisticsDialog
+        dialog = StatisticsDialog(self, self.db)
+        dialog.exec()
+
+    def open_holidays(self):
+        from dialogs.holiday_dialog import HolidayDialog
+        dialog = HolidayDialog(self, self.db)
         dialog.exec()
+        # Lớp mới thêm trong dialog được đưa vào bộ lọc
+        current = self.filter_class.currentText()
+        self.filter_class.clear()
+        self.filter_class.addItems([ALL_CLASSES] + self.db.registry.class_names())
+        self.filter_class.setCurrentText(current)
+
+    def open_export(self):
+        # Bộ lọc tên / lớp / ngày; ô tìm nội dung chỉ áp dụng cho bảng trên màn hình
+        from dialogs.export_dialog import ExportDialog
+        dialog = ExportDialog(self, self.db, self._filters())
+        dialog.exec()
+
+    def open_import(self):
+        from dialogs.import_dialog import ImportDialog
+        dialog = ImportDialog(self, self.db)
+        dialog.exec()
+        self.load_data()
 
     def open_student_profile(self):
+        from dialogs.student_profile_dialog import StudentProfileDialog
         dialog = StudentProfileDialog(self, self.db)
         dialog.exec()
         self.load_data()
 
+    def open_diagnostics(self):
+        if self.db is None:
+            return
+        from dialogs.diagnostics_dialog import DiagnosticsDialog
+        dialog = DiagnosticsDialog(self, self.db)
+        dialog.exec()
+
     def center_window(self):
         qr = self.frameGeometry()
         cp = QScreen.availableGeometry(QApplication.primaryScreen()).center()
@@ -270,7 +402,11 @@ class StudentManager(QMainWindow):
 
 
 if __name__ == "__main__":
+    # Bắt buộc với file .exe của PyInstaller: tiến trình con của ProcessPoolExecutor
+    # (phiếu báo phụ huynh) chạy lại chính file này
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    startup_timing.mark("qt_app")
     window = StudentManager()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
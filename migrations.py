@@ -0,0 +1,551 @@
+# Nâng cấp schema cơ sở dữ liệu theo phiên bản (PRAGMA user_version)
+#
+# Mỗi phần tử trong MIGRATIONS là một bước nâng cấp. Bước thứ i (tính từ 1)
+# đưa database lên user_version = i. File hoc_tap.db cũ (user_version = 0)
+# sẽ được nâng cấp tại chỗ khi mở bằng Database.
+#
+# Các bước 4 - 9 tạo trigger và cột tính sẵn (generated) gọi các hàm Python vn_search_text,
+# vn_fold, vn_sort_key, vn_name_tokens do database.register_functions đăng ký, nên file cũ
+# phải được nâng cấp qua database.connect(). Từ bước 10 các giá trị này là cột thường do
+# ứng dụng tính bằng Python khi ghi (xem populate_text_keys), schema chỉ còn SQL thuần:
+# sqlite3 CLI, DB Browser... đọc / ghi, VACUUM, REINDEX, integrity_check được bình thường.
+# Dòng thêm bởi client khác có name_key / search_body NULL (dòng sửa thì giữ giá trị cũ)
+# nên chưa tìm thấy đúng cho tới khi Database.rebuild_search_index() tính lại (cli.py check --repair)
+import functools
+from contextlib import contextmanager
+
+from textnorm import KEY_VERSION, fold, name_sort_key, name_suffixes, search_mode, search_text
+
+
+def _v1_progress_indexes(cursor):
+    # Tra cứu theo học sinh: get_student_attendance_stats, thống kê theo tên.
+    # Thêm status, class_name vào cuối để các truy vấn đếm không cần đọc bảng
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_name_date
+                      ON progress (name, date, status, class_name)""")
+    # Tóm tắt theo lớp trong khoảng thời gian
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_class_date_status
+                      ON progress (class_name, date, status)""")
+    # Danh sách chính: ORDER BY date DESC, id DESC
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_date_id
+                      ON progress (date, id)""")
+
+
+def _v2_schedule_and_holidays(cursor):
+    # Lịch học của từng lớp (weekday: 0=Thứ 2, ..., 5=Thứ 7, 6=Chủ nhật)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS class_schedule (
+                        class_name TEXT NOT NULL,
+                        weekday INTEGER NOT NULL,
+                        PRIMARY KEY (class_name, weekday))""")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO class_schedule (class_name, weekday) VALUES (?, ?)",
+        [("Sáng T7", 5), ("Chiều T7", 5), ("Sáng CN", 6), ("Chiều CN", 6)]
+    )
+
+    # Ngày nghỉ lễ / buổi học bị hủy. class_name NULL = nghỉ tất cả các lớp
+    cursor.execute("""CREATE TABLE IF NOT EXISTS cancelled_sessions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        date TEXT NOT NULL,
+                        class_name TEXT,
+                        reason TEXT)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_cancelled_sessions_date
+                      ON cancelled_sessions (date, class_name)""")
+
+
+def _v3_unique_session(cursor):
+    # Mỗi học sinh chỉ có một bản ghi cho mỗi buổi (tên, ngày, lớp).
+    # Gỡ bản trùng cũ trước khi tạo ràng buộc: giữ bản đã có nhận xét, mới nhất.
+    # Các bản bị gỡ có thể khác trạng thái / nội dung nên được chép nguyên vào
+    # progress_duplicates_v3 (kept_id = id của bản được giữ) để xem lại hoặc khôi phục
+    cursor.execute("""SELECT 1 FROM progress GROUP BY name, date, class_name HAVING COUNT(*) > 1
+                      AND name IS NOT NULL AND date IS NOT NULL AND class_name IS NOT NULL LIMIT 1""")
+    if cursor.fetchone():
+        cursor.execute("""CREATE TABLE IF NOT EXISTS progress_duplicates_v3 (
+                            id INTEGER PRIMARY KEY,
+                            kept_id INTEGER NOT NULL,
+                            date TEXT, name TEXT, class_name TEXT,
+                            status TEXT, content TEXT, is_highlighted INTEGER)""")
+        cursor.execute("""
+            INSERT INTO progress_duplicates_v3 (id, kept_id, date, name, class_name, status, content, is_highlighted)
+            SELECT id, kept_id, date, name, class_name, status, content, is_highlighted FROM (
+                SELECT *, ROW_NUMBER() OVER session AS rn, FIRST_VALUE(id) OVER session AS kept_id
+                FROM progress
+                WHERE name IS NOT NULL AND date IS NOT NULL AND class_name IS NOT NULL
+                WINDOW session AS (PARTITION BY name, date, class_name
+                                   ORDER BY content = '(Chưa có nhận xét cuối buổi)', id DESC)
+            )
+            WHERE rn > 1""")
+        cursor.execute("DELETE FROM progress WHERE id IN (SELECT id FROM progress_duplicates_v3)")
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_progress_session
+                      ON progress (name, date, class_name)""")
+
+
+def _v4_full_text_search(cursor):
+    # Cấu hình nội bộ của ứng dụng (chế độ chỉ mục tìm kiếm...)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS app_meta (
+                        key TEXT PRIMARY KEY,
+                        value TEXT)""")
+
+    # Chỉ mục toàn văn cho nội dung bài học / nhận xét. Bảng contentless
+    # (không lưu lại nội dung), rowid = progress.id. Chuỗi được đưa qua hàm
+    # vn_search_text để bỏ dấu khi cần. Hàm này là hàm Python, chỉ có trên kết nối
+    # mở bằng database.connect(): trigger của progress / students chạy trên kết nối
+    # sqlite3 thường báo lỗi "unknown function" và lệnh ghi bị hủy (bước 10 thay các trigger này)
+    cursor.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS progress_fts USING fts5(
+                        body, content='', tokenize='unicode61 remove_diacritics 0')""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS progress_fts_insert AFTER INSERT ON progress BEGIN
+                        INSERT INTO progress_fts (rowid, body) VALUES (new.id, vn_search_text(new.content));
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS progress_fts_delete AFTER DELETE ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body)
+                        VALUES ('delete', old.id, vn_search_text(old.content));
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS progress_fts_update AFTER UPDATE OF content ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body)
+                        VALUES ('delete', old.id, vn_search_text(old.content));
+                        INSERT INTO progress_fts (rowid, body) VALUES (new.id, vn_search_text(new.content));
+                      END""")
+
+    # Ghi chú trong hồ sơ học sinh
+    cursor.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS student_notes_fts USING fts5(
+                        student_id UNINDEXED, body, tokenize='unicode61 remove_diacritics 0')""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS student_notes_fts_insert AFTER INSERT ON students BEGIN
+                        INSERT INTO student_notes_fts (student_id, body)
+                        VALUES (new.student_id, vn_search_text(new.notes));
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS student_notes_fts_delete AFTER DELETE ON students BEGIN
+                        DELETE FROM student_notes_fts WHERE student_id = old.student_id;
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS student_notes_fts_update
+                      AFTER UPDATE OF student_id, notes ON students BEGIN
+                        DELETE FROM student_notes_fts WHERE student_id = old.student_id;
+                        INSERT INTO student_notes_fts (student_id, body)
+                        VALUES (new.student_id, vn_search_text(new.notes));
+                      END""")
+    # Dữ liệu cũ được đưa vào chỉ mục bởi Database.rebuild_search_index()
+
+
+def _v5_name_keys(cursor):
+    # Cột tính sẵn (generated) từ các hàm vn_fold / vn_sort_key đăng ký trong
+    # database.connect: tên bỏ dấu để tìm kiếm và khóa sắp xếp tiếng Việt.
+    # Cột VIRTUAL được tính lại khi đọc / ghi dòng, nên thiếu hàm thì SELECT * và mọi
+    # lệnh ghi vào progress / students đều lỗi (xem đầu file). Bước 10 đổi thành cột thường
+    cursor.execute("ALTER TABLE progress ADD COLUMN name_key TEXT GENERATED ALWAYS AS (vn_fold(name)) VIRTUAL")
+    cursor.execute("ALTER TABLE students ADD COLUMN name_key TEXT GENERATED ALWAYS AS (vn_fold(name)) VIRTUAL")
+    cursor.execute("ALTER TABLE students ADD COLUMN sort_key TEXT GENERATED ALWAYS AS (vn_sort_key(name)) VIRTUAL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_progress_name_key ON progress (name_key, date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name_key ON students (name_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_sort_key ON students (sort_key)")
+
+    # Chỉ mục từ của tên: mỗi đoạn cuối bắt đầu từ một chữ ("pham minh", "minh")
+    # trỏ về tên đầy đủ, để tìm "minh" hay "van an" bằng truy vấn khoảng trên index.
+    # Tên không còn dùng vẫn để lại, không ảnh hưởng kết quả.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS name_tokens (
+                        token TEXT NOT NULL,
+                        name_key TEXT NOT NULL,
+                        PRIMARY KEY (token, name_key)) WITHOUT ROWID""")
+    for table in ("progress", "students"):
+        for event in ("INSERT", "UPDATE OF name"):
+            trigger = f"{table}_name_tokens_{event.split()[0].lower()}"
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table}
+                               WHEN NOT EXISTS (SELECT 1 FROM name_tokens WHERE token = new.name_key) BEGIN
+                                 INSERT OR IGNORE INTO name_tokens (token, name_key)
+                                 SELECT value, new.name_key FROM json_each(vn_name_tokens(new.name));
+                               END""")
+        cursor.execute(f"""INSERT OR IGNORE INTO name_tokens (token, name_key)
+                           SELECT value, name_key
+                           FROM (SELECT DISTINCT name, name_key FROM {table}), json_each(vn_name_tokens(name))""")
+
+
+def _v6_student_key(cursor):
+    # Khóa số nguyên cố định của hồ sơ học sinh (student_id là mã do người dùng nhập)
+    cursor.execute("ALTER TABLE students ADD COLUMN student_key INTEGER")
+    cursor.execute("UPDATE students SET student_key = rowid")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_students_key ON students (student_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students (name)")
+
+    # progress.student_key trỏ tới students.student_key, NULL = tên chưa có hồ sơ.
+    # Thống kê gộp theo khóa này nên đổi tên trong hồ sơ chỉ sửa một dòng students.
+    cursor.execute("ALTER TABLE progress ADD COLUMN student_key INTEGER")
+    cursor.execute("""UPDATE progress SET student_key = s.student_key
+                      FROM (SELECT name, MIN(student_key) AS student_key FROM students GROUP BY name) AS s
+                      WHERE s.name = progress.name""")
+    # Tra cứu theo học sinh và thống kê GROUP BY student_key, name, class_name:
+    # quét theo đúng thứ tự index, đọc hết từ index mà không cần đọc bảng
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_student_key
+                      ON progress (student_key, name, class_name, date, status)""")
+
+    # Dòng mới: tìm hồ sơ theo tên, nếu không có thì theo các buổi cũ cùng tên
+    # (tên cũ của học sinh đã đổi tên vẫn được gắn đúng hồ sơ)
+    link_by_name = """(SELECT COALESCE(
+                          (SELECT MIN(student_key) FROM students WHERE name = new.name),
+                          (SELECT student_key FROM progress
+                           WHERE name = new.name AND student_key IS NOT NULL AND id != new.id LIMIT 1)))"""
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS progress_student_key_insert
+                       AFTER INSERT ON progress WHEN new.student_key IS NULL BEGIN
+                         UPDATE progress SET student_key = {link_by_name} WHERE id = new.id;
+                       END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS progress_student_key_update
+                       AFTER UPDATE OF name ON progress BEGIN
+                         UPDATE progress SET student_key = {link_by_name} WHERE id = new.id;
+                       END""")
+
+    # Hồ sơ mới: cấp khóa rồi gắn các buổi cùng tên chưa có hồ sơ
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS students_student_key_insert AFTER INSERT ON students BEGIN
+                        UPDATE students SET student_key = (SELECT IFNULL(MAX(student_key), 0) + 1 FROM students)
+                        WHERE rowid = new.rowid AND new.student_key IS NULL;
+                        UPDATE progress SET student_key = (SELECT student_key FROM students WHERE rowid = new.rowid)
+                        WHERE name = new.name AND student_key IS NULL;
+                      END""")
+    # Đổi tên: chỉ gắn thêm các buổi chưa có hồ sơ trùng tên mới, lịch sử cũ giữ nguyên khóa
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS students_student_key_rename AFTER UPDATE OF name ON students BEGIN
+                        UPDATE progress SET student_key = new.student_key
+                        WHERE name = new.name AND student_key IS NULL;
+                      END""")
+    # Xóa hồ sơ: giữ dữ liệu tiến độ nhưng bỏ liên kết
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS students_student_key_delete AFTER DELETE ON students BEGIN
+                        UPDATE progress SET student_key = NULL WHERE student_key = old.student_key;
+                      END""")
+
+
+def _v7_class_status_codes(cursor):
+    # Danh mục lớp / trạng thái; progress chỉ lưu mã số nguyên
+    cursor.execute("""CREATE TABLE IF NOT EXISTS classes (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE,
+                        position INTEGER NOT NULL DEFAULT 0)""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS statuses (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE)""")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO classes (name, position) VALUES (?, ?)",
+        [("Sáng T7", 1), ("Chiều T7", 2), ("Sáng CN", 3), ("Chiều CN", 4)]
+    )
+    # id 1, 2 khớp registry.STATUS_PRESENT / STATUS_ABSENT
+    cursor.executemany("INSERT OR IGNORE INTO statuses (id, name) VALUES (?, ?)", [(1, "Đi học"), (2, "Nghỉ học")])
+
+    # Các lớp / trạng thái khác đã có trong dữ liệu cũng được đưa vào danh mục
+    cursor.execute("""INSERT OR IGNORE INTO classes (name, position)
+                      SELECT class_name, 100 FROM progress WHERE class_name IS NOT NULL
+                      UNION SELECT class_name, 100 FROM students WHERE class_name IS NOT NULL
+                      UNION SELECT class_name, 100 FROM class_schedule""")
+    cursor.execute("""INSERT OR IGNORE INTO statuses (name)
+                      SELECT DISTINCT status FROM progress WHERE status IS NOT NULL""")
+
+    cursor.execute("ALTER TABLE progress ADD COLUMN class_id INTEGER")
+    cursor.execute("ALTER TABLE progress ADD COLUMN status_id INTEGER")
+    cursor.execute("""UPDATE progress SET
+                        class_id = (SELECT id FROM classes WHERE name = progress.class_name),
+                        status_id = (SELECT id FROM statuses WHERE name = progress.status)""")
+
+    # Bỏ cột chữ: các index dùng chúng phải xóa trước rồi tạo lại trên cột mã
+    for index in ("idx_progress_name_date", "idx_progress_class_date_status",
+                  "idx_progress_session", "idx_progress_student_key"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    cursor.execute("ALTER TABLE progress DROP COLUMN class_name")
+    cursor.execute("ALTER TABLE progress DROP COLUMN status")
+
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_name_date
+                      ON progress (name, date, status_id, class_id)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_class_date_status
+                      ON progress (class_id, date, status_id)""")
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_progress_session
+                      ON progress (name, date, class_id)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_progress_student_key
+                      ON progress (student_key, name, class_id, date, status_id)""")
+
+
+# Một dòng progress đóng góp vào attendance_rollup (NULL được lưu thành 0 / '' để
+# làm khóa chính). status_id 1 = Đi học, 2 = Nghỉ học (registry.STATUS_PRESENT / STATUS_ABSENT)
+_ROLLUP_KEY = "IFNULL({row}.student_key, 0), IFNULL({row}.name, ''), IFNULL({row}.class_id, 0), IFNULL(substr({row}.date, 1, 7), '')"
+_ROLLUP_UPSERT = """INSERT INTO attendance_rollup (student_key, name, class_id, month, attended, absent, entries)
+                    VALUES ({key}, {sign} * ({row}.status_id IS 1), {sign} * ({row}.status_id IS 2), {sign})
+                    ON CONFLICT DO UPDATE SET attended = attended + excluded.attended,
+                                              absent = absent + excluded.absent,
+                                              entries = entries + excluded.entries;"""
+_ROLLUP_CLEANUP = """DELETE FROM attendance_rollup
+                     WHERE (student_key, name, class_id, month) = ({key}) AND entries = 0;"""
+
+
+def _rollup_add(row):
+    return _ROLLUP_UPSERT.format(key=_ROLLUP_KEY.format(row=row), row=row, sign=1)
+
+
+def _rollup_remove(row):
+    return (_ROLLUP_UPSERT.format(key=_ROLLUP_KEY.format(row=row), row=row, sign=-1)
+            + "\n" + _ROLLUP_CLEANUP.format(key=_ROLLUP_KEY.format(row=row)))
+
+
+def _v8_attendance_rollup(cursor):
+    # Số buổi theo (học sinh, tên, lớp, tháng YYYY-MM): thống kê nhiều tháng chỉ đọc
+    # bảng này, chỉ các tháng đầu / cuối không trọn vẹn mới đọc progress
+    cursor.execute("""CREATE TABLE IF NOT EXISTS attendance_rollup (
+                        student_key INTEGER NOT NULL,
+                        name TEXT NOT NULL,
+                        class_id INTEGER NOT NULL,
+                        month TEXT NOT NULL,
+                        attended INTEGER NOT NULL,
+                        absent INTEGER NOT NULL,
+                        entries INTEGER NOT NULL,
+                        PRIMARY KEY (student_key, name, class_id, month)) WITHOUT ROWID""")
+
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS progress_rollup_insert AFTER INSERT ON progress BEGIN
+                         {_rollup_add("new")}
+                       END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS progress_rollup_delete AFTER DELETE ON progress BEGIN
+                         {_rollup_remove("old")}
+                       END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS progress_rollup_update
+                       AFTER UPDATE OF date, name, class_id, status_id, student_key ON progress BEGIN
+                         {_rollup_remove("old")}
+                         {_rollup_add("new")}
+                       END""")
+    populate_attendance_rollup(cursor)
+
+
+def _v9_search_name_column(cursor):
+    # Thêm tên học sinh (bỏ dấu) làm cột thứ hai của progress_fts: search_content lọc
+    # theo tên ngay trong câu MATCH thay vì duyệt mọi dòng khớp nội dung rồi mới lọc.
+    # Bảng contentless không thêm cột được nên tạo lại. Trigger gọi vn_search_text / vn_fold
+    # như bước 4: chỉ ghi được qua kết nối của database.connect() (bước 10 thay các trigger này)
+    for trigger in ("progress_fts_insert", "progress_fts_delete", "progress_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS progress_fts")
+    cursor.execute("""CREATE VIRTUAL TABLE progress_fts USING fts5(
+                        body, name, content='', tokenize='unicode61 remove_diacritics 0')""")
+    cursor.execute("""CREATE TRIGGER progress_fts_insert AFTER INSERT ON progress BEGIN
+                        INSERT INTO progress_fts (rowid, body, name)
+                        VALUES (new.id, vn_search_text(new.content), vn_fold(new.name));
+                      END""")
+    cursor.execute("""CREATE TRIGGER progress_fts_delete AFTER DELETE ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body, name)
+                        VALUES ('delete', old.id, vn_search_text(old.content), vn_fold(old.name));
+                      END""")
+    cursor.execute("""CREATE TRIGGER progress_fts_update AFTER UPDATE OF content, name ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body, name)
+                        VALUES ('delete', old.id, vn_search_text(old.content), vn_fold(old.name));
+                        INSERT INTO progress_fts (rowid, body, name)
+                        VALUES (new.id, vn_search_text(new.content), vn_fold(new.name));
+                      END""")
+    # Bỏ chế độ đã lưu để Database.init_db lập lại chỉ mục (một lần, sau mọi bước nâng cấp)
+    cursor.execute("DELETE FROM app_meta WHERE key = 'search_mode'")
+
+
+def _v10_stored_text_keys(cursor):
+    # name_key, sort_key và chuỗi đưa vào chỉ mục (search_body) thành cột thường, ứng dụng
+    # tính bằng Python khi ghi. Schema không còn gọi hàm Python nào (xem đầu file), và đổi
+    # quy tắc của textnorm chỉ cần tính lại dữ liệu (textnorm.KEY_VERSION), không phải đổi schema
+    for trigger in ("progress_fts_insert", "progress_fts_delete", "progress_fts_update",
+                    "student_notes_fts_insert", "student_notes_fts_delete", "student_notes_fts_update",
+                    "progress_name_tokens_insert", "progress_name_tokens_update",
+                    "students_name_tokens_insert", "students_name_tokens_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for index in ("idx_progress_name_key", "idx_students_name_key", "idx_students_sort_key"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    cursor.execute("ALTER TABLE progress DROP COLUMN name_key")
+    cursor.execute("ALTER TABLE students DROP COLUMN name_key")
+    cursor.execute("ALTER TABLE students DROP COLUMN sort_key")
+    cursor.execute("ALTER TABLE progress ADD COLUMN name_key TEXT")
+    cursor.execute("ALTER TABLE progress ADD COLUMN search_body TEXT")
+    cursor.execute("ALTER TABLE students ADD COLUMN name_key TEXT")
+    cursor.execute("ALTER TABLE students ADD COLUMN sort_key TEXT")
+    cursor.execute("ALTER TABLE students ADD COLUMN search_body TEXT")
+    populate_text_keys(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_progress_name_key ON progress (name_key, date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name_key ON students (name_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_sort_key ON students (sort_key)")
+
+    # Chỉ mục toàn văn đọc thẳng các cột đã tính. Bảng contentless nên lệnh 'delete'
+    # phải đưa đúng giá trị đã đưa vào: giá trị cũ của cột, không tính lại
+    cursor.execute("""CREATE TRIGGER progress_fts_insert AFTER INSERT ON progress BEGIN
+                        INSERT INTO progress_fts (rowid, body, name) VALUES (new.id, new.search_body, new.name_key);
+                      END""")
+    cursor.execute("""CREATE TRIGGER progress_fts_delete AFTER DELETE ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body, name)
+                        VALUES ('delete', old.id, old.search_body, old.name_key);
+                      END""")
+    cursor.execute("""CREATE TRIGGER progress_fts_update AFTER UPDATE OF search_body, name_key ON progress BEGIN
+                        INSERT INTO progress_fts (progress_fts, rowid, body, name)
+                        VALUES ('delete', old.id, old.search_body, old.name_key);
+                        INSERT INTO progress_fts (rowid, body, name) VALUES (new.id, new.search_body, new.name_key);
+                      END""")
+    cursor.execute("""CREATE TRIGGER student_notes_fts_insert AFTER INSERT ON students BEGIN
+                        INSERT INTO student_notes_fts (student_id, body) VALUES (new.student_id, new.search_body);
+                      END""")
+    cursor.execute("""CREATE TRIGGER student_notes_fts_delete AFTER DELETE ON students BEGIN
+                        DELETE FROM student_notes_fts WHERE student_id = old.student_id;
+                      END""")
+    cursor.execute("""CREATE TRIGGER student_notes_fts_update
+                      AFTER UPDATE OF student_id, search_body ON students BEGIN
+                        DELETE FROM student_notes_fts WHERE student_id = old.student_id;
+                        INSERT INTO student_notes_fts (student_id, body) VALUES (new.student_id, new.search_body);
+                      END""")
+    populate_search_index(cursor)
+    set_text_key_versions(cursor)
+
+
+def populate_attendance_rollup(cursor):
+    """Tính lại toàn bộ attendance_rollup từ bảng progress"""
+    cursor.execute("DELETE FROM attendance_rollup")
+    cursor.execute("""INSERT INTO attendance_rollup (student_key, name, class_id, month, attended, absent, entries)
+                      SELECT IFNULL(student_key, 0), IFNULL(name, ''), IFNULL(class_id, 0),
+                             IFNULL(substr(date, 1, 7), ''), SUM(status_id IS 1), SUM(status_id IS 2), COUNT(*)
+                      FROM progress
+                      GROUP BY 1, 2, 3, 4""")
+
+
+def add_name_tokens(cursor, names):
+    """Thêm vào name_tokens các đoạn cuối của những tên trong names (đã có thì bỏ qua)"""
+    cursor.executemany("INSERT OR IGNORE INTO name_tokens (token, name_key) VALUES (?, ?)",
+                       [(token, fold(name)) for name in set(names) if name for token in name_suffixes(name)])
+
+
+# Trigger chạy khi đổi các cột tính sẵn. populate_text_keys đổi mọi dòng nên
+# Database.rebuild_search_index tạm bỏ chúng rồi lập lại chỉ mục một lần
+TEXT_KEY_TRIGGERS = ("progress_fts_update", "student_notes_fts_update")
+_TEXT_KEY_CHUNK = 50000
+
+
+def populate_text_keys(cursor):
+    """Tính lại name_key, sort_key, search_body của progress / students và bảng name_tokens"""
+    # Mỗi tên lặp lại ở rất nhiều buổi, nhiều nội dung cũng vậy (nhận xét mặc định, ghi chú ngắn)
+    name_key = functools.lru_cache(maxsize=None)(lambda name: fold(name) if name is not None else None)
+    body = functools.lru_cache(maxsize=_TEXT_KEY_CHUNK)(search_text)
+    last_id = 0
+    while True:
+        rows = cursor.execute("SELECT id, name, content FROM progress WHERE id > ? ORDER BY id LIMIT ?",
+                              (last_id, _TEXT_KEY_CHUNK)).fetchall()
+        if not rows:
+            break
+        cursor.executemany("UPDATE progress SET name_key = ?, search_body = ? WHERE id = ?",
+                           [(name_key(name), body(content), row_id) for row_id, name, content in rows])
+        last_id = rows[-1][0]
+    students = cursor.execute("SELECT student_id, name, notes FROM students").fetchall()
+    cursor.executemany("UPDATE students SET name_key = ?, sort_key = ?, search_body = ? WHERE student_id = ?",
+                       [(name_key(name), name_sort_key(name), search_text(notes), student_id)
+                        for student_id, name, notes in students])
+
+    # Lập lại từ đầu: tên không còn dùng cũng được bỏ
+    cursor.execute("DELETE FROM name_tokens")
+    names = [name for (name,) in cursor.execute("SELECT DISTINCT name FROM progress").fetchall()]
+    add_name_tokens(cursor, names + [name for _, name, _ in students])
+
+
+def set_text_key_versions(cursor):
+    """Ghi vào app_meta chế độ của search_text và KEY_VERSION mà các cột đã lưu đang theo"""
+    cursor.executemany("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                       [("search_mode", search_mode()), ("text_keys", str(KEY_VERSION))])
+
+
+def text_keys_outdated(conn):
+    """True nếu các cột đã lưu chưa tính hoặc tính theo chế độ / quy tắc khác hiện tại"""
+    stored = dict(conn.execute("SELECT key, value FROM app_meta WHERE key IN ('search_mode', 'text_keys')"))
+    return stored != {"search_mode": search_mode(), "text_keys": str(KEY_VERSION)}
+
+
+def populate_search_index(cursor):
+    """Lập lại toàn bộ chỉ mục tìm kiếm từ các cột đã tính của progress và students"""
+    cursor.execute("INSERT INTO progress_fts (progress_fts) VALUES ('delete-all')")
+    cursor.execute("INSERT INTO progress_fts (rowid, body, name) SELECT id, search_body, name_key FROM progress")
+    cursor.execute("DELETE FROM student_notes_fts")
+    cursor.execute("INSERT INTO student_notes_fts (student_id, body) SELECT student_id, search_body FROM students")
+
+
+@contextmanager
+def suspended_triggers(cursor, names):
+    """
+    Tạm bỏ các trigger names trong khối with rồi tạo lại như cũ
+    Phải nằm trong transaction đã mở (BEGIN): lỗi thì rollback khôi phục cả trigger
+    """
+    cursor.execute(f"""SELECT sql FROM sqlite_master WHERE type = 'trigger'
+                       AND name IN ({",".join("?" * len(names))})""", names)
+    saved = [sql for (sql,) in cursor.fetchall()]
+    for name in names:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    yield
+    for sql in saved:
+        cursor.execute(sql)
+
+
+# Các trigger chạy cho từng dòng thêm vào progress. Database.import_progress tạm bỏ
+# chúng khi nhập lô lớn rồi gọi index_new_progress để làm thay một lần cho cả lô
+PROGRESS_INSERT_TRIGGERS = ("progress_fts_insert", "progress_rollup_insert", "progress_student_key_insert")
+
+
+def index_new_progress(cursor, after_id):
+    """Việc của PROGRESS_INSERT_TRIGGERS cho mọi dòng progress có id > after_id"""
+    cursor.execute("""INSERT INTO attendance_rollup (student_key, name, class_id, month, attended, absent, entries)
+                      SELECT IFNULL(student_key, 0), IFNULL(name, ''), IFNULL(class_id, 0),
+                             IFNULL(substr(date, 1, 7), ''), SUM(status_id IS 1), SUM(status_id IS 2), COUNT(*)
+                      FROM progress WHERE id > ?
+                      GROUP BY 1, 2, 3, 4
+                      ON CONFLICT DO UPDATE SET attended = attended + excluded.attended,
+                                                absent = absent + excluded.absent,
+                                                entries = entries + excluded.entries""", (after_id,))
+    # Sau khi đã cộng vào attendance_rollup: trigger progress_rollup_update chuyển số liệu
+    # sang hồ sơ vừa gắn (chỉ các dòng chưa có student_key, thường là tên chưa có hồ sơ)
+    cursor.execute("""UPDATE progress SET student_key = COALESCE(
+                          (SELECT MIN(student_key) FROM students WHERE name = progress.name),
+                          (SELECT student_key FROM progress AS other
+                           WHERE other.name = progress.name AND other.student_key IS NOT NULL LIMIT 1))
+                      WHERE id > ? AND student_key IS NULL""", (after_id,))
+    cursor.execute("""INSERT INTO progress_fts (rowid, body, name)
+                      SELECT id, search_body, name_key FROM progress WHERE id > ?""", (after_id,))
+
+
+MIGRATIONS = [
+    _v1_progress_indexes,
+    _v2_schedule_and_holidays,
+    _v3_unique_session,
+    _v4_full_text_search,
+    _v5_name_keys,
+    _v6_student_key,
+    _v7_class_status_codes,
+    _v8_attendance_rollup,
+    _v9_search_name_column,
+    _v10_stored_text_keys,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def upgrade_warnings(conn, from_version):
+    """Các thông báo cho người dùng sau khi nâng cấp từ from_version (dữ liệu bị thay đổi...)"""
+    warnings = []
+    if from_version < 3 and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'progress_duplicates_v3'").fetchone():
+        count = conn.execute("SELECT COUNT(*) FROM progress_duplicates_v3").fetchone()[0]
+        warnings.append(
+            f"Đã gỡ {count} dòng tiến độ trùng buổi (cùng học sinh, ngày, lớp), chỉ giữ một dòng cho mỗi buổi. "
+            "Bản gốc của các dòng bị gỡ được lưu trong bảng progress_duplicates_v3 của file database."
+        )
+    return warnings
+
+
+def migrate(conn):
+    """Chạy các bước nâng cấp còn thiếu, mỗi bước trong một transaction riêng"""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database có phiên bản {version}, mới hơn phiên bản ứng dụng hỗ trợ ({SCHEMA_VERSION})"
+        )
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        step = MIGRATIONS[target - 1]
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            step(cursor)
+            # PRAGMA không nhận tham số ràng buộc
+            cursor.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return get_schema_version(conn)
@@ -0,0 +1,162 @@
+# Phiếu báo học tập gửi phụ huynh, không phụ thuộc Qt
+#
+# Mỗi học sinh (hoặc mỗi lớp) một file Word. Các file được tạo song song trên
+# ProcessPoolExecutor; mỗi tiến trình con mở một kết nối chỉ đọc riêng tới
+# database và tự tính số liệu, tiến trình chính chỉ gửi danh sách ID.
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database import Database
+from reports import ExportCancelled, add_table, format_date, save_docx_atomic
+
+# Một học sinh trong phiếu báo
+ParentReport = namedtuple(
+    "ParentReport",
+    "student_id name class_name parent_name attended absent total sessions notes"
+)
+# Một file cần tạo: label hiển thị khi lỗi, tên file, các học sinh trong file
+BatchJob = namedtuple("BatchJob", "label filename student_ids")
+# Kết quả cả đợt: đường dẫn các file đã tạo, list (label, thông báo lỗi)
+BatchResult = namedtuple("BatchResult", "written failed")
+
+# Ký tự không dùng được trong tên file trên Windows
+_UNSAFE_FILENAME = re.compile(r'[<>:"/\\|?*\x00-\x1f]+')
+
+
+def build_parent_report(db, student_id, start_date, end_date):
+    """Số liệu phiếu báo của một học sinh trong [start_date, end_date], None nếu không có hồ sơ"""
+    profile = db.get_student_by_id(student_id)
+    if profile is None:
+        return None
+    _, name, _, parent_name, _, _, notes, class_name, _ = profile
+
+    # Cùng cách tính với báo cáo thống kê; get_attendance_by_student được đệm
+    # nên mỗi tiến trình con chỉ tính một lần cho cả đợt
+    attendance_by_student = db.get_attendance_by_student(start_date, end_date)
+    _, _, display_class, attended, absent, total = db.combine_student_attendance(
+        [(student_id, name, class_name)], attendance_by_student, start_date, end_date
+    )[0]
+    sessions = db.get_student_sessions(student_id, start_date, end_date)
+    return ParentReport(student_id, name, display_class, parent_name,
+                        attended, absent, total, tuple(sessions), notes)
+
+
+def plan_batch(db, per_class=False, student_ids=None):
+    """
+    Chia danh sách học sinh thành các file cần tạo
+    per_class=False: mỗi học sinh một file; True: mỗi lớp (theo hồ sơ) một file
+    student_ids: chỉ tạo cho các học sinh này, mặc định là tất cả
+    """
+    profiles = db.get_all_students()
+    if student_ids is not None:
+        wanted = set(student_ids)
+        profiles = [row for row in profiles if row[0] in wanted]
+
+    if not per_class:
+        return [
+            BatchJob(f"{row[0]} - {row[1]}", _safe_filename(f"{row[0]}_{row[1]}"), (row[0],))
+            for row in profiles
+        ]
+    by_class = {}
+    for row in profiles:
+        by_class.setdefault(row[7] or "", []).append(row[0])
+    return [
+        BatchJob(class_name or "(Chưa xếp lớp)",
+                 _safe_filename(f"Lop_{class_name or 'chua_xep_lop'}"),
+                 tuple(ids))
+        for class_name, ids in sorted(by_class.items())
+    ]
+
+
+def _safe_filename(text):
+    return _UNSAFE_FILENAME.sub("_", text).strip(" .") + ".docx"
+
+
+def write_parent_docx(reports, path, start_date, end_date):
+    """Ghi một hoặc nhiều phiếu báo (mỗi học sinh một trang) vào path"""
+    from docx import Document
+
+    doc = Document()
+    for i, report in enumerate(reports):
+        if i:
+            doc.add_page_break()
+        doc.add_heading('PHIẾU BÁO TÌNH HÌNH HỌC TẬP', 0)
+        doc.add_paragraph(f"Từ ngày: {format_date(start_date)} đến ngày: {format_date(end_date)}")
+        doc.add_paragraph(f"Học sinh: {report.name} (ID: {report.student_id})")
+        doc.add_paragraph(f"Lớp: {report.class_name or ''}")
+        if report.parent_name:
+            doc.add_paragraph(f"Kính gửi phụ huynh: {report.parent_name}")
+
+        doc.add_heading('1. Chuyên cần', level=1)
+        add_table(doc, ['Số buổi đi học', 'Số buổi nghỉ', 'Tổng số buổi'],
+                  [(str(report.attended), str(report.absent), str(report.total))])
+
+        doc.add_heading('2. Các buổi học', level=1)
+        add_table(doc, ['Ngày', 'Lớp', 'Trạng thái', 'Nội dung / nhận xét'], [
+            (format_date(date), class_name or "", status or "", content or "")
+            for date, class_name, status, content in report.sessions
+        ])
+
+        if report.notes:
+            doc.add_heading('3. Nhận xét của giáo viên', level=1)
+            doc.add_paragraph(report.notes)
+
+    save_docx_atomic(doc, path)
+    return path
+
+
+# =========================
+# CHẠY SONG SONG
+# =========================
+
+# Kết nối của tiến trình con, mở một lần trong _init_worker
+_worker_db = None
+
+
+def _init_worker(db_name, profile):
+    global _worker_db
+    _worker_db = Database(db_name, profile, read_only=True)
+
+
+def _run_job(job, output_dir, start_date, end_date):
+    reports = []
+    for student_id in job.student_ids:
+        report = build_parent_report(_worker_db, student_id, start_date, end_date)
+        if report is not None:
+            reports.append(report)
+    if not reports:
+        raise ValueError("Không tìm thấy hồ sơ học sinh")
+    return write_parent_docx(reports, os.path.join(output_dir, job.filename), start_date, end_date)
+
+
+def generate_parent_reports(db_name, jobs, output_dir, start_date, end_date,
+                            profile=None, max_workers=None, progress=None):
+    """
+    Tạo các file của plan_batch trong output_dir, song song trên max_workers tiến trình
+    (mặc định bằng số nhân CPU)
+    progress(done, total): gọi sau mỗi file, trả về False để hủy các file chưa chạy (ExportCancelled)
+    Lỗi của từng file không làm dừng cả đợt, được gom vào BatchResult.failed
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written, failed = [], []
+    total = len(jobs)
+    executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                   initargs=(db_name, profile))
+    try:
+        futures = {
+            executor.submit(_run_job, job, output_dir, start_date, end_date): job
+            for job in jobs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                written.append(future.result())
+            except Exception as e:
+                failed.append((futures[future].label, str(e)))
+            if progress is not None and progress(done, total) is False:
+                raise ExportCancelled()
+    finally:
+        # Hủy thì bỏ các file chưa bắt đầu, các file đang ghi dở vẫn được ghi xong
+        executor.shutdown(wait=True, cancel_futures=True)
+    return BatchResult(written, failed)
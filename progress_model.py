@@ -0,0 +1,213 @@
+# Model cho bảng tiến độ chính: chỉ đọc từng trang khi người dùng cuộn tới
+#
+# Các trang được đọc ở luồng nền qua workers.QueryExecutor (kết nối chỉ đọc của luồng),
+# kết quả về lại luồng giao diện qua signal nên cửa sổ không bị treo khi truy vấn chậm
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from PySide6.QtGui import QBrush, QColor, QFont
+
+PLACEHOLDER_CONTENT = "(Chưa có nhận xét cuối buổi)"
+
+# Cột trong dòng progress: id, date, name, class_name, status, content, is_highlighted
+COL_ID, COL_CONTENT, COL_HIGHLIGHT = 0, 5, 6
+
+# Khóa yêu cầu của QueryExecutor: trang mới thay cho trang cũ chưa về (đổi bộ lọc)
+PAGE_KEY = "progress_page"
+
+
+def _read_page(db, fetch_page, page_size, after):
+    return fetch_page(db, page_size=page_size, after=after)
+
+
+class ProgressTableModel(QAbstractTableModel):
+    HEADERS = ["ID", "Ngày", "Học sinh", "Lớp", "Trạng thái", "Nội dung bài học (Cập nhật cuối buổi)"]
+    BATCH_SIZE = 256
+
+    # Trang đầu của nguồn dữ liệu mới đã hiện / đọc trang bị lỗi (thông báo lỗi)
+    first_page_loaded = Signal()
+    page_failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._fetch_page = None
+        # Token (date, id) của dòng cuối trang đã nhận, là after của lần đọc kế tiếp
+        self._next_token = None
+        self._executor = None
+        self._loading = False
+        self._first_page = False
+
+        # Dùng chung cho mọi ô thay vì tạo QColor cho từng ô
+        self._highlight_brushes = {
+            1: QBrush(QColor("#fff3cd")),  # Cần chú ý
+            2: QBrush(QColor("#d4edda")),  # Học tốt
+            3: QBrush(QColor("#f8d7da")),  # Báo động
+        }
+        self._placeholder_brush = QBrush(QColor("#d9534f"))
+        self._placeholder_font = QFont()
+        self._placeholder_font.setItalic(True)
+
+    def set_executor(self, executor):
+        """executor: workers.QueryExecutor dùng để đọc các trang"""
+        self._executor = executor
+        executor.finished.connect(self._on_page_ready)
+        executor.failed.connect(self._on_page_failed)
+
+    def set_source(self, fetch_page):
+        """
+        fetch_page(db, page_size=..., after=token) -> (rows, next_token), ví dụ Database.get_progress_page
+        (chạy ở luồng nền với kết nối của luồng đó). Trang đầu được đọc ngay, các trang sau qua fetchMore
+        """
+        self.beginResetModel()
+        self._rows = []
+        self._fetch_page = fetch_page
+        self._next_token = None
+        self._loading = False
+        self._first_page = True
+        self.endResetModel()
+        self.fetchMore()
+
+    def row_id(self, row):
+        return self._rows[row][COL_ID]
+
+    # =========================
+    # CẬP NHẬT TỪNG DÒNG SAU KHI GHI
+    # =========================
+
+    @staticmethod
+    def _sort_key(row):
+        # Thứ tự hiển thị: ORDER BY date DESC, id DESC
+        return (row[1], row[COL_ID])
+
+    def _insert_position(self, key):
+        """Vị trí đầu tiên có khóa nhỏ hơn key (danh sách đang giảm dần)"""
+        low, high = 0, len(self._rows)
+        while low < high:
+            mid = (low + high) // 2
+            if self._sort_key(self._rows[mid]) > key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def remove_ids(self, ids):
+        """Bỏ các dòng có id trong ids (vừa bị xóa), giữ nguyên cuộn / chọn của các dòng khác"""
+        ids = set(ids)
+        positions = [i for i, row in enumerate(self._rows) if row[COL_ID] in ids]
+        # Xóa từ cuối lên, gộp các dòng liền nhau thành một lần
+        while positions:
+            last = first = positions.pop()
+            while positions and positions[-1] == first - 1:
+                first = positions.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+
+    def refresh_rows(self, ids, rows):
+        """
+        ids: các dòng vừa được ghi; rows: dữ liệu mới của những dòng trong ids còn khớp bộ lọc
+        Dòng không đổi vị trí được sửa tại chỗ, dòng không còn khớp bị bỏ,
+        dòng mới được chèn đúng vị trí sắp xếp (nếu nằm trong phần đã tải)
+        """
+        fresh = {row[COL_ID]: row for row in rows}
+        positions = {row[COL_ID]: i for i, row in enumerate(self._rows)}
+
+        moved = []
+        for row_id in ids:
+            pos = positions.get(row_id)
+            row = fresh.get(row_id)
+            if pos is not None and row is not None and self._sort_key(row) == self._sort_key(self._rows[pos]):
+                self._rows[pos] = row
+                self.dataChanged.emit(self.index(pos, 0), self.index(pos, self.columnCount() - 1))
+            else:
+                moved.append(row_id)
+        if not moved:
+            return
+
+        self.remove_ids([row_id for row_id in moved if row_id in positions])
+        for row_id in moved:
+            row = fresh.get(row_id)
+            if row is None:
+                continue
+            key = self._sort_key(row)
+            # Còn trang chưa tải và dòng nằm sau token của trang cuối (hoặc chưa nhận trang nào):
+            # để fetchMore đọc sau. So với token chứ không với dòng cuối hiện tại, vì dòng cuối
+            # có thể vừa bị bỏ ở trên và khoảng giữa hai khóa đó sẽ không được đọc lại
+            if self._fetch_page is not None and (self._next_token is None or key < tuple(self._next_token)):
+                continue
+            pos = self._insert_position(key)
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self._rows.insert(pos, row)
+            self.endInsertRows()
+        if self._loading:
+            # Trang đang đọc có thể đã lấy dữ liệu trước lần ghi này: đọc lại (kết quả cũ bị bỏ)
+            self._loading = False
+            self.fetchMore()
+
+    def row_data(self, row):
+        return self._rows[row]
+
+    # =========================
+    # QAbstractTableModel
+    # =========================
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            return str(row[col])
+        if role == Qt.BackgroundRole:
+            return self._highlight_brushes.get(row[COL_HIGHLIGHT])
+        if col == COL_CONTENT and row[COL_CONTENT] == PLACEHOLDER_CONTENT:
+            if role == Qt.ForegroundRole:
+                return self._placeholder_brush
+            if role == Qt.FontRole:
+                return self._placeholder_font
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetch_page is not None and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._fetch_page is None or self._loading:
+            return
+        self._loading = True
+        self._executor.submit(PAGE_KEY, _read_page, self._fetch_page, self.BATCH_SIZE, self._next_token)
+
+    def _on_page_ready(self, key, result):
+        if key != PAGE_KEY:
+            return
+        self._loading = False
+        batch, self._next_token = result
+        if self._next_token is None:
+            # Đã đọc hết
+            self._fetch_page = None
+        if batch:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self._rows.extend(batch)
+            self.endInsertRows()
+        if self._first_page:
+            self._first_page = False
+            self.first_page_loaded.emit()
+
+    def _on_page_failed(self, key, message):
+        if key != PAGE_KEY:
+            return
+        # Không đọc tiếp nguồn này nữa (tránh báo lỗi lặp lại mỗi lần cuộn)
+        self._loading = False
+        self._fetch_page = None
+        self.page_failed.emit(message)
@@ -0,0 +1,69 @@
+# Bộ nhớ đệm kết quả truy vấn đọc của Database
+#
+# Các Database mở cùng một file trong tiến trình (kết nối chính và các kết nối
+# chỉ đọc của luồng nền) dùng chung một QueryCache. Mỗi lần ghi tăng
+# generation nên kết quả cũ không bao giờ được trả lại.
+import os
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Trả về (True, value) nếu có kết quả của generation hiện tại, không thì (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, generation, value):
+        """Lưu kết quả đọc được ở generation; bỏ qua nếu đã có lần ghi xen giữa"""
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "generation": self.generation,
+            }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(db_name, max_entries):
+    """QueryCache dùng chung cho mọi Database mở cùng file (":memory:" thì riêng từng kết nối)"""
+    if db_name == ":memory:":
+        return QueryCache(max_entries)
+    path = os.path.abspath(db_name)
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = QueryCache(max_entries)
+        return _shared[path]
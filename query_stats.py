@@ -0,0 +1,267 @@
+# Đo thời gian từng câu SQL và ghi log câu chậm, không phụ thuộc Qt
+#
+# Khi bật settings.QUERY_STATS, database.connect() mở kết nối bằng TimedConnection:
+# mỗi câu lệnh được đo từ lúc execute tới khi đọc hết kết quả (fetch / duyệt cursor)
+# và gộp theo "dạng" câu lệnh (bỏ khoảng trắng thừa, danh sách ?,?,? thu gọn).
+# Câu chậm hơn settings.SLOW_QUERY_MS được ghi vào settings.SLOW_QUERY_LOG (xoay
+# vòng theo dung lượng) kèm EXPLAIN QUERY PLAN. Khi tắt, kết nối là sqlite3.Connection
+# thường nên không tốn thêm gì.
+import re
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+import settings
+
+# Số lần đo gần nhất giữ lại cho mỗi dạng câu lệnh để tính p95
+SAMPLES_PER_SHAPE = 512
+
+# Câu lệnh gần nhất (thời điểm, dạng câu lệnh, ms, số dòng)
+RecentQuery = namedtuple("RecentQuery", "time shape ms rows")
+
+_SPACES = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\1)+")
+# Câu lệnh có thể EXPLAIN QUERY PLAN
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def statement_shape(sql):
+    """Dạng câu lệnh để gộp số liệu: IN (?,?,?) / VALUES (?,?),(?,?) có độ dài khác nhau vẫn là một dạng"""
+    shape = _SPACES.sub(" ", sql).strip()
+    shape = _PLACEHOLDERS.sub("?, ...", shape)
+    return _VALUES_ROWS.sub(r"\1, ...", shape)
+
+
+class _ShapeStats:
+    __slots__ = ("calls", "total", "min", "max", "rows", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_PER_SHAPE)
+
+
+class QueryStats:
+    """Số liệu của mọi kết nối trong tiến trình (dùng chung giữa các luồng)"""
+    def __init__(self, recent_size=200):
+        self._shapes = {}
+        self._shape_of = {}
+        self._recent = deque(maxlen=recent_size)
+        self._lock = threading.Lock()
+        self._slow_logger = None
+
+    def _shape(self, sql):
+        shape = self._shape_of.get(sql)
+        if shape is None:
+            if len(self._shape_of) > 2000:
+                self._shape_of.clear()
+            shape = self._shape_of[sql] = statement_shape(sql)
+        return shape
+
+    def record(self, sql, seconds, rows, explain=None):
+        """
+        Ghi một lần chạy câu lệnh sql mất seconds giây, trả về / ảnh hưởng rows dòng
+        explain(): trả về các dòng EXPLAIN QUERY PLAN, chỉ được gọi khi câu lệnh chậm
+        """
+        shape = self._shape(sql)
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None:
+                stats = self._shapes[shape] = _ShapeStats()
+            stats.calls += 1
+            stats.total += ms
+            stats.min = min(stats.min, ms)
+            stats.max = max(stats.max, ms)
+            stats.rows += rows
+            stats.samples.append(ms)
+            self._recent.append(RecentQuery(time.time(), shape, ms, rows))
+        if ms >= settings.SLOW_QUERY_MS:
+            self._log_slow(shape, ms, rows, explain)
+
+    def _log_slow(self, shape, ms, rows, explain):
+        try:
+            plan = explain() if explain is not None else []
+        except sqlite3.Error as e:
+            plan = [f"(không lấy được: {e})"]
+        lines = [f"{ms:.1f} ms | {rows} dòng | {shape}"]
+        lines += [f"    {line}" for line in plan]
+        self._logger().warning("\n".join(lines))
+
+    def _logger(self):
+        # Chỉ tạo file log khi có câu chậm đầu tiên
+        if self._slow_logger is None:
+            import logging
+            from logging.handlers import RotatingFileHandler
+
+            logger = logging.getLogger("hoctap.slow_query")
+            logger.propagate = False
+            if not logger.handlers:
+                handler = RotatingFileHandler(settings.SLOW_QUERY_LOG, maxBytes=settings.SLOW_QUERY_LOG_BYTES,
+                                              backupCount=settings.SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+                logger.addHandler(handler)
+            self._slow_logger = logger
+        return self._slow_logger
+
+    def snapshot(self):
+        """list dict theo từng dạng câu lệnh (tổng thời gian giảm dần)"""
+        with self._lock:
+            items = [(shape, stats, sorted(stats.samples)) for shape, stats in self._shapes.items()]
+        result = [
+            {
+                "shape": shape,
+                "calls": stats.calls,
+                "total_ms": round(stats.total, 3),
+                "min_ms": round(stats.min, 3),
+                "max_ms": round(stats.max, 3),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                "rows": stats.rows,
+            }
+            for shape, stats, samples in items
+        ]
+        return sorted(result, key=lambda item: item["total_ms"], reverse=True)
+
+    def recent(self):
+        """Các câu lệnh gần nhất, mới nhất trước"""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._recent.clear()
+
+
+STATS = QueryStats()
+
+
+def _plan(connection, sql, params):
+    # Cursor thường (không đo) để EXPLAIN không bị ghi lại như một câu lệnh
+    cursor = sqlite3.Cursor(connection)
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [detail for _, _, _, detail in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor đo thời gian execute + các lần fetch cho tới khi đọc hết kết quả"""
+    _pending = None
+
+    def _start(self, sql, params):
+        self._finish()
+        self._pending = [sql, params, 0.0, 0]
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        sql, params, seconds, rows = pending
+        explain = None
+        if sql.lstrip()[:7].upper().startswith(_EXPLAINABLE):
+            explain = lambda: _plan(self.connection, sql, params)
+        STATS.record(sql, seconds, rows, explain)
+
+    def _add(self, seconds, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += seconds
+            pending[3] += rows
+            if done:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            # Câu lệnh không trả về dòng (INSERT, UPDATE...) kết thúc ngay, số dòng là rowcount
+            no_rows = self.description is None
+            self._add(time.perf_counter() - start, max(self.rowcount, 0) if no_rows else 0, no_rows)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        # Chỉ giữ bộ tham số đầu tiên cho EXPLAIN, không làm hết generator của người gọi
+        rows = iter(seq_of_parameters)
+        first = next(rows, None)
+        self._start(sql, first if first is not None else ())
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, rows if first is None else _prepend(first, rows))
+        finally:
+            self._add(time.perf_counter() - start, max(self.rowcount, 0), True)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add(time.perf_counter() - start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(time.perf_counter() - start, 0, True)
+            raise
+        self._add(time.perf_counter() - start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Cursor bị bỏ trước khi đọc hết (ví dụ chỉ fetchone một dòng)
+        self._finish()
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+class TimedConnection(sqlite3.Connection):
+    """Kết nối có mọi cursor là TimedCursor; commit / rollback (kể cả qua with) cũng được đo"""
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        super().commit()
+        STATS.record("COMMIT", time.perf_counter() - start, 0)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        start = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            STATS.record("COMMIT" if exc_type is None else "ROLLBACK", time.perf_counter() - start, 0)
@@ -0,0 +1,43 @@
+# Danh mục lớp học và trạng thái điểm danh
+#
+# Bảng progress chỉ lưu mã số nguyên (class_id, status_id). Danh mục được đọc
+# một lần khi mở Database (Database.registry) và mọi widget lấy danh sách lớp /
+# trạng thái từ đây thay vì viết cứng trong code.
+
+# Mã cố định của hai trạng thái mặc định (xem migrations._v7_class_status_codes)
+STATUS_PRESENT = 1  # "Đi học"
+STATUS_ABSENT = 2   # "Nghỉ học"
+
+# Lựa chọn "không lọc theo lớp" trên các bộ lọc
+ALL_CLASSES = "Tất cả lớp"
+
+
+class Registry:
+    def __init__(self, classes=(), statuses=()):
+        """classes, statuses: list (id, name) theo thứ tự hiển thị"""
+        self._class_names = [name for _, name in classes]
+        self._class_by_id = dict(classes)
+        self._class_by_name = {name: class_id for class_id, name in classes}
+        self._status_names = [name for _, name in statuses]
+        self._status_by_id = dict(statuses)
+        self._status_by_name = {name: status_id for status_id, name in statuses}
+
+    def class_names(self):
+        return list(self._class_names)
+
+    def class_id(self, name):
+        """Mã lớp, None nếu không có trong danh mục"""
+        return self._class_by_name.get(name)
+
+    def class_name(self, class_id):
+        return self._class_by_id.get(class_id)
+
+    def status_names(self):
+        return list(self._status_names)
+
+    def status_id(self, name):
+        """Mã trạng thái, None nếu không có trong danh mục"""
+        return self._status_by_name.get(name)
+
+    def status_name(self, status_id):
+        return self._status_by_id.get(status_id)
@@ -0,0 +1,234 @@
+# Báo cáo thống kê đào tạo, không phụ thuộc Qt
+#
+# StatsReport được tính một lần từ vài truy vấn gộp trên Database, sau đó cả
+# 3 bảng trong StatisticsDialog và file Word đều hiển thị từ cùng một đối tượng.
+import copy
+import os
+from collections import namedtuple
+from datetime import datetime
+
+from textnorm import name_sort_key
+
+# Bảng 1: Tóm tắt tỉ lệ chuyên cần theo lớp
+ClassSummary = namedtuple("ClassSummary", "class_name total_students present absent percent")
+# Bảng 2: Số buổi học theo ID học sinh
+StudentAttendance = namedtuple("StudentAttendance", "student_id name class_name attended absent total")
+# Bảng 3: Chi tiết học viên và nhận xét
+StudentDetail = namedtuple("StudentDetail", "name classes comment")
+
+StatsReport = namedtuple("StatsReport", "start_date end_date summary students details")
+
+# Số dòng giữa hai lần báo tiến độ khi xuất file
+PROGRESS_STEP = 100
+
+
+class ExportCancelled(Exception):
+    """Người dùng hủy xuất file, file đích không bị thay đổi"""
+
+
+def build_stats_report(db, start_date, end_date, classes=None):
+    """
+    Tính toàn bộ báo cáo cho khoảng thời gian [start_date, end_date] (YYYY-MM-DD)
+    classes: các lớp trong bảng tóm tắt, mặc định là danh mục lớp của database
+    Trả về StatsReport, các phần bên trong là tuple nên không sửa được
+    """
+    # Một truy vấn gộp theo (học sinh, lớp) dùng cho cả 3 bảng
+    groups = db.get_attendance_groups(start_date, end_date)
+
+    # 1. Tóm tắt theo lớp
+    summary = build_class_summary(db, start_date, end_date, classes, groups)
+
+    # 2. Thống kê theo ID học sinh
+    attendance_by_student = db.get_attendance_by_student(start_date, end_date, groups)
+    profiles = db.get_all_students()
+    students = build_student_attendance(db, start_date, end_date, groups, attendance_by_student, profiles)
+
+    # 3. Chi tiết: mỗi cặp (tên, lớp) trong hồ sơ, sắp xếp theo tên
+    student_by_pair = {}
+    for row in profiles:
+        student_by_pair.setdefault((row[1], row[7]), row[0])
+    details = []
+    for name, class_name in sorted(student_by_pair, key=_name_class_key):
+        classes_in_period = attendance_by_student.get(student_by_pair[name, class_name], (0, []))[1]
+        display_classes = ", ".join(classes_in_period) if classes_in_period else class_name
+        details.append(StudentDetail(name, display_classes, ""))
+
+    return StatsReport(start_date, end_date, summary, students, tuple(details))
+
+
+def build_class_summary(db, start_date, end_date, classes=None, groups=None):
+    """Bảng tóm tắt chuyên cần theo lớp (tuple ClassSummary), không cần tính cả báo cáo"""
+    if classes is None:
+        classes = db.registry.class_names()
+    class_summary = db.get_class_summary(start_date, end_date, groups)
+    summary = []
+    for class_name in classes:
+        total_students, present = class_summary.get(class_name, (0, 0))
+
+        # Tổng số buổi = sĩ số × số buổi dự kiến của lớp
+        total_expected = total_students * db.count_expected_sessions(class_name, start_date, end_date)
+        absent = max(0, total_expected - present)
+        percent = (present / total_expected * 100) if total_expected > 0 else 0
+        summary.append(ClassSummary(class_name, total_students, present, absent, percent))
+    return tuple(summary)
+
+
+def build_student_attendance(db, start_date, end_date, groups=None, attendance_by_student=None, profiles=None):
+    """Bảng số buổi học theo ID học sinh (tuple StudentAttendance), không cần tính cả báo cáo"""
+    if attendance_by_student is None:
+        attendance_by_student = db.get_attendance_by_student(start_date, end_date, groups)
+    if profiles is None:
+        profiles = db.get_all_students()
+    students = db.combine_student_attendance(
+        [(row[0], row[1], row[7]) for row in profiles],
+        attendance_by_student, start_date, end_date
+    )
+    return tuple(StudentAttendance(*row) for row in students)
+
+
+def with_comments(report, comments):
+    """Trả về báo cáo mới với nhận xét (theo thứ tự bảng chi tiết) do giáo viên nhập"""
+    details = tuple(
+        detail._replace(comment=comment or "")
+        for detail, comment in zip(report.details, comments)
+    )
+    return report._replace(details=details + report.details[len(details):])
+
+
+def _name_class_key(pair):
+    # Xếp theo tên tiếng Việt, NULL đứng trước
+    name, class_name = pair
+    return (name is not None, name_sort_key(name), class_name is not None, class_name or "")
+
+
+def format_date(date_str):
+    """YYYY-MM-DD -> dd/MM/yyyy"""
+    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d/%m/%Y")
+
+
+def summary_rows(report):
+    """Các dòng chữ của bảng tóm tắt theo lớp"""
+    for item in report.summary:
+        yield (item.class_name, str(item.total_students), str(item.present),
+               str(item.absent), f"{item.percent:.1f}%")
+
+
+def student_rows(report):
+    """Các dòng chữ của bảng thống kê theo ID học sinh"""
+    for item in report.students:
+        yield (item.student_id, item.name, item.class_name or "",
+               str(item.attended), str(item.absent), str(item.total))
+
+
+def detail_rows(report):
+    """Các dòng chữ của bảng chi tiết học viên"""
+    for item in report.details:
+        yield (item.name, item.classes or "", item.comment)
+
+
+def write_report_docx(report, path, progress=None):
+    """
+    Xuất báo cáo ra file Word (python-docx chỉ được import khi cần)
+    progress(done, total): gọi sau mỗi PROGRESS_STEP dòng, trả về False để hủy (ExportCancelled)
+    File được ghi ra file tạm cùng thư mục rồi mới đổi tên, nên hủy hay lỗi giữa
+    chừng đều không làm hỏng file cũ
+    """
+    from docx import Document
+
+    sections = [
+        ('1. Thống kê chuyên cần theo lớp',
+         ['Tên lớp', 'Sĩ số', 'Đi học', 'Nghỉ học', 'Tỉ lệ (%)'], summary_rows(report)),
+        ('2. Thống kê số buổi học theo ID học sinh',
+         ['ID học sinh', 'Họ tên', 'Lớp', 'Số buổi đi học', 'Số buổi nghỉ', 'Tổng số buổi'],
+         student_rows(report)),
+        ('3. Chi tiết học viên và nhận xét',
+         ['Họ tên', 'Lớp đang học', 'Nhận xét'], detail_rows(report)),
+    ]
+    # +1 cho bước lưu file
+    total = len(report.summary) + len(report.students) + len(report.details) + 1
+    tracker = _Progress(progress, total)
+
+    doc = Document()
+    doc.add_heading('BÁO CÁO TÌNH HÌNH HỌC TẬP', 0)
+
+    # Thông tin thời gian
+    doc.add_paragraph(f"Từ ngày: {format_date(report.start_date)} đến ngày: {format_date(report.end_date)}")
+
+    for i, (heading, headers, rows) in enumerate(sections):
+        if i:
+            doc.add_paragraph("\n")
+        doc.add_heading(heading, level=1)
+        add_table(doc, headers, rows, tracker)
+
+    # Lần cuối có thể hủy là trước khi lưu; đã đổi tên xong thì file là bản mới
+    tracker.advance(0, force=True)
+    save_docx_atomic(doc, path)
+    if progress is not None:
+        progress(total, total)
+    return path
+
+
+class _Progress:
+    def __init__(self, callback, total):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+
+    def advance(self, count=1, force=False):
+        self.done += count
+        if self.callback is None:
+            return
+        if force or self.done % PROGRESS_STEP == 0:
+            if self.callback(self.done, self.total) is False:
+                raise ExportCancelled()
+
+
+def save_docx_atomic(doc, path):
+    """Lưu ra file tạm cùng thư mục rồi os.replace, file đích không bao giờ bị ghi dở"""
+    # Import tại chỗ: cli.py dùng các hàm thống kê của module này và cần khởi động nhanh
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".~", suffix=".docx", dir=directory)
+    os.close(fd)
+    try:
+        doc.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def add_table(doc, headers, rows, tracker=None):
+    """Thêm bảng có dòng tiêu đề headers và các dòng chữ rows vào doc"""
+    from docx.oxml.ns import qn
+
+    table = doc.add_table(rows=1, cols=len(headers))
+    table.style = 'Table Grid'
+    for cell, text in zip(table.rows[0].cells, headers):
+        cell.text = text
+
+    # Gán cell.text cho từng ô rất chậm với bảng vài nghìn dòng. Tạo một dòng
+    # mẫu rồi sao chép phần XML của nó, chỉ thay nội dung chữ của từng ô
+    template = table.add_row()
+    for cell in template.cells:
+        cell.text = "-"
+    template_tr = template._tr
+    template_tr.getparent().remove(template_tr)
+    for t in template_tr.iter(qn('w:t')):
+        t.set(qn('xml:space'), 'preserve')
+
+    tbl = table._tbl
+    for values in rows:
+        if any("\n" in text or "\t" in text for text in values):
+            # Xuống dòng / tab cần thẻ riêng, để python-docx tự xử lý
+            for cell, text in zip(table.add_row().cells, values):
+                cell.text = text
+        else:
+            tr = copy.deepcopy(template_tr)
+            for t, text in zip(tr.iter(qn('w:t')), values):
+                t.text = text
+            tbl.append(tr)
+        if tracker is not None:
+            tracker.advance()
+    return table
@@ -0,0 +1,66 @@
+import os
+
+# =========================
+# CẤU HÌNH CƠ SỞ DỮ LIỆU
+# =========================
+
+# Có thể trỏ sang file khác bằng biến môi trường HOCTAP_DB (benchmark, chạy thử)
+DB_NAME = os.environ.get("HOCTAP_DB", 'hoc_tap.db')
+
+# Chế độ kết nối SQLite (xem DB_PROFILES trong database.py):
+#   "throughput" - WAL + synchronous=NORMAL: ghi nhanh, mất điện có thể mất vài giao dịch cuối
+#   "durability" - WAL + synchronous=FULL: mỗi lần lưu đều fsync, an toàn nhất
+# Có thể đổi nhanh bằng biến môi trường HOCTAP_DB_PROFILE
+DB_PROFILE = os.environ.get("HOCTAP_DB_PROFILE", "throughput")
+
+# Bộ nhớ đệm trang (KB) và vùng mmap (byte) cho mỗi kết nối
+DB_CACHE_SIZE_KB = int(os.environ.get("HOCTAP_DB_CACHE_KB", 16 * 1024))
+DB_MMAP_SIZE = int(os.environ.get("HOCTAP_DB_MMAP", 64 * 1024 * 1024))
+
+# Thời gian chờ khi database đang bị khóa bởi kết nối khác (ms)
+DB_BUSY_TIMEOUT_MS = 5000
+
+# =========================
+# TÌM KIẾM NỘI DUNG (FTS5)
+# =========================
+
+# True: tìm không phân biệt dấu, "vong lap" khớp "vòng lặp".
+# Đổi giá trị này thì chỉ mục tìm kiếm sẽ được lập lại khi mở database
+SEARCH_FOLD_DIACRITICS = True
+
+# Số kết quả tìm kiếm tối đa hiển thị trên bảng chính
+SEARCH_LIMIT = 500
+
+# Chỉ xếp hạng (bm25) trong số buổi khớp mới nhất này: từ phổ biến như "hoc" khớp gần
+# như mọi dòng, sắp xếp toàn bộ sẽ chậm dần theo kích thước database
+SEARCH_CANDIDATES = 2000
+
+# =========================
+# NHẬP DỮ LIỆU
+# =========================
+
+# Lô nhập (Database.import_progress) từ số dòng này trở lên: tạm bỏ các trigger chạy cho
+# từng dòng, cập nhật chỉ mục tìm kiếm / bảng tổng hợp một lần cho cả lô
+BULK_IMPORT_ROWS = 1000
+
+# =========================
+# BỘ ĐỆM TRUY VẤN
+# =========================
+
+# Số kết quả đọc tối đa giữ trong bộ đệm của Database (0 = tắt)
+QUERY_CACHE_SIZE = int(os.environ.get("HOCTAP_QUERY_CACHE", 256))
+
+# =========================
+# ĐO THỜI GIAN TRUY VẤN
+# =========================
+
+# Đo thời gian từng câu SQL (xem query_stats.py). Tắt thì kết nối là sqlite3 thường,
+# không tốn thêm gì; bật bằng biến môi trường HOCTAP_QUERY_STATS=1
+QUERY_STATS = os.environ.get("HOCTAP_QUERY_STATS") == "1"
+
+# Câu lệnh chạy lâu hơn ngưỡng này (ms) được ghi vào file log kèm EXPLAIN QUERY PLAN
+SLOW_QUERY_MS = float(os.environ.get("HOCTAP_SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG = os.environ.get("HOCTAP_SLOW_QUERY_LOG", "slow_queries.log")
+# File log đầy thì đổi tên thành .1, .2... và giữ tối đa SLOW_QUERY_LOG_BACKUPS file cũ
+SLOW_QUERY_LOG_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
@@ -0,0 +1,34 @@
+# Đo thời gian khởi động của ứng dụng, không phụ thuộc Qt
+#
+# Bật bằng biến môi trường HOCTAP_STARTUP_TIMING=1: main.py đánh dấu các mốc
+# (import xong, tạo cửa sổ, vẽ lần đầu, có dữ liệu) và khi xong in một dòng
+# JSON ra stderr. HOCTAP_STARTUP_EXIT=1 thì thoát ngay sau khi có dữ liệu.
+# benchmarks/bench_startup.py chạy ứng dụng theo cách này để so sánh giữa các phiên bản.
+import os
+import sys
+import time
+
+ENABLED = os.environ.get("HOCTAP_STARTUP_TIMING") == "1"
+EXIT_WHEN_READY = ENABLED and os.environ.get("HOCTAP_STARTUP_EXIT") == "1"
+
+# Tiền tố của dòng kết quả trên stderr
+REPORT_PREFIX = "startup-timing "
+
+# Mốc 0 là lúc module này được import (dòng import đầu tiên của main.py)
+_start = time.perf_counter()
+_marks = {}
+
+
+def mark(name):
+    """Ghi thời điểm (ms từ lúc bắt đầu) của mốc name, chỉ lần đầu"""
+    if ENABLED and name not in _marks:
+        _marks[name] = round((time.perf_counter() - _start) * 1000, 1)
+
+
+def report():
+    """In các mốc đã ghi ra stderr dạng JSON (bản .exe --windowed không có stderr thì bỏ qua)"""
+    if ENABLED and sys.stderr is not None:
+        import json
+
+        sys.stderr.write(REPORT_PREFIX + json.dumps(_marks) + "\n")
+        sys.stderr.flush()
@@ -3,7 +3,7 @@ MAIN_STYLE = """
         background-color: #ffffff; 
         color: #333; 
     }
-    QTableWidget { 
+    QTableView { 
         gridline-color: #eee; 
         border: 1px solid #ddd; 
     }
@@ -0,0 +1,125 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.datagen import generate_dataset
+from database import Database
+from registry import STATUS_PRESENT, STATUS_ABSENT
+
+
+def reference_students_with_attendance(db, start_date_str, end_date_str):
+    """
+    Cách tính cũ (hai truy vấn cho mỗi học sinh, đếm buổi dự kiến bằng cách duyệt từng ngày),
+    giữ lại làm chuẩn để so sánh với get_all_students_with_attendance
+    """
+    cursor = db.conn.cursor()
+    schedule = db.get_class_schedule()
+    cancelled = {}
+    for _, day, class_name, _ in db.get_cancelled_sessions():
+        cancelled.setdefault(day, set()).add(class_name)
+
+    def count_expected_sessions(class_name):
+        weekdays = schedule.get(class_name, [])
+        current = date.fromisoformat(start_date_str)
+        end = date.fromisoformat(end_date_str)
+        count = 0
+        while current <= end:
+            closed = cancelled.get(current.isoformat(), set())
+            if current.weekday() in weekdays and None not in closed and class_name not in closed:
+                count += 1
+            current += timedelta(days=1)
+        return count
+
+    cursor.execute("SELECT student_id, name, class_name FROM students ORDER BY student_id")
+    result = []
+    for student_id, name, class_name in cursor.fetchall():
+        cursor.execute(
+            "SELECT COUNT(*) FROM progress WHERE name=? AND status_id=? AND date BETWEEN ? AND ?",
+            (name, STATUS_PRESENT, start_date_str, end_date_str)
+        )
+        attended = cursor.fetchone()[0] or 0
+        cursor.execute(
+            """SELECT DISTINCT (SELECT name FROM classes WHERE id = class_id) AS class_name
+               FROM progress WHERE name=? AND date BETWEEN ? AND ? ORDER BY class_name""",
+            (name, start_date_str, end_date_str)
+        )
+        classes_in_period = [row[0] for row in cursor.fetchall()]
+        if classes_in_period:
+            total_expected = sum(count_expected_sessions(cls) for cls in classes_in_period)
+        else:
+            total_expected = count_expected_sessions(class_name)
+        absent = max(0, total_expected - attended)
+        display_class = ", ".join(classes_in_period) if classes_in_period else class_name
+        result.append((student_id, name, display_class, attended, absent, total_expected))
+    return result
+
+
+def _random_ranges(rng, first, last, count):
+    span = (last - first).days
+    ranges = []
+    for _ in range(count):
+        start = first + timedelta(days=rng.randrange(-20, span))
+        end = start + timedelta(days=rng.randrange(0, 300))
+        ranges.append((start.isoformat(), end.isoformat()))
+    # Tháng trọn vẹn, một ngày, cả năm học
+    ranges += [("2020-10-01", "2020-10-31"), ("2020-11-07", "2020-11-07"), ("2020-09-01", "2021-08-31")]
+    return ranges
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("stats") / "school.db")
+    generate_dataset(path, students=80, rows=6000, seed=7)
+    db = Database(path)
+    yield db
+    db.conn.close()
+
+
+def _assert_matches_reference(db, rng, count):
+    first = date.fromisoformat(db.conn.execute("SELECT MIN(date) FROM progress").fetchone()[0])
+    last = date.fromisoformat(db.conn.execute("SELECT MAX(date) FROM progress").fetchone()[0])
+    for start, end in _random_ranges(rng, first, last, count):
+        assert db.get_all_students_with_attendance(start, end) == \
+            reference_students_with_attendance(db, start, end), (start, end)
+
+
+def test_matches_per_student_loop(db):
+    _assert_matches_reference(db, random.Random(1), 40)
+
+
+def test_matches_after_writes(db):
+    # Bảng tổng hợp theo tháng được trigger cập nhật: sửa / xóa / thêm rồi so sánh lại
+    rng = random.Random(2)
+    ids = [row[0] for row in db.conn.execute("SELECT id FROM progress")]
+    with db.conn:
+        db.conn.executemany("UPDATE progress SET status_id = ? WHERE id = ?",
+                            [(STATUS_ABSENT, row_id) for row_id in rng.sample(ids, 300)])
+        db.conn.executemany("DELETE FROM progress WHERE id = ?", [(row_id,) for row_id in rng.sample(ids, 200)])
+    name, class_name = db.conn.execute("SELECT name, class_name FROM students LIMIT 1").fetchone()
+    db.bulk_insert_attendance([(name, class_name, "2021-01-02"), (name, class_name, "2021-01-09")])
+    db.cache.invalidate()
+    _assert_matches_reference(db, rng, 20)
+
+
+def reference_students_without_profile(db):
+    """Cách cũ: một truy vấn lấy lớp gần nhất cho mỗi tên chưa có hồ sơ"""
+    cursor = db.conn.cursor()
+    names = cursor.execute(
+        "SELECT name, COUNT(DISTINCT date) FROM progress WHERE student_key IS NULL GROUP BY name").fetchall()
+    result = []
+    for name, attendance_count in names:
+        cursor.execute("""SELECT (SELECT name FROM classes WHERE id = class_id) FROM progress
+                          WHERE name = ? ORDER BY date DESC LIMIT 1""", (name,))
+        result.append((name, cursor.fetchone()[0], attendance_count))
+    return sorted(result)
+
+
+def test_students_without_profile(db):
+    # Xóa hồ sơ thì các buổi cũ thành tên chưa có hồ sơ; thêm một tên chỉ có buổi mới
+    for student_id, *_ in db.get_all_students()[:10]:
+        db.delete_student(student_id)
+    db.bulk_insert_attendance([("Khách Mới", "Chiều CN", "2021-01-03")])
+    found = db.get_students_without_profile()
+    assert len(found) == 11 and ("Khách Mới", "Chiều CN", 1) in found
+    assert sorted(found) == reference_students_without_profile(db)
@@ -0,0 +1,110 @@
+import csv
+import random
+import shutil
+
+import pytest
+
+import settings
+from benchmarks.datagen import generate_dataset
+from database import Database
+from exporters import export_progress
+from importers import import_progress_csv
+from registry import STATUS_PRESENT, STATUS_ABSENT
+
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    path = tmp_path_factory.mktemp("import") / "school.db"
+    generate_dataset(str(path), students=40, rows=2000, seed=5)
+    return path
+
+
+def _batch(db, rng):
+    """Dòng mới (có / chưa có hồ sơ, tên đã có buổi chưa gắn hồ sơ), trùng database và trùng trong lô"""
+    keys = db.get_student_keys_by_name()
+    names = list(keys)
+    class_ids = [db.registry.class_id(name) for name in db.registry.class_names()]
+    existing = rng.sample(db.conn.execute("SELECT date, name, class_id FROM progress ORDER BY id").fetchall(), 100)
+    db.insert_entry("2019-01-05", "Tên Cũ Chưa Hồ Sơ", db.registry.class_names()[0],
+                    db.registry.status_name(STATUS_PRESENT), "", 0)
+    rows = []
+    for i in range(1500):
+        name = rng.choice(names + ["Học Sinh Mới", "Tên Cũ Chưa Hồ Sơ", "Nguyễn Văn Khách"])
+        day = f"2030-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rows.append((day, name, rng.choice(class_ids), rng.choice([STATUS_PRESENT, STATUS_ABSENT]),
+                     f"Ôn tập bài {i}", 0, keys.get(name)))
+    rows += [(day, name, class_id, STATUS_ABSENT, "Ghi đè", 1, keys.get(name)) for day, name, class_id in existing]
+    rows += [row[:4] + ("Dòng trùng trong lô",) + row[5:] for row in rng.sample(rows, 200)]
+    return rows
+
+
+def _snapshot(db):
+    """Nội dung progress và các bảng phụ; id không so vì dòng ghi đè vẫn tiêu một số AUTOINCREMENT"""
+    query = lambda sql: db.conn.execute(sql).fetchall()
+    session = lambda rows: sorted((row[2], row[1], row[3]) for row in rows)
+    return (
+        query("""SELECT date, name, class_id, status_id, content, is_highlighted, student_key
+                 FROM progress ORDER BY id"""),
+        query("SELECT * FROM attendance_rollup ORDER BY 1, 2, 3, 4"),
+        query("SELECT * FROM name_tokens ORDER BY 1, 2"),
+        session(db.search_content("on tap", limit=10 ** 6)),
+        session(db.search_content("trung", name="hoc sinh moi", limit=10 ** 6)),
+    )
+
+
+@pytest.mark.parametrize("overwrite", [False, True])
+def test_bulk_import_matches_row_triggers(source, tmp_path, monkeypatch, overwrite):
+    monkeypatch.setattr(settings, "SEARCH_CANDIDATES", 10 ** 6)
+    snapshots = []
+    for threshold in (10 ** 9, 1):
+        path = tmp_path / f"school_{threshold}.db"
+        shutil.copy(source, path)
+        db = Database(str(path))
+        triggers = lambda: db.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name").fetchall()
+        before = triggers()
+        monkeypatch.setattr(settings, "BULK_IMPORT_ROWS", threshold)
+        db.import_progress(_batch(db, random.Random(9)), overwrite)
+
+        integrity = db.check_integrity()
+        assert integrity["rollup_mismatches"] == 0 and integrity["search_index"] == "ok"
+        assert triggers() == before
+        snapshots.append(_snapshot(db))
+        db.conn.close()
+    assert snapshots[0] == snapshots[1]
+
+
+def test_highlight_levels(source, tmp_path):
+    path = tmp_path / "school.db"
+    shutil.copy(source, path)
+    db = Database(str(path))
+    name = db.get_all_students()[0][1]
+    values = ["2", "3", "Học tốt", "bao dong", "", "0", "x", "co", "true", "4", "-1"]
+    with open(tmp_path / "in.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Ngày", "Họ tên", "Lớp", "Đánh dấu"])
+        writer.writerows([f"2031-01-{day:02d}", name, "Sáng T7", value] for day, value in enumerate(values, 1))
+
+    report = import_progress_csv(db, str(tmp_path / "in.csv"))
+    assert [line for line, _ in report.rejected] == [8, 9, 10, 11, 12]
+    stored = db.conn.execute("SELECT is_highlighted FROM progress WHERE date >= '2031-01-01' ORDER BY date")
+    assert [row[0] for row in stored] == [2, 3, 2, 3, 0, 0]
+    db.conn.close()
+
+
+def test_export_import_round_trip(source, tmp_path):
+    path = tmp_path / "school.db"
+    shutil.copy(source, path)
+    db = Database(str(path))
+    with db.conn:
+        db.conn.execute("UPDATE progress SET is_highlighted = id % 4")
+    columns = "SELECT date, name, class_id, status_id, content, is_highlighted FROM progress"
+    before = sorted(db.conn.execute(columns))
+    export_progress(db, str(tmp_path / "progress.csv"))
+
+    with db.conn:
+        db.conn.execute("DELETE FROM progress")
+    report = import_progress_csv(db, str(tmp_path / "progress.csv"))
+    assert report.rejected == [] and report.skipped == [] and len(report.accepted) == len(before)
+    assert sorted(db.conn.execute(columns)) == before
+    db.conn.close()
@@ -0,0 +1,150 @@
+import sqlite3
+
+import pytest
+
+from database import Database, connect
+from migrations import migrate, get_schema_version, upgrade_warnings, SCHEMA_VERSION
+
+# Schema của file hoc_tap.db trước khi có migration (user_version = 0)
+_V0_TABLES = [
+    """CREATE TABLE progress (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           date TEXT, name TEXT, class_name TEXT,
+           status TEXT, content TEXT, is_highlighted INTEGER DEFAULT 0)""",
+    """CREATE TABLE students (
+           student_id TEXT PRIMARY KEY, name TEXT NOT NULL, phone TEXT, parent_name TEXT,
+           date_of_birth TEXT, address TEXT, notes TEXT, class_name TEXT, registration_date TEXT)""",
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "hoc_tap.db"))
+    for sql in _V0_TABLES:
+        conn.execute(sql)
+    conn.commit()
+    assert migrate(conn) == SCHEMA_VERSION
+    yield conn
+    conn.close()
+
+
+def _plan(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+# Các đường truy cập chính: theo học sinh (name, date), tóm tắt theo lớp
+# (class_id, date, status_id) và danh sách ORDER BY date DESC, id DESC theo trang
+@pytest.mark.parametrize("sql, params, index", [
+    ("SELECT COUNT(*) FROM progress WHERE name = ? AND status_id = ? AND date BETWEEN ? AND ?",
+     ("Nguyễn Văn An", 1, "2024-01-01", "2024-12-31"), "idx_progress_name_date"),
+    ("SELECT COUNT(*) FROM progress WHERE class_id = ? AND date BETWEEN ? AND ? AND status_id = ?",
+     (1, "2024-01-01", "2024-12-31", 1), "idx_progress_class_date_status"),
+    ("SELECT id, date FROM progress WHERE (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT 200",
+     ("2024-06-01", 1000), "idx_progress_date_id"),
+])
+def test_progress_lookups_use_index(conn, sql, params, index):
+    plan = _plan(conn, sql, params)
+    assert any(line.startswith("SEARCH progress") and f"INDEX {index}" in line for line in plan), plan
+    assert not any(line.startswith("SCAN progress") for line in plan), plan
+
+
+def test_migrate_is_idempotent(conn):
+    assert migrate(conn) == SCHEMA_VERSION
+    assert get_schema_version(conn) == SCHEMA_VERSION
+
+
+def test_migrate_keeps_old_rows(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    for sql in _V0_TABLES:
+        conn.execute(sql)
+    conn.executemany(
+        "INSERT INTO progress (date, name, class_name, status, content) VALUES (?,?,?,?,?)",
+        [("2024-03-02", "Trần Thị Bình", "Sáng T7", "Đi học", "Học vòng lặp for"),
+         ("2024-03-03", "Trần Thị Bình", "Sáng CN", "Nghỉ học", "Nghỉ ốm")]
+    )
+    conn.commit()
+    migrate(conn)
+    rows = conn.execute(
+        """SELECT date, (SELECT name FROM classes WHERE id = class_id), (SELECT name FROM statuses WHERE id = status_id)
+           FROM progress ORDER BY date"""
+    ).fetchall()
+    assert rows == [("2024-03-02", "Sáng T7", "Đi học"), ("2024-03-03", "Sáng CN", "Nghỉ học")]
+    conn.close()
+
+
+def test_duplicate_sessions_are_kept_aside(tmp_path):
+    conn = connect(str(tmp_path / "old.db"))
+    for sql in _V0_TABLES:
+        conn.execute(sql)
+    placeholder = "(Chưa có nhận xét cuối buổi)"
+    conn.executemany(
+        "INSERT INTO progress (id, date, name, class_name, status, content, is_highlighted) VALUES (?,?,?,?,?,?,?)",
+        [(1, "2024-03-02", "An", "Sáng T7", "Đi học", "Học vòng lặp", 2),
+         (2, "2024-03-02", "An", "Sáng T7", "Nghỉ học", "Nghỉ ốm", 0),
+         (3, "2024-03-02", "An", "Sáng T7", "Đi học", placeholder, 0),
+         (4, "2024-03-02", "An", "Sáng CN", "Đi học", placeholder, 0),
+         (5, "2024-03-09", "Bình", "Sáng T7", "Đi học", placeholder, 0),
+         (6, "2024-03-09", "Bình", "Sáng T7", "Đi học", placeholder, 1)]
+    )
+    conn.commit()
+    migrate(conn)
+
+    # Giữ bản có nhận xét, mới nhất; bản chỉ có nội dung mặc định thì giữ bản mới nhất
+    assert [row[0] for row in conn.execute("SELECT id FROM progress ORDER BY id")] == [2, 4, 6]
+    kept_aside = conn.execute(
+        "SELECT id, kept_id, date, name, class_name, status, content, is_highlighted FROM progress_duplicates_v3 ORDER BY id"
+    ).fetchall()
+    assert kept_aside == [(1, 2, "2024-03-02", "An", "Sáng T7", "Đi học", "Học vòng lặp", 2),
+                          (3, 2, "2024-03-02", "An", "Sáng T7", "Đi học", placeholder, 0),
+                          (5, 6, "2024-03-09", "Bình", "Sáng T7", "Đi học", placeholder, 0)]
+    assert len(upgrade_warnings(conn, 0)) == 1 and "3 dòng" in upgrade_warnings(conn, 0)[0]
+    assert upgrade_warnings(conn, SCHEMA_VERSION) == []
+    conn.close()
+
+
+def test_no_duplicates_no_table(conn):
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'progress_duplicates_v3'").fetchone() is None
+    assert upgrade_warnings(conn, 0) == []
+
+
+def test_schema_needs_no_app_functions(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = connect(path)
+    for sql in _V0_TABLES:
+        conn.execute(sql)
+    conn.execute("INSERT INTO progress (date, name, class_name, status, content) VALUES "
+                 "('2024-03-02', 'Phạm Minh Đức', 'Sáng T7', 'Đi học', 'Học đệ quy')")
+    conn.execute("INSERT INTO students (student_id, name, notes) VALUES ('HS1', 'Phạm Minh Đức', 'Hay đi muộn')")
+    conn.commit()
+    migrate(conn)
+    # Các cột được tính khi nâng cấp từ dữ liệu cũ
+    assert conn.execute("SELECT name_key, search_body FROM progress").fetchall() == [("pham minh duc", "hoc de quy")]
+    assert conn.execute("SELECT name_key FROM name_tokens WHERE token = 'duc'").fetchall() == [("pham minh duc",)]
+    conn.close()
+
+    # Kết nối sqlite3 thường, không có vn_search_text / vn_fold...
+    conn = sqlite3.connect(path)
+    conn.execute("SELECT * FROM progress").fetchall()
+    conn.execute("SELECT * FROM students").fetchall()
+    with conn:
+        conn.execute("INSERT INTO progress (date, name, class_id, status_id, content) VALUES "
+                     "('2024-03-09', 'Phạm Minh Đức', 1, 1, 'Học vòng lặp')")
+        conn.execute("UPDATE progress SET content = 'Ôn tập', name = 'Phạm Đức' WHERE date = '2024-03-02'")
+        conn.execute("UPDATE students SET notes = 'Đi muộn', name = 'Phạm Đức'")
+        conn.execute("INSERT INTO students (student_id, name) VALUES ('HS2', 'Lê An')")
+        conn.execute("DELETE FROM students WHERE student_id = 'HS2'")
+    conn.execute("REINDEX")
+    conn.execute("VACUUM")
+    assert conn.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+    conn.close()
+
+    # Dòng thêm từ client khác chưa có khóa: check_integrity báo, rebuild_search_index tính lại
+    db = Database(path)
+    integrity = db.check_integrity(full=True)
+    assert integrity["missing_text_keys"] == 1 and integrity["search_index"] == "ok"
+    assert db.search_content("vong lap") == []
+    db.rebuild_search_index()
+    assert db.check_integrity()["missing_text_keys"] == 0
+    assert [row[2] for row in db.search_content("vong lap", name="duc")] == ["Phạm Minh Đức"]
+    assert [row[1] for row in db.search_students("duc")] == ["Phạm Đức"]
+    db.conn.close()
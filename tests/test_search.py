@@ -0,0 +1,71 @@
+import random
+import re
+
+import pytest
+
+import settings
+from benchmarks.datagen import generate_dataset
+from database import Database
+from registry import ALL_CLASSES
+from textnorm import fold
+
+
+def reference_search(db, query, name="", class_name=ALL_CLASSES, date=None):
+    """id các buổi khớp: lọc bằng get_filtered_progress rồi so từng từ của nội dung (từ cuối khớp tiền tố)"""
+    terms = re.findall(r"\w+", fold(query))
+    result = set()
+    for row in db.get_filtered_progress(name, class_name, date):
+        words = re.findall(r"\w+", fold(row[5]))
+        if all(term in words for term in terms[:-1]) and any(word.startswith(terms[-1]) for word in words):
+            result.add(row[0])
+    return result
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("search") / "school.db")
+    generate_dataset(path, students=60, rows=4000, seed=3)
+    db = Database(path)
+    yield db
+    db.conn.close()
+
+
+def _cases(db, rng, count):
+    names = [row[0] for row in db.conn.execute("SELECT DISTINCT name FROM progress")]
+    dates = [row[0] for row in db.conn.execute("SELECT DISTINCT date FROM progress")]
+    cases = []
+    for _ in range(count):
+        words = fold(rng.choice(names)).split()
+        start = rng.randrange(len(words))
+        name = " ".join(words[start:start + rng.randint(1, 2)])
+        name = name[:rng.randint(1, len(name))]
+        cases.append({"name": rng.choice(["", name]),
+                      "class_name": rng.choice([ALL_CLASSES, "Sáng T7", "Chiều CN"]),
+                      "date": rng.choice([None, rng.choice(dates)])})
+    return cases
+
+
+@pytest.mark.parametrize("query", ["vong lap", "hoc", "h", "de quy", "tap trung"])
+def test_matches_reference(db, monkeypatch, query):
+    monkeypatch.setattr(settings, "SEARCH_CANDIDATES", 10 ** 6)
+    for filters in _cases(db, random.Random(query), 15) + [{}]:
+        found = {row[0] for row in db.search_content(query, limit=10 ** 6, **filters)}
+        assert found == reference_search(db, query, **filters), filters
+
+
+def test_candidates_are_newest_matches(db, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_CANDIDATES", 300)
+    newest = sorted(reference_search(db, "hoc"), reverse=True)[:300]
+    found = [row[0] for row in db.search_content("hoc", limit=100)]
+    assert len(found) == 100 and set(found) <= set(newest)
+
+
+def test_index_follows_writes(db):
+    row_id, name = db.conn.execute("SELECT id, name FROM progress LIMIT 1").fetchone()
+    _, date, _, class_name, status, _, highlighted = db.get_entry_by_id(row_id)
+    db.update_entry(row_id, date, "Tên Mới Lạ", class_name, status, "Ôn tập xyzabc", highlighted)
+    assert [row[0] for row in db.search_content("xyzabc", name="moi la")] == [row_id]
+    assert db.search_content("xyzabc", name=name) == []
+    with db.conn:
+        db.conn.execute("DELETE FROM progress WHERE id = ?", (row_id,))
+    assert db.search_content("xyzabc") == []
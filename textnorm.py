@@ -0,0 +1,75 @@
+# Chuẩn hóa chuỗi tiếng Việt cho tìm kiếm
+import unicodedata
+
+import settings
+
+# Tăng khi đổi quy tắc của fold / name_suffixes / name_sort_key: các khóa đã lưu trong
+# database (name_key, sort_key, name_tokens) được tính lại khi mở file
+KEY_VERSION = 1
+
+# "đ" là chữ cái riêng, không tách được dấu bằng NFD nên phải đổi thủ công
+_SPECIAL = str.maketrans({"đ": "d", "Đ": "d"})
+
+
+def fold(text):
+    """Bỏ dấu + chữ thường: "Vòng lặp Đúng" -> "vong lap dung" """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFD", text.translate(_SPECIAL))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return unicodedata.normalize("NFC", stripped).lower()
+
+
+def search_text(text):
+    """Chuỗi đưa vào chỉ mục / câu tìm kiếm FTS: bỏ dấu nếu bật SEARCH_FOLD_DIACRITICS"""
+    if not text:
+        return ""
+    return fold(text) if settings.SEARCH_FOLD_DIACRITICS else text
+
+
+def search_mode():
+    """Chế độ của search_text, lưu trong app_meta để biết khi nào phải tính lại"""
+    return "fold" if settings.SEARCH_FOLD_DIACRITICS else "exact"
+
+
+def name_suffixes(text):
+    """Các đoạn cuối bắt đầu từ mỗi chữ của tên đã bỏ dấu: "Phạm Minh" -> ["pham minh", "minh"]"""
+    words = fold(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+# Thứ tự chữ cái tiếng Việt (thêm f, j, w, z cho tên nước ngoài)
+_ALPHABET = "aăâbcdđeêfghijklmnoôơpqrstuưvwxyz"
+_LETTER_CODES = {letter: chr(0x100 + i) for i, letter in enumerate(_ALPHABET)}
+
+# Dấu thanh chỉ xét sau chữ cái: ngang < huyền < hỏi < ngã < sắc < nặng
+_TONES = {"̀": "1", "̉": "2", "̃": "3", "́": "4", "̣": "5"}
+
+
+def _collation_parts(text):
+    letters, tones = [], []
+    for ch in text.lower():
+        tone = "0"
+        base = []
+        for part in unicodedata.normalize("NFD", ch):
+            if part in _TONES:
+                tone = _TONES[part]
+            else:
+                base.append(part)
+        letter = unicodedata.normalize("NFC", "".join(base))
+        letters.append(_LETTER_CODES.get(letter, letter))
+        tones.append(tone)
+    return "".join(letters), "".join(tones)
+
+
+def name_sort_key(name):
+    """
+    Khóa sắp xếp họ tên theo thứ tự tiếng Việt (so sánh chuỗi thường là đủ):
+    theo tên (chữ cuối) rồi đến cả họ tên, a < ă < â < b ..., dấu thanh xét sau cùng
+    """
+    words = (name or "").split()
+    if not words:
+        return ""
+    given_letters, given_tones = _collation_parts(words[-1])
+    full_letters, full_tones = _collation_parts(" ".join(words))
+    return "\x01".join((given_letters, full_letters, given_tones, full_tones))
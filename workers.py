@@ -0,0 +1,221 @@
+# Chạy truy vấn database ngoài luồng giao diện (GUI thread)
+#
+# Mỗi luồng của QThreadPool giữ một kết nối chỉ đọc riêng. Kết quả được gửi về
+# luồng giao diện qua signal; yêu cầu cũ bị bỏ qua khi đã có yêu cầu mới hơn
+# cùng khóa (key), ví dụ gõ tìm kiếm liên tục.
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+from database import Database
+
+_thread_local = threading.local()
+
+
+def thread_database(db_name, profile):
+    """Kết nối chỉ đọc thuộc về luồng hiện tại (tạo một lần cho mỗi luồng)"""
+    databases = getattr(_thread_local, "databases", None)
+    if databases is None:
+        databases = _thread_local.databases = {}
+    key = (db_name, profile)
+    if key not in databases:
+        databases[key] = Database(db_name, profile, read_only=True)
+    return databases[key]
+
+
+class _TaskSignals(QObject):
+    finished = Signal(str, int, object)
+    failed = Signal(str, int, str)
+
+
+class _QueryTask(QRunnable):
+    def __init__(self, executor, key, request_id, func, args):
+        super().__init__()
+        self.signals = executor._signals
+        self.is_current = executor.is_current
+        self.db_name = executor.db_name
+        self.profile = executor.profile
+        self.key = key
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+
+    def run(self):
+        # Đã có yêu cầu mới hơn trước khi kịp chạy thì bỏ luôn
+        if not self.is_current(self.key, self.request_id):
+            self.signals.finished.emit(self.key, self.request_id, None)
+            return
+        try:
+            db = thread_database(self.db_name, self.profile)
+            result = self.func(db, *self.args)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.key, self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.key, self.request_id, result)
+
+
+class QueryExecutor(QObject):
+    """
+    Gửi hàm func(db, *args) chạy trên QThreadPool với kết nối chỉ đọc của luồng
+    finished(key, result) / failed(key, message) chỉ phát cho yêu cầu mới nhất của mỗi key
+    busy_changed(bool) dùng để hiện / ẩn biểu tượng đang tải
+    """
+    finished = Signal(str, object)
+    failed = Signal(str, str)
+    busy_changed = Signal(bool)
+
+    def __init__(self, db_name, profile, parent=None):
+        super().__init__(parent)
+        self.db_name = db_name
+        self.profile = profile
+        self.pool = QThreadPool.globalInstance()
+        self._latest = {}
+        self._next_id = 0
+        self._pending = 0
+
+        self._signals = _TaskSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+    def submit(self, key, func, *args):
+        """Gửi một truy vấn, trả về mã yêu cầu"""
+        self._next_id += 1
+        request_id = self._next_id
+        self._latest[key] = request_id
+
+        self._pending += 1
+        if self._pending == 1:
+            self.busy_changed.emit(True)
+
+        self.pool.start(_QueryTask(self, key, request_id, func, args))
+        return request_id
+
+    def cancel(self, key):
+        """Bỏ qua kết quả của yêu cầu đang chạy với key này"""
+        self._latest.pop(key, None)
+
+    def is_current(self, key, request_id):
+        return self._latest.get(key) == request_id
+
+    def is_busy(self):
+        return self._pending > 0
+
+    def _done(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self.busy_changed.emit(False)
+
+    @Slot(str, int, object)
+    def _on_finished(self, key, request_id, result):
+        self._done()
+        if self.is_current(key, request_id):
+            del self._latest[key]
+            self.finished.emit(key, result)
+
+    @Slot(str, int, str)
+    def _on_failed(self, key, request_id, message):
+        self._done()
+        if self.is_current(key, request_id):
+            del self._latest[key]
+            self.failed.emit(key, message)
+
+
+class _JobSignals(QObject):
+    progress = Signal(int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class _JobTask(QRunnable):
+    def __init__(self, job, func, args, kwargs):
+        super().__init__()
+        self.job = job
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        signals = self.job._signals
+        try:
+            result = self.func(*self.args, progress=self.job._report_progress, **self.kwargs)
+        except Exception as e:
+            # Lỗi phát sinh sau khi đã bấm hủy được coi là hủy thành công
+            if self.job.is_cancel_requested():
+                signals.cancelled.emit()
+            else:
+                traceback.print_exc()
+                signals.failed.emit(str(e))
+        else:
+            signals.finished.emit(result)
+
+
+class BackgroundJob(QObject):
+    """
+    Chạy một việc dài func(*args, progress=..., **kwargs) trên QThreadPool, có tiến độ và nút hủy
+    func gọi progress(done, total) định kỳ; hàm này trả về False khi đã bị hủy,
+    lúc đó func dọn dẹp và raise một exception bất kỳ
+    progress(done, total), finished(result), failed(message), cancelled() phát ở luồng giao diện
+    """
+    progress = Signal(int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self._cancel = threading.Event()
+        self._running = False
+
+        self._signals = _JobSignals()
+        self._signals.progress.connect(self.progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+
+    def start(self, func, *args, **kwargs):
+        if self._running:
+            raise RuntimeError("Công việc trước chưa xong")
+        self._cancel.clear()
+        self._running = True
+        self.pool.start(_JobTask(self, func, args, kwargs))
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancel_requested(self):
+        return self._cancel.is_set()
+
+    def is_running(self):
+        return self._running
+
+    def _report_progress(self, done, total):
+        # Gọi từ luồng nền
+        self._signals.progress.emit(done, total)
+        return not self._cancel.is_set()
+
+    @Slot(object)
+    def _on_finished(self, result):
+        self._running = False
+        self.finished.emit(result)
+
+    @Slot(str)
+    def _on_failed(self, message):
+        self._running = False
+        self.failed.emit(message)
+
+    @Slot()
+    def _on_cancelled(self):
+        self._running = False
+        self.cancelled.emit()
+
+
+def with_thread_database(db_name, profile, func, *args, progress=None, **kwargs):
+    """
+    Gọi func(db, *args, progress=progress, **kwargs) với kết nối chỉ đọc của luồng hiện tại
+    Dùng với BackgroundJob khi công việc cần đọc database (cursor chỉ dùng được trên luồng đã tạo nó)
+    """
+    return func(thread_database(db_name, profile), *args, progress=progress, **kwargs)